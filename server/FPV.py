@@ -22,7 +22,10 @@ from picamera.array import PiRGBArray
 import rpi_ws281x
 
 import LED
+import line_scan
 import move
+from color_tracker import ColorTracker
+from frame_pipeline import JPEGPipeline
 
 Y_lock = 0
 X_lock = 0
@@ -125,36 +128,16 @@ def findLineCtrl(posInput, setCenter):  # 2
 def cvFindLine():  # 2
     global frame_findline, camera  # 3
     # camera.exposure_mode = 'off'
-    frame_findline = cv2.cvtColor(frame_image, cv2.COLOR_BGR2GRAY)
-    retval, frame_findline = cv2.threshold(frame_findline, 0, 255, cv2.THRESH_OTSU)  # 对图片进行二值化处理
-    frame_findline = cv2.erode(frame_findline, None, iterations=6)  # 侵蚀
-    colorPos_1 = frame_findline[linePos_1]
-    colorPos_2 = frame_findline[linePos_2]
-
-    try:
-        lineColorCount_Pos1 = np.sum(colorPos_1 == lineColorSet)
-        lineColorCount_Pos2 = np.sum(colorPos_2 == lineColorSet)
-
-        lineIndex_Pos1 = np.where(colorPos_1 == lineColorSet)
-        lineIndex_Pos2 = np.where(colorPos_2 == lineColorSet)
-
-        if lineColorCount_Pos1 == 0:
-            lineColorCount_Pos1 = 1
-        if lineColorCount_Pos2 == 0:
-            lineColorCount_Pos2 = 1
-
-        left_Pos1 = lineIndex_Pos1[0][lineColorCount_Pos1 - 1]
-        right_Pos1 = lineIndex_Pos1[0][0]
-        center_Pos1 = int((left_Pos1 + right_Pos1) / 2)
-
-        left_Pos2 = lineIndex_Pos2[0][lineColorCount_Pos2 - 1]
-        right_Pos2 = lineIndex_Pos2[0][0]
-        center_Pos2 = int((left_Pos2 + right_Pos2) / 2)
-
-        center = int((center_Pos1 + center_Pos2) / 2)
-    except Exception as e:  # 3
-        print(e)
-        center = None
+    # Only the bands around the two scanlines are binarized and eroded
+    scan = line_scan.scan_lines(frame_image, (linePos_1, linePos_2), lineColorSet)
+    if not frameRender:  # the line view shows just the scanned bands
+        frame_findline = line_scan.paste_bands(np.zeros(frame_image.shape[:2], np.uint8), scan)
+    center = scan.center
+    if center is None:
+        print('line lost')
+    else:
+        left_Pos1, left_Pos2 = scan.end.tolist()
+        right_Pos1, right_Pos2 = scan.start.tolist()
 
     findLineCtrl(center, 320)
     # print(center)
@@ -208,6 +191,7 @@ class FPV:
 
         self.colorUpper = (44, 255, 255)
         self.colorLower = (24, 100, 100)
+        self.colorTracker = ColorTracker()
 
     def SetIP(self, invar):
         self.IP = invar
@@ -247,6 +231,8 @@ class FPV:
         footage_socket = context.socket(zmq.PUB)
         print(IPinver)
         footage_socket.bind('tcp://*:5555')
+        self.pipeline = JPEGPipeline()
+        self.pipeline.subscribe(lambda encoded: footage_socket.send(base64.b64encode(encoded.data)))
 
         avg = None
         motionCounter = 0
@@ -268,19 +254,10 @@ class FPV:
 
             if FindColorMode:
                 ####>>>OpenCV Start<<<####
-                hsv = cv2.cvtColor(frame_image, cv2.COLOR_BGR2HSV)
-                mask = cv2.inRange(hsv, self.colorLower, self.colorUpper)
-                mask = cv2.erode(mask, None, iterations=2)
-                mask = cv2.dilate(mask, None, iterations=2)
-                cnts = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL,
-                                        cv2.CHAIN_APPROX_SIMPLE)[-2]
-                center = None
-                if len(cnts) > 0:
+                target = self.colorTracker.detect(frame_image, self.colorLower, self.colorUpper)
+                if target is not None:
                     cv2.putText(frame_image, 'Target Detected', (40, 60), font, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
-                    c = max(cnts, key=cv2.contourArea)
-                    ((x, y), radius) = cv2.minEnclosingCircle(c)
-                    M = cv2.moments(c)
-                    center = (int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"]))
+                    x, y, radius = target.x, target.y, target.radius
                     X = int(x)
                     Y = int(y)
                     if radius > 10:
@@ -368,11 +345,9 @@ class FPV:
                     LED.breath_color_set('blue')
 
             if FindLineMode and not frameRender:  # 2
-                encoded, buffer = cv2.imencode('.jpg', frame_findline)
+                self.pipeline.encode(frame_findline)
             else:
-                encoded, buffer = cv2.imencode('.jpg', frame_image)
-            jpg_as_text = base64.b64encode(buffer)
-            footage_socket.send(jpg_as_text)
+                self.pipeline.encode(frame_image)
 
             rawCapture.truncate(0)
 
@@ -5,6 +5,134 @@
 # E-mail      : support@adeept.com
 # Author      : William
 # Date        : 2018/08/22
+from collections import deque
+
+import numpy as np
+
+RESUM_INTERVAL = 1024  # Recompute running sums exactly this often to stop rounding drift
+
+# numba compiles kalman_batch() (about 100x faster than kalman() per sample). It is
+# in requirements.txt except on armv7l, which has no llvmlite wheels; there the
+# batch runs the same loop in plain Python
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+class _RunningSum:
+    """Sum of the last `size` appended values, kept up to date in O(1) per sample"""
+    RESUM_INTERVAL = RESUM_INTERVAL
+
+    def __init__(self, size, values=()):
+        self.values = deque(values, maxlen=max(size, 0))
+        self.total = sum(self.values)
+        self._appends = 0
+
+    def append(self, value):
+        if self.values.maxlen == 0:
+            return
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._appends += 1
+        if self._appends >= self.RESUM_INTERVAL:
+            self.total = sum(self.values)
+            self._appends = 0
+
+    def mean(self):
+        return max(self.total, 0.0) / (len(self.values) or 1)
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _kalman_em_loop(samples, estimates, Qs, Rs, state, innovation_ring, innovation_count, transition_ring,
+                    transition_count, window, history_max, min_samples, alpha_R, alpha_Q):
+    """Body of Kalman_filter.kalman() for a whole sequence, on plain scalars
+
+    state is (Q, R, P, kalman_adc_old, last_state, Kg, x_k_k1, history_len).
+    The running-sum rings start with their first *_count slots filled. Works
+    on lists in plain Python and on arrays under numba; returns the new state.
+    """
+    Q, R, P, x_old, last_state, Kg, x_prior, history_len = state
+    transition_window = window - 1
+
+    innovation_total = 0.0
+    for k in range(innovation_count):
+        innovation_total += innovation_ring[k]
+    innovation_pos = innovation_count % window if window > 0 else 0
+    innovation_appends = 0
+    transition_total = 0.0
+    for k in range(transition_count):
+        transition_total += transition_ring[k]
+    transition_pos = transition_count % transition_window if transition_window > 0 else 0
+    transition_appends = 0
+
+    for i in range(len(samples)):
+        z = samples[i]
+        if abs(x_old - z) >= 60:
+            x_prior = z * 0.382 + x_old * 0.618
+        else:
+            x_prior = x_old
+
+        P_prior = P + Q
+        Kg = P_prior / (P_prior + R)
+        innovation = z - x_old
+        estimate = x_prior + Kg * innovation
+        P = (1 - Kg) * P_prior
+
+        if history_len > 0 and transition_window > 0:
+            value = (estimate - last_state) * (estimate - last_state)
+            if transition_count == transition_window:
+                transition_total -= transition_ring[transition_pos]
+            else:
+                transition_count += 1
+            transition_ring[transition_pos] = value
+            transition_total += value
+            transition_pos = (transition_pos + 1) % transition_window
+            transition_appends += 1
+            if transition_appends >= RESUM_INTERVAL:
+                transition_total = 0.0
+                for k in range(transition_count):
+                    transition_total += transition_ring[k]
+                transition_appends = 0
+        if window > 0:
+            value = innovation * innovation
+            if innovation_count == window:
+                innovation_total -= innovation_ring[innovation_pos]
+            else:
+                innovation_count += 1
+            innovation_ring[innovation_pos] = value
+            innovation_total += value
+            innovation_pos = (innovation_pos + 1) % window
+            innovation_appends += 1
+            if innovation_appends >= RESUM_INTERVAL:
+                innovation_total = 0.0
+                for k in range(innovation_count):
+                    innovation_total += innovation_ring[k]
+                innovation_appends = 0
+        last_state = estimate
+        if history_len < history_max:
+            history_len += 1
+
+        if history_len >= min_samples:
+            innovation_variance = max(innovation_total, 0.0) / max(innovation_count, 1)
+            process_variance = max(transition_total, 0.0) / max(transition_count, 1)
+            R = max(1e-6, (1 - alpha_R) * R + alpha_R * innovation_variance)
+            Q = max(1e-7, (1 - alpha_Q) * Q + alpha_Q * (process_variance * 0.1))
+
+        x_old = estimate
+        estimates[i] = estimate
+        Qs[i] = Q
+        Rs[i] = R
+
+    return Q, R, P, x_old, last_state, Kg, x_prior, history_len
+
+
+if njit is not None:
+    _kalman_em_loop = njit(cache=True)(_kalman_em_loop)
 
 
 # Additional methods in the Kalman_filter class for adaptive parameter learning.
@@ -23,50 +151,57 @@ class Kalman_filter:
         self.kalman_adc_old = 0
 
         # EM Statistics
-        self.innovation_history = []  # Store recent innovations
-        self.state_history = []  # Store recent state estimates
-        self.measurement_history = []  # Store recent measurements
         self.history_max_size = 50  # Maximum history size for EM
         self.min_samples_for_em = 10  # Minimum samples before EM update
         self.em_batch_size = 30  # Number of samples to use for each EM update
+        self.innovation_history = deque(maxlen=self.history_max_size)  # Store recent innovations
+        self.state_history = deque(maxlen=self.history_max_size)  # Store recent state estimates
+        self.measurement_history = deque(maxlen=self.history_max_size)  # Store recent measurements
+
+        # Running sums of squared innovations and squared state transitions over
+        # the last em_batch_size samples, so each E-step is O(1)
+        self._em_config = None
+        self._resize_windows()
 
         # Learning rates
         self.alpha_R = 0.01  # Learning rate for R (measurement noise)
         self.alpha_Q = 0.001  # Learning rate for Q (process noise)
 
+    def _resize_windows(self):
+        """Rebuild histories and running sums after a window size change"""
+        self._em_config = (self.history_max_size, self.em_batch_size)
+        self.innovation_history = deque(self.innovation_history, maxlen=self.history_max_size)
+        self.state_history = deque(self.state_history, maxlen=self.history_max_size)
+        self.measurement_history = deque(self.measurement_history, maxlen=self.history_max_size)
+
+        window = max(min(self.em_batch_size, self.history_max_size), 0)
+        innovations = list(self.innovation_history)[len(self.innovation_history) - window:]
+        states = list(self.state_history)[len(self.state_history) - window:]
+        self._innovation_sq = _RunningSum(window, (inn * inn for inn in innovations))
+        self._transition_sq = _RunningSum(window - 1, ((b - a) * (b - a) for a, b in zip(states, states[1:])))
+
     def _update_histories(self, innovation, state, measurement):
         """Update sliding windows of historical values"""
+        if self._em_config != (self.history_max_size, self.em_batch_size):
+            self._resize_windows()
+
+        if self.state_history:
+            transition = state - self.state_history[-1]
+            self._transition_sq.append(transition * transition)
+        self._innovation_sq.append(innovation * innovation)
+
         self.innovation_history.append(innovation)
         self.state_history.append(state)
         self.measurement_history.append(measurement)
 
-        # Maintain fixed window size
-        if len(self.innovation_history) > self.history_max_size:
-            self.innovation_history.pop(0)
-            self.state_history.pop(0)
-            self.measurement_history.pop(0)
-
     def _expectation_step(self):
         """E-step: Compute expected statistics given current parameters"""
         if len(self.state_history) < self.min_samples_for_em:
             return None, None
 
-        # Use recent samples up to em_batch_size
-        history_size = min(self.em_batch_size, len(self.state_history))
-        recent_innovations = self.innovation_history[-history_size:]
-        recent_states = self.state_history[-history_size:]
-        recent_measurements = self.measurement_history[-history_size:]
-
-        # Compute innovation statistics
-        innovation_variance = sum(inn * inn for inn in recent_innovations) / history_size
-
-        # Compute state transition statistics
-        state_transitions = []
-        for i in range(1, len(recent_states)):
-            transition = recent_states[i] - recent_states[i - 1]
-            state_transitions.append(transition * transition)
-
-        process_variance = sum(state_transitions) / (len(state_transitions) or 1)
+        # Mean squared innovation and state transition over the last em_batch_size samples
+        innovation_variance = self._innovation_sq.mean()
+        process_variance = self._transition_sq.mean()
 
         return innovation_variance, process_variance
 
@@ -117,6 +252,57 @@ class Kalman_filter:
         self.kalman_adc_old = kalman_adc
         return kalman_adc
 
+    def kalman_batch(self, samples):
+        """
+        Filter a whole array of samples, EM adaptation included
+
+        Gives the same results as calling kalman() on each sample in turn and
+        leaves the filter in the same state, but runs as one tight loop
+        (compiled when numba is installed). Returns arrays of the estimates
+        and of Q and R after each sample.
+        """
+        samples = np.ascontiguousarray(samples, dtype=float).ravel()
+        if self._em_config != (self.history_max_size, self.em_batch_size):
+            self._resize_windows()
+
+        window = max(min(self.em_batch_size, self.history_max_size), 0)
+        innovation_count = len(self._innovation_sq)
+        transition_count = len(self._transition_sq)
+        innovations = list(self._innovation_sq.values) + [0.0] * (window - innovation_count)
+        transitions = list(self._transition_sq.values) + [0.0] * (window - 1 - transition_count)
+        x_start = self.kalman_adc_old
+        last_state = self.state_history[-1] if self.state_history else 0.0
+        state = tuple(float(v) for v in (self.Q, self.R, self.P_k1_k1, self.kalman_adc_old,
+                                         last_state, self.Kg, self.x_k_k1)) + (len(self.state_history),)
+
+        if njit is not None:
+            sequence = samples
+            outputs = [np.empty_like(samples) for _ in range(3)]
+            innovations = np.array(innovations, dtype=float)
+            transitions = np.array(transitions, dtype=float)
+        else:
+            sequence = samples.tolist()
+            outputs = [[0.0] * len(samples) for _ in range(3)]
+        state = _kalman_em_loop(sequence, *outputs, state, innovations, innovation_count, transitions,
+                                transition_count, window, self.history_max_size, self.min_samples_for_em,
+                                float(self.alpha_R), float(self.alpha_Q))
+        estimates, Qs, Rs = (np.asarray(output, dtype=float) for output in outputs)
+
+        self.Q, self.R, self.P_k1_k1, self.kalman_adc_old, _, self.Kg, self.x_k_k1, _ = state
+        self.P_k_k1 = self.P_k1_k1
+        self.x_k1_k1 = self.x_k_k1
+        if len(samples):
+            self.Z_k = samples[-1]
+
+            # Hand the tail of the batch back to the per-sample histories
+            tail = slice(max(len(samples) - self.history_max_size, 0), None)
+            previous = np.concatenate(([x_start], estimates[:-1]))
+            self.innovation_history.extend((samples - previous)[tail].tolist())
+            self.state_history.extend(estimates[tail].tolist())
+            self.measurement_history.extend(samples[tail].tolist())
+            self._resize_windows()
+        return estimates, Qs, Rs
+
     def get_parameters(self):
         """Return current filter parameters"""
         return {
@@ -125,3 +311,132 @@ class Kalman_filter:
             'P': self.P_k1_k1,
             'history_size': len(self.state_history)
         }
+
+
+def _covariance(value, size):
+    """Square covariance matrix from a variance shared by every axis, per-axis variances or a full matrix"""
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 2:
+        return value.copy()
+    return np.diag(np.broadcast_to(value, (size,))).astype(float)
+
+
+class VectorKalmanFilter:
+    """Kalman filter over several axes sharing one matrix update per sample
+
+    Every axis is a random-walk state measured directly, as in Kalman_filter,
+    but Q and R are full covariance matrices: the EM step learns them from
+    the outer products of innovations and state transitions, so noise that
+    hits all axes together (chassis vibration on the accelerometer) lowers
+    every axis' gain at once. Each consumer should own its instance; the
+    adaptation follows the rate and signal of whatever feeds it.
+
+    With a jump_threshold, an axis whose measurement moves at least that far
+    from its estimate starts from a prior pulled 38.2% of the way towards the
+    measurement, the large-jump handling of Kalman_filter.kalman(). It is off
+    by default; the IMU axes never jump that far, pixel errors do.
+    """
+
+    def __init__(self, axes, Q, R, jump_threshold=None):
+        self.axes = tuple(axes)
+        self.jump_threshold = jump_threshold
+        self._index = {axis: i for i, axis in enumerate(self.axes)}
+        size = len(self.axes)
+        self.Q = _covariance(Q, size)  # Process noise covariance
+        self.R = _covariance(R, size)  # Measurement noise covariance
+        self.P = np.eye(size)  # Posterior error covariance
+        self.K = np.zeros((size, size))  # Kalman gain
+        self.x = np.zeros(size)  # Posterior state estimate
+        self._identity = np.eye(size)
+        self._diagonal = np.diag_indices(size)
+
+        # EM statistics, with the same meaning as in Kalman_filter
+        self.history_max_size = 50
+        self.min_samples_for_em = 10
+        self.em_batch_size = 30
+        self.history_size = 0
+        self._em_config = None
+        self._resize_windows()
+
+        # Learning rates
+        self.alpha_R = 0.01
+        self.alpha_Q = 0.001
+
+    def _resize_windows(self):
+        """Restart the EM windows after a window size change"""
+        self._em_config = (self.history_max_size, self.em_batch_size)
+        window = max(min(self.em_batch_size, self.history_max_size), 0)
+        self.history_size = min(self.history_size, self.history_max_size)
+        self._innovation_outer = _RunningSum(window)
+        self._transition_outer = _RunningSum(window - 1)
+
+    def _vector(self, measurement):
+        if hasattr(measurement, 'keys'):
+            return np.array([measurement[axis] for axis in self.axes], dtype=float)
+        z = np.asarray(measurement, dtype=float).ravel()
+        if z.shape != self.x.shape:
+            raise ValueError(f"Expected {len(self.axes)} values for axes {self.axes}, got {z.size}")
+        return z
+
+    def update(self, measurement):
+        """
+        Filter one sample given as a mapping keyed by axis or a sequence in axis order
+
+        Returns the new estimate of every axis, in axis order.
+        """
+        z = self._vector(measurement)
+        if self._em_config != (self.history_max_size, self.em_batch_size):
+            self._resize_windows()
+
+        # Prediction step
+        P_prior = self.P + self.Q
+
+        # Update step; P_prior and S are symmetric, so K = P_prior S^-1 = (S^-1 P_prior)^T
+        self.K = np.linalg.solve(P_prior + self.R, P_prior).T
+        innovation = z - self.x
+        prior = self.x
+        if self.jump_threshold is not None:
+            prior = np.where(np.abs(innovation) >= self.jump_threshold, z * 0.382 + self.x * 0.618, self.x)
+        estimate = prior + self.K @ innovation
+        P = (self._identity - self.K) @ P_prior
+        self.P = (P + P.T) / 2
+
+        # EM statistics and update
+        if self.history_size:
+            transition = estimate - self.x
+            self._transition_outer.append(np.outer(transition, transition))
+        self._innovation_outer.append(np.outer(innovation, innovation))
+        self.history_size = min(self.history_size + 1, self.history_max_size)
+        if self.history_size >= self.min_samples_for_em:
+            innovation_covariance = self._innovation_outer.total / (len(self._innovation_outer) or 1)
+            process_covariance = self._transition_outer.total / (len(self._transition_outer) or 1)
+            self.R = (1 - self.alpha_R) * self.R + self.alpha_R * innovation_covariance
+            self.Q = (1 - self.alpha_Q) * self.Q + self.alpha_Q * (process_covariance * 0.1)
+            self.R[self._diagonal] = np.maximum(self.R[self._diagonal], 1e-6)
+            self.Q[self._diagonal] = np.maximum(self.Q[self._diagonal], 1e-7)
+
+        self.x = estimate
+        return estimate.copy()
+
+    def value(self, axis):
+        """Current estimate of one axis"""
+        return float(self.x[self._index[axis]])
+
+    def set_noise(self, Q=None, R=None):
+        """Replace Q and/or R, given like the constructor arguments"""
+        if Q is not None:
+            self.Q = _covariance(Q, len(self.axes))
+        if R is not None:
+            self.R = _covariance(R, len(self.axes))
+
+    def get_parameters(self, axis=None):
+        """Return current filter parameters, of one axis or of all of them"""
+        if axis is None:
+            return {axis: self.get_parameters(axis) for axis in self.axes}
+        i = self._index[axis]
+        return {
+            'Q': float(self.Q[i, i]),
+            'R': float(self.R[i, i]),
+            'P': float(self.P[i, i]),
+            'history_size': self.history_size
+        }
@@ -8,6 +8,8 @@
 # Date        : 2018/08/22
 import time
 
+import numpy as np
+
 
 class PID:
     def __init__(self):
@@ -89,6 +91,124 @@ class PID:
         return self.Cp + (self.Ki * self.Ci) + (self.Kd * self.Cd)
 
 
+class PIDBank:
+    """Several PID channels advanced together at a fixed sample time
+
+    Unlike PID.GenOut, update() reads no clock: every call is one step of
+    sample_time, and the caller paces the loop (see scheduler.py). The
+    gains are folded into discrete-time coefficients whenever they change,
+    so a step is a few NumPy operations for all channels at once:
+
+      P = Kp * e
+      I[k] = clamp(I[k-1] + Ki * T * e, +-windup_guard)
+      D[k] = a * D[k-1] - b * (y[k] - y[k-1]),  a = tau / (tau + T), b = Kd / (tau + T)
+
+    The integrator is accumulated as its contribution to the output, so it
+    stays clamped to the windup guard and changing Ki causes no bump. The
+    derivative acts on the measurement y, not the error, so setpoint changes
+    don't kick the output, and is low-pass filtered with time constant tau
+    (derivative_filter, in seconds; 0 gives a plain difference). Gains can
+    be scalars or one value per channel.
+    """
+
+    def __init__(self, channels, sample_time=0.01, Kp=0.0, Ki=0.0, Kd=0.0, windup_guard=20.0,
+                 derivative_filter=0.0, output_limit=None):
+        self.channels = tuple(range(channels)) if isinstance(channels, int) else tuple(channels)
+        self._index = {channel: i for i, channel in enumerate(self.channels)}
+        size = len(self.channels)
+        self.sample_time = sample_time
+        self.Kp = np.zeros(size)
+        self.Ki = np.zeros(size)
+        self.Kd = np.zeros(size)
+        self.windup_guard = np.zeros(size)
+        self.derivative_filter = np.zeros(size)
+        self.output_limit = None
+        self.set_gains(Kp, Ki, Kd)
+        self.set_windup(windup_guard)
+        self.set_derivative_filter(derivative_filter)
+        self.set_output_limit(output_limit)
+        self.reset()
+
+    def _store(self, name, value, channel):
+        if channel is None:
+            getattr(self, name)[:] = value
+        else:
+            getattr(self, name)[self._index[channel]] = value
+
+    def _discretize(self):
+        """Recompute the per-step coefficients after a setting changed"""
+        self._ki_dt = self.Ki * self.sample_time
+        self._d_decay = self.derivative_filter / (self.derivative_filter + self.sample_time)
+        self._d_gain = self.Kd / (self.derivative_filter + self.sample_time)
+
+    def set_gains(self, Kp=None, Ki=None, Kd=None, channel=None):
+        """Change any of the gains, for every channel or just one"""
+        for name, value in (('Kp', Kp), ('Ki', Ki), ('Kd', Kd)):
+            if value is not None:
+                self._store(name, value, channel)
+        self._discretize()
+
+    def set_windup(self, windup_guard, channel=None):
+        """Limit the magnitude of the integral term's contribution to the output"""
+        self._store('windup_guard', windup_guard, channel)
+        self._discretize()
+
+    def set_derivative_filter(self, tau, channel=None):
+        self._store('derivative_filter', tau, channel)
+        self._discretize()
+
+    def set_sample_time(self, sample_time):
+        self.sample_time = sample_time
+        self._discretize()
+
+    def set_output_limit(self, limit):
+        """Clamp every output to +-limit (None for no clamp)"""
+        self.output_limit = limit
+
+    def reset(self):
+        """Zero the integrators and restart the derivative from the next sample"""
+        size = len(self.channels)
+        self.PTerm = np.zeros(size)
+        self.ITerm = np.zeros(size)
+        self.DTerm = np.zeros(size)
+        self.error = np.zeros(size)
+        self.output = np.zeros(size)
+        self._last_measurement = None
+
+    def update(self, measurement, setpoint=0.0):
+        """Advance every channel by one sample time and return the outputs"""
+        measurement = np.asarray(measurement, dtype=float)
+        self.error = np.asarray(setpoint, dtype=float) - measurement
+
+        self.PTerm = self.Kp * self.error
+        self.ITerm = np.clip(self.ITerm + self._ki_dt * self.error, -self.windup_guard, self.windup_guard)
+        if self._last_measurement is not None:
+            self.DTerm = self._d_decay * self.DTerm - self._d_gain * (measurement - self._last_measurement)
+        self._last_measurement = measurement
+
+        output = self.PTerm + self.ITerm + self.DTerm
+        if self.output_limit is not None:
+            output = np.clip(output, -self.output_limit, self.output_limit)
+        self.output = output
+        return output.copy()
+
+    def get_status(self, channel):
+        """Get one channel's status, in the same shape as PID.get_status()"""
+        i = self._index[channel]
+        return {
+            'P': float(self.PTerm[i]),
+            'I': float(self.ITerm[i]),
+            'D': float(self.DTerm[i]),
+            'output': float(self.output[i]),
+            'error': float(self.error[i]),
+            'settings': {
+                'Kp': float(self.Kp[i]),
+                'Ki': float(self.Ki[i]),
+                'Kd': float(self.Kd[i]),
+                'windup_guard': float(self.windup_guard[i])
+            }
+        }
+
 '''
 pid = PID()
 pid.SetKp(Kp)
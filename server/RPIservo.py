@@ -8,14 +8,18 @@ from __future__ import division
 import random
 import threading
 import time
+from concurrent.futures import Future
 
-import Adafruit_PCA9685
+import numpy as np
+
+import bus_owner
+import pwm_bus
+import trajectory
+from scheduler import DeadlineScheduler
 
 '''
 change this from 1 to -1 to reverse servos
 '''
-pwm = Adafruit_PCA9685.PCA9685()
-pwm.set_pwm_freq(50)
 
 init_pwm0 = 300
 init_pwm1 = 300
@@ -41,40 +45,73 @@ init_pwm15 = 300
 class ServoCtrl(threading.Thread):
 
     def __init__(self, *args, **kwargs):
-        self.sc_direction = [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
-        self.initPos = [init_pwm0, init_pwm1, init_pwm2, init_pwm3,
-                        init_pwm4, init_pwm5, init_pwm6, init_pwm7,
-                        init_pwm8, init_pwm9, init_pwm10, init_pwm11,
-                        init_pwm12, init_pwm13, init_pwm14, init_pwm15]
-        self.goalPos = [300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300]
-        self.nowPos = [300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300]
-        self.bufferPos = [300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0, 300.0,
-                          300.0, 300.0, 300.0]
-        self.lastPos = [300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300]
-        self.ingGoal = [300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300, 300]
-        # self.maxPos  = [560,560,560,560, 560,560,560,560 ,560,560,560,560 ,560,560,560,560]
-        self.maxPos = [520, 520, 520, 520, 520, 520, 520, 520, 520, 520, 520, 520, 520, 520, 520, 520]
-        self.minPos = [100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100, 100]
-        self.scSpeed = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        '''
+        Per-channel state is kept in 16-element NumPy arrays so that one tick
+        updates every servo with a single vectorized expression.
+        '''
+        self.sc_direction = np.ones(16, dtype=int)
+        self.initPos = np.array([init_pwm0, init_pwm1, init_pwm2, init_pwm3,
+                                 init_pwm4, init_pwm5, init_pwm6, init_pwm7,
+                                 init_pwm8, init_pwm9, init_pwm10, init_pwm11,
+                                 init_pwm12, init_pwm13, init_pwm14, init_pwm15], dtype=int)
+        self.nowPos = np.full(16, 300, dtype=int)
+        self.bufferPos = np.full(16, 300.0)
+        self.lastPos = np.full(16, 300, dtype=int)
+        # self.maxPos = np.full(16, 560, dtype=int)
+        self.maxPos = np.full(16, 520, dtype=int)
+        self.minPos = np.full(16, 100, dtype=int)
+        self.scSpeed = np.zeros(16)
+
+        '''
+        Per-servo limits for 'plan' mode, in degrees per second (squared).
+        '''
+        self.maxVel = np.full(16, 300.0)
+        self.maxAcc = np.full(16, 1500.0)
 
         self.ctrlRangeMax = 520
         self.ctrlRangeMin = 100
         self.angleRange = 180
 
         '''
-        scMode: 'init' 'auto' 'certain' 'quick' 'wiggle'
+        scMode: 'init' 'auto' 'certain' 'quick' 'wiggle' 'plan'
+        planProfile: trajectory.MIN_JERK or trajectory.TRAPEZOID
         '''
         self.scMode = 'auto'
+        self.planProfile = trajectory.MIN_JERK
+        self.planSpeedLimit = None
+        self.planDuration = 0.0
         self.scTime = 2.0
         self.scSteps = 30
 
         self.scDelay = 0.037
-        self.scMoveTime = 0.037
 
-        self.goalUpdate = 0
+        '''
+        Ticks are paced on absolute monotonic deadlines, so the time spent on
+        I2C writes no longer stretches the update period.
+        '''
+        self.scheduler = DeadlineScheduler(self.scDelay)
+
+        '''
+        goalPos is an immutable snapshot. Writers publish a new array together
+        with a bumped goalGeneration, so a running move keeps the goal it
+        started with and spots a new one with a single integer comparison.
+        '''
+        self.goalLock = threading.Lock()
+        self.goalGeneration = 0
+        self.goalPos = np.full(16, 300, dtype=int)
+        self.goalPos.setflags(write=False)
+        self.arrival = None
+
         self.wiggleID = 0
         self.wiggleDirection = 1
 
+        '''
+        Writes go through the I2C bus owner at this controller's priority,
+        e.g. bus_owner.PRIORITY_HEAD for the camera pan/tilt controllers.
+        '''
+        self.priority = kwargs.pop('priority', bus_owner.PRIORITY_MOTION)
+        self.frame = pwm_bus.PWMFrame(bus_owner.get_bus().pwm_client(self.priority))
+
         super(ServoCtrl, self).__init__(*args, **kwargs)
         self.__flag = threading.Event()
         self.__flag.clear()
@@ -87,137 +124,237 @@ class ServoCtrl(threading.Thread):
         print('resume')
         self.__flag.set()
 
+    def publishGoal(self, ID, goalInput, arrival=None):
+        '''
+        Publish a new goal snapshot with the channels in ID (all if None) replaced.
+        A pending arrival Future of the previous goal resolves to False.
+        '''
+        with self.goalLock:
+            if self.arrival is not None and not self.arrival.done():
+                self.arrival.set_result(False)
+            self.arrival = arrival
+            newGoal = self.goalPos.copy()
+            if ID is None:
+                newGoal[:] = goalInput
+            else:
+                newGoal[np.asarray(ID, dtype=int)] = goalInput
+            newGoal.setflags(write=False)
+            self.goalPos = newGoal
+            self.goalGeneration += 1
+            return self.goalGeneration
+
+    def goalSnapshot(self):
+        with self.goalLock:
+            return self.goalPos, self.goalGeneration
+
+    def goalReached(self, generation):
+        with self.goalLock:
+            if self.goalGeneration == generation and self.arrival is not None and not self.arrival.done():
+                self.arrival.set_result(True)
+
     def moveInit(self):
         self.scMode = 'init'
-        for i in range(0, 16):
-            pwm.set_pwm(i, 0, self.initPos[i])
-            self.lastPos[i] = self.initPos[i]
-            self.nowPos[i] = self.initPos[i]
-            self.bufferPos[i] = float(self.initPos[i])
-            self.goalPos[i] = self.initPos[i]
+        self.lastPos[:] = self.initPos
+        self.nowPos[:] = self.initPos
+        self.bufferPos[:] = self.initPos
+        self.publishGoal(None, self.initPos)
+        self.stageAll()
+        self.frame.commit()
         self.pause()
 
     def initConfig(self, ID, initInput, moveTo):
         if initInput > self.minPos[ID] and initInput < self.maxPos[ID]:
             self.initPos[ID] = initInput
             if moveTo:
-                pwm.set_pwm(ID, 0, self.initPos[ID])
+                self.frame.set_pwm(ID, 0, self.initPos[ID])
         else:
             print('initPos Value Error.')
 
     def moveServoInit(self, ID):
         self.scMode = 'init'
-        for i in range(0, len(ID)):
-            pwm.set_pwm(ID[i], 0, self.initPos[ID[i]])
-            self.lastPos[ID[i]] = self.initPos[ID[i]]
-            self.nowPos[ID[i]] = self.initPos[ID[i]]
-            self.bufferPos[ID[i]] = float(self.initPos[ID[i]])
-            self.goalPos[ID[i]] = self.initPos[ID[i]]
+        ID = np.asarray(ID, dtype=int)
+        self.lastPos[ID] = self.initPos[ID]
+        self.nowPos[ID] = self.initPos[ID]
+        self.bufferPos[ID] = self.initPos[ID]
+        self.publishGoal(ID, self.initPos[ID])
+        for i in ID:
+            self.frame.stage(i, self.nowPos[i])
+        self.frame.commit()
         self.pause()
 
     def posUpdate(self):
-        self.goalUpdate = 1
-        for i in range(0, 16):
-            self.lastPos[i] = self.nowPos[i]
-        self.goalUpdate = 0
+        self.lastPos[:] = self.nowPos
 
     def speedUpdate(self, IDinput, speedInput):
-        for i in range(0, len(IDinput)):
-            self.scSpeed[IDinput[i]] = speedInput[i]
+        self.scSpeed[np.asarray(IDinput, dtype=int)] = speedInput
+
+    def stageAll(self):
+        for i, pos in enumerate(self.nowPos.tolist()):
+            self.frame.stage(i, pos)
+
+    def autoStep(self, i, goal):
+        '''
+        Next positions for step i of an 'auto' move, linear from lastPos to goal.
+        '''
+        nextPos = np.rint(self.lastPos + (goal - self.lastPos) / self.scSteps * (i + 1))
+        return np.clip(nextPos, self.minPos, self.maxPos).astype(int)
+
+    def certStep(self, goal):
+        '''
+        Advance bufferPos by one 'certain' tick and return the next positions.
+        Channels already at their goal keep their current position.
+        '''
+        direction = np.sign(goal - self.lastPos)
+        self.bufferPos += direction * self.pwmGenOutArray(self.scSpeed) * self.scDelay
+        nextPos = np.rint(self.bufferPos).astype(int)
+        nextPos = np.where(direction > 0, np.minimum(nextPos, goal), nextPos)
+        nextPos = np.where(direction < 0, np.maximum(nextPos, goal), nextPos)
+        nextPos = np.where(direction == 0, self.nowPos, nextPos)
+        return np.clip(nextPos, self.minPos, self.maxPos)
 
     def moveAuto(self):
-        for i in range(0, 16):
-            self.ingGoal[i] = self.goalPos[i]
+        goal, generation = self.goalSnapshot()
+        self.scheduler.start(self.scTime / self.scSteps)
 
         for i in range(0, self.scSteps):
-            for dc in range(0, 16):
-                if not self.goalUpdate:
-                    self.nowPos[dc] = int(
-                        round((self.lastPos[dc] + (((self.goalPos[dc] - self.lastPos[dc]) / self.scSteps) * (i + 1))),
-                              0))
-                    pwm.set_pwm(dc, 0, self.nowPos[dc])
-
-                if self.ingGoal != self.goalPos:
-                    self.posUpdate()
-                    time.sleep(self.scTime / self.scSteps)
-                    return 1
-            time.sleep((self.scTime / self.scSteps - self.scMoveTime))
+            self.nowPos[:] = self.autoStep(i, goal)
+            self.stageAll()
+            self.frame.commit()
+
+            if self.goalGeneration != generation:
+                self.posUpdate()
+                self.scheduler.wait()
+                return 1
+            self.scheduler.wait()
 
         self.posUpdate()
         self.pause()
         return 0
 
     def moveCert(self):
-        for i in range(0, 16):
-            self.ingGoal[i] = self.goalPos[i]
-            self.bufferPos[i] = self.lastPos[i]
-
-        while self.nowPos != self.goalPos:
-            for i in range(0, 16):
-                if self.lastPos[i] < self.goalPos[i]:
-                    self.bufferPos[i] += self.pwmGenOut(self.scSpeed[i]) / (1 / self.scDelay)
-                    newNow = int(round(self.bufferPos[i], 0))
-                    if newNow > self.goalPos[i]: newNow = self.goalPos[i]
-                    self.nowPos[i] = newNow
-                elif self.lastPos[i] > self.goalPos[i]:
-                    self.bufferPos[i] -= self.pwmGenOut(self.scSpeed[i]) / (1 / self.scDelay)
-                    newNow = int(round(self.bufferPos[i], 0))
-                    if newNow < self.goalPos[i]: newNow = self.goalPos[i]
-                    self.nowPos[i] = newNow
-
-                if not self.goalUpdate:
-                    pwm.set_pwm(i, 0, self.nowPos[i])
-
-                if self.ingGoal != self.goalPos:
-                    self.posUpdate()
-                    return 1
+        goal, generation = self.goalSnapshot()
+        self.bufferPos[:] = self.lastPos
+        self.scheduler.start(self.scDelay)
+
+        while not np.array_equal(self.nowPos, goal):
+            self.nowPos[:] = self.certStep(goal)
+            self.stageAll()
+            self.frame.commit()
+
+            if self.goalGeneration != generation:
+                self.posUpdate()
+                return 1
             self.posUpdate()
-            time.sleep(self.scDelay - self.scMoveTime)
+            self.scheduler.wait()
 
         else:
             self.pause()
             return 0
 
+    def movePlan(self):
+        '''
+        Play a profile sampled once for the current goal; a new goal replans
+        from wherever the servos are.
+        '''
+        goal, generation = self.goalSnapshot()
+        scale = (self.ctrlRangeMax - self.ctrlRangeMin) / self.angleRange
+        maxVel = self.maxVel if self.planSpeedLimit is None else np.minimum(self.maxVel, self.planSpeedLimit)
+        samples = trajectory.plan(self.nowPos, goal, self.scDelay, maxVel * scale, self.maxAcc * scale,
+                                  self.planProfile, self.planDuration)
+        self.scheduler.start(self.scDelay)
+
+        for row in samples:
+            self.nowPos[:] = np.clip(np.rint(row), self.minPos, self.maxPos)
+            self.stageAll()
+            self.frame.commit()
+
+            if self.goalGeneration != generation:
+                self.posUpdate()
+                return 1
+            self.scheduler.wait()
+
+        self.posUpdate()
+        self.pause()
+        self.goalReached(generation)
+        return 0
+
     def pwmGenOut(self, angleInput):
         return int(round(((self.ctrlRangeMax - self.ctrlRangeMin) / self.angleRange * angleInput), 0))
 
+    def pwmGenOutArray(self, angleInput):
+        return np.rint((self.ctrlRangeMax - self.ctrlRangeMin) / self.angleRange * np.asarray(angleInput))
+
     def setAutoTime(self, autoSpeedSet):
         self.scTime = autoSpeedSet
 
     def setDelay(self, delaySet):
         self.scDelay = delaySet
 
+    def angleGoal(self, ID, angleInput):
+        ID = np.asarray(ID, dtype=int)
+        newGoal = self.initPos[ID] + self.pwmGenOutArray(angleInput).astype(int) * self.sc_direction[ID]
+        return np.clip(newGoal, self.minPos[ID], self.maxPos[ID])
+
     def autoSpeed(self, ID, angleInput):
         self.scMode = 'auto'
-        self.goalUpdate = 1
-        for i in range(0, len(ID)):
-            newGoal = self.initPos[ID[i]] + self.pwmGenOut(angleInput[i]) * self.sc_direction[ID[i]]
-            if newGoal > self.maxPos[ID[i]]:
-                newGoal = self.maxPos[ID[i]]
-            elif newGoal < self.minPos[ID[i]]:
-                newGoal = self.minPos[ID[i]]
-            self.goalPos[ID[i]] = newGoal
-        self.goalUpdate = 0
+        self.publishGoal(ID, self.angleGoal(ID, angleInput))
         self.resume()
 
     def certSpeed(self, ID, angleInput, speedSet):
         self.scMode = 'certain'
-        self.goalUpdate = 1
-        for i in range(0, len(ID)):
-            newGoal = self.initPos[ID[i]] + self.pwmGenOut(angleInput[i]) * self.sc_direction[ID[i]]
-            if newGoal > self.maxPos[ID[i]]:
-                newGoal = self.maxPos[ID[i]]
-            elif newGoal < self.minPos[ID[i]]:
-                newGoal = self.minPos[ID[i]]
-            self.goalPos[ID[i]] = newGoal
         self.speedUpdate(ID, speedSet)
-        self.goalUpdate = 0
+        self.publishGoal(ID, self.angleGoal(ID, angleInput))
         self.resume()
 
+    def planSpeed(self, ID, angleInput, profile=None):
+        self.scMode = 'plan'
+        if profile is not None:
+            self.planProfile = profile
+        self.planSpeedLimit = None
+        self.planDuration = 0.0
+        self.publishGoal(ID, self.angleGoal(ID, angleInput))
+        self.resume()
+
+    def moveTo(self, ID, PWM_input, speedSet=None, duration=0.0):
+        '''
+        Drive every channel in ID to its absolute PWM goal so that they all
+        arrive on the same tick, at most speedSet degrees per second and taking
+        at least duration seconds. Returns a Future that resolves to True on
+        arrival, or to False if another goal replaces this one first.
+        '''
+        ID = np.asarray(ID, dtype=int)
+        arrival = Future()
+        self.scMode = 'plan'
+        self.planSpeedLimit = speedSet
+        self.planDuration = duration
+        self.publishGoal(ID, np.clip(PWM_input, self.minPos[ID], self.maxPos[ID]), arrival)
+        self.resume()
+        return arrival
+
+    def moveTime(self, ID, PWM_input, speedSet=None, duration=0.0):
+        '''
+        Seconds a moveTo() with the same arguments would take from where the
+        servos are now.
+        '''
+        ID = np.asarray(ID, dtype=int)
+        scale = (self.ctrlRangeMax - self.ctrlRangeMin) / self.angleRange
+        maxVel = self.maxVel[ID] if speedSet is None else np.minimum(self.maxVel[ID], speedSet)
+        distance = np.clip(PWM_input, self.minPos[ID], self.maxPos[ID]) - self.nowPos[ID]
+        if self.planProfile == trajectory.TRAPEZOID:
+            times = trajectory.trapezoid_duration(distance, maxVel * scale, self.maxAcc[ID] * scale)
+        else:
+            times = trajectory.min_jerk_duration(distance, maxVel * scale, self.maxAcc[ID] * scale)
+        return max(float(np.max(times, initial=0.0)), duration)
+
+    def setLimits(self, ID, maxVel, maxAcc):
+        ID = np.asarray(ID, dtype=int)
+        self.maxVel[ID] = maxVel
+        self.maxAcc[ID] = maxAcc
+
     def moveWiggle(self):
         self.bufferPos[self.wiggleID] += self.wiggleDirection * self.sc_direction[self.wiggleID] * self.pwmGenOut(
             self.scSpeed[self.wiggleID]) / (1 / self.scDelay)
-        newNow = int(round(self.bufferPos[self.wiggleID], 0))
+        newNow = int(np.rint(self.bufferPos[self.wiggleID]))
         if self.bufferPos[self.wiggleID] > self.maxPos[self.wiggleID]:
             self.bufferPos[self.wiggleID] = self.maxPos[self.wiggleID]
         elif self.bufferPos[self.wiggleID] < self.minPos[self.wiggleID]:
@@ -226,10 +363,10 @@ class ServoCtrl(threading.Thread):
         self.lastPos[self.wiggleID] = newNow
         if self.bufferPos[self.wiggleID] < self.maxPos[self.wiggleID] and self.bufferPos[self.wiggleID] > self.minPos[
             self.wiggleID]:
-            pwm.set_pwm(self.wiggleID, 0, self.nowPos[self.wiggleID])
+            self.frame.set_pwm(self.wiggleID, 0, self.nowPos[self.wiggleID])
         else:
             self.stopWiggle()
-        time.sleep(self.scDelay - self.scMoveTime)
+        self.scheduler.wait()
 
     def stopWiggle(self):
         self.pause()
@@ -240,6 +377,7 @@ class ServoCtrl(threading.Thread):
         self.wiggleDirection = direcInput
         self.scSpeed[ID] = speedSet
         self.scMode = 'wiggle'
+        self.scheduler.start(self.scDelay)
         self.posUpdate()
         self.resume()
 
@@ -250,7 +388,7 @@ class ServoCtrl(threading.Thread):
         elif self.nowPos[ID] < self.minPos[ID]:
             self.nowPos[ID] = self.minPos[ID]
         self.lastPos[ID] = self.nowPos[ID]
-        pwm.set_pwm(ID, 0, self.nowPos[ID])
+        self.frame.set_pwm(ID, 0, self.nowPos[ID])
 
     def scMove(self):
         if self.scMode == 'init':
@@ -261,13 +399,15 @@ class ServoCtrl(threading.Thread):
             self.moveCert()
         elif self.scMode == 'wiggle':
             self.moveWiggle()
+        elif self.scMode == 'plan':
+            self.movePlan()
 
     def setPWM(self, ID, PWM_input):
         self.lastPos[ID] = PWM_input
         self.nowPos[ID] = PWM_input
         self.bufferPos[ID] = float(PWM_input)
-        self.goalPos[ID] = PWM_input
-        pwm.set_pwm(ID, 0, PWM_input)
+        self.publishGoal(ID, PWM_input)
+        self.frame.set_pwm(ID, 0, PWM_input)
         self.pause()
 
     def run(self):
@@ -276,6 +416,9 @@ class ServoCtrl(threading.Thread):
             self.scMove()
             pass
 
+    def timingStats(self):
+        return self.scheduler.get_stats()
+
     def cleanup(self):
         pass
 
@@ -19,10 +19,14 @@ camera = Camera()
 
 def gen(camera):
     """Video streaming generator function."""
-    while True:
-        frame = camera.get_frame()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    client = camera.frame_client()
+    try:
+        while True:
+            frame = client.next()
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    finally:
+        client.close()
 
 
 @app.route('/video_feed')
@@ -0,0 +1,115 @@
+"""Fixed-rate closed-loop balance control
+
+One BalanceController step takes the newest IMU sample, runs it through
+the balance Kalman filter and the x/y PIDBank, accumulates the PID output
+into body tilt corrections and mixes those into a height offset per leg.
+The caller applies the offsets (move stages them for all six legs and
+commits one PWM burst), and tick() paces the whole loop on a
+DeadlineScheduler so it runs at a fixed rate with loop-time statistics.
+
+The mix is the one the original Adeept steady() used: front and rear legs
+follow the x (pitch) and y (roll) corrections, the middle legs only roll
+but carry half of the pitch correction either way.
+"""
+import time
+
+import numpy as np
+
+from scheduler import DeadlineScheduler
+
+LEGS = ('left_I', 'left_II', 'left_III', 'right_I', 'right_II', 'right_III')
+
+# Height offset per leg = MIX @ (x_fix, y_fix) + MIDDLE * |x_fix|
+MIX = np.array([
+    [1, 1],    # left_I
+    [0, 1],    # left_II
+    [-1, 1],   # left_III
+    [-1, -1],  # right_I
+    [0, -1],   # right_II
+    [1, -1],   # right_III
+], dtype=float)
+MIDDLE = np.array([0, 0.5, 0, 0, 0.5, 0])
+
+DEFAULT_RATE = 100
+
+
+class BalanceController:
+    """IMU sample -> Kalman filter -> PID -> per-leg height offsets
+
+    read() returns the latest sample for kalman.update(); apply(heights)
+    receives one int offset per leg in LEGS order. Corrections are held
+    within +-range_max and leg offsets within [range_min, range_max].
+    A sample whose 'timestamp' was already stepped on is skipped, since
+    the FIFO sampler publishes in bursts slower than this loop runs.
+    """
+
+    def __init__(self, read, kalman, pid, apply, range_min, range_max, rate=DEFAULT_RATE,
+                 scheduler=None, clock=time.perf_counter):
+        self.read = read
+        self.kalman = kalman
+        self.pid = pid
+        self.apply = apply
+        self.range_min = range_min
+        self.range_max = range_max
+        self.pid.set_sample_time(1.0 / rate)
+        self.scheduler = scheduler or DeadlineScheduler(1.0 / rate)
+        self._clock = clock
+        self.correction = np.zeros(2)
+        self.tilt = np.zeros(2)
+        self.heights = np.zeros(len(LEGS), dtype=int)
+        self.last_timestamp = None
+        self.reset_stats()
+
+    def step(self, sample, target=(0.0, 0.0)):
+        """Run one control step on a sample and return the leg offsets"""
+        self.kalman.update(sample)
+        self.tilt = np.array([self.kalman.value('x'), self.kalman.value('y')])
+        self.correction = np.clip(self.correction + self.pid.update(self.tilt, target),
+                                  -self.range_max, self.range_max)
+        heights = MIX @ self.correction + MIDDLE * abs(self.correction[0])
+        self.heights = np.clip(heights, self.range_min, self.range_max).astype(int)
+        return self.heights
+
+    def tick(self, target=(0.0, 0.0)):
+        """Read, step and apply once, then wait for the next period"""
+        started = self._clock()
+        sample = self.read()
+        timestamp = sample.get('timestamp')
+        if timestamp is not None and timestamp == self.last_timestamp:
+            # Nothing new since the last step; stepping again would count the
+            # same error twice in I and feed D a zero delta
+            self.stale += 1
+        else:
+            self.last_timestamp = timestamp
+            self.apply(self.step(sample, target))
+        work = self._clock() - started
+        self.ticks += 1
+        self.work_total += work
+        self.work_max = max(self.work_max, work)
+        self.scheduler.wait()
+
+    def reset(self):
+        """Forget the accumulated correction, e.g. when steady mode restarts"""
+        self.correction = np.zeros(2)
+        self.pid.reset()
+        self.scheduler.start()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.stale = 0
+        self.work_total = 0.0
+        self.work_max = 0.0
+        self.scheduler.reset_stats()
+
+    def get_stats(self):
+        """Get loop timing statistics (times in seconds)"""
+        stats = self.scheduler.get_stats()
+        stats.update({
+            'rate': 1.0 / self.scheduler.period,
+            'stale': self.stale,
+            'work_mean': self.work_total / self.ticks if self.ticks else 0.0,
+            'work_max': self.work_max,
+            'tilt': self.tilt.tolist(),
+            'heights': self.heights.tolist(),
+        })
+        return stats
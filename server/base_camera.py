@@ -1,5 +1,6 @@
 import threading
 import time
+from collections import OrderedDict
 
 try:
     from greenlet import getcurrent as get_ident
@@ -10,54 +11,125 @@ except ImportError:
         from _thread import get_ident
 
 
-class CameraEvent(object):
-    """An Event-like class that signals all active clients when a new frame is
-    available.
+CLIENT_TIMEOUT = 5  # seconds without a request before a client is reaped
+
+
+class FrameClient(object):
+    """One viewer's position in the frame sequence."""
+
+    def __init__(self, bus, key):
+        self.bus = bus
+        self.key = key
+        self.last_seq = 0
+        self.received = 0
+        self.dropped = 0
+        self.last_seen = time.monotonic()
+
+    def next(self, timeout=None):
+        """Block until a frame newer than the last one returned, then return it.
+
+        Frames published in between are skipped and counted as dropped.
+        """
+        return self.bus.next_frame(self, timeout)
+
+    def close(self):
+        self.bus.remove(self)
+
+
+class FrameBus(object):
+    """Broadcasts camera frames to any number of clients.
+
+    Every published frame gets the next sequence number. Clients wait on
+    one shared Condition for a frame newer than the last one they saw, so
+    publishing costs a single notify_all no matter how many clients there
+    are. Clients are kept in least-recently-seen order: reaping idle ones
+    only looks at the front of that order.
     """
 
-    def __init__(self):
-        self.events = {}
-
-    def wait(self):
-        """Invoked from each client's thread to wait for the next frame."""
-        ident = get_ident()
-        if ident not in self.events:
-            # this is a new client
-            # add an entry for it in the self.events dict
-            # each entry has two elements, a threading.Event() and a timestamp
-            self.events[ident] = [threading.Event(), time.time()]
-        return self.events[ident][0].wait()
-
-    def set(self):
+    def __init__(self, client_timeout=CLIENT_TIMEOUT):
+        self.client_timeout = client_timeout
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        self.timestamp = None
+        self.clients = OrderedDict()
+        self.reaped = 0
+
+    def publish(self, frame):
         """Invoked by the camera thread when a new frame is available."""
-        now = time.time()
-        remove = None
-        for ident, event in self.events.items():
-            if not event[0].isSet():
-                # if this client's event is not set, then set it
-                # also update the last set timestamp to now
-                event[0].set()
-                event[1] = now
-            else:
-                # if the client's event is already set, it means the client
-                # did not process a previous frame
-                # if the event stays set for more than 5 seconds, then assume
-                # the client is gone and remove it
-                if now - event[1] > 5:
-                    remove = ident
-        if remove:
-            del self.events[remove]
-
-    def clear(self):
-        """Invoked from each client's thread after a frame was processed."""
-        self.events[get_ident()][0].clear()
+        with self.condition:
+            self.seq += 1
+            self.frame = frame
+            self.timestamp = time.monotonic()
+            self.condition.notify_all()
+        return self.seq
+
+    def wait_for(self, after_seq=0, timeout=None):
+        """Return (seq, frame) of the first frame newer than after_seq."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after_seq, timeout):
+                raise TimeoutError(f"No frame after #{after_seq} within {timeout}s")
+            return self.seq, self.frame
+
+    def client(self, key=None):
+        """Get the client registered under key, or a new anonymous one."""
+        with self.condition:
+            self._reap()
+            client = self.clients.get(key) if key is not None else None
+            if client is None:
+                client = FrameClient(self, key if key is not None else object())
+                self.clients[client.key] = client
+            return client
+
+    def next_frame(self, client, timeout=None):
+        """Wait for a frame newer than the client's last one and account for it.
+
+        Waking up and bookkeeping share one lock acquisition per client per
+        frame, which a Condition needs anyway.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > client.last_seq, timeout):
+                raise TimeoutError(f"No frame after #{client.last_seq} within {timeout}s")
+            if client.last_seq:
+                client.dropped += self.seq - client.last_seq - 1
+            client.last_seq = self.seq
+            client.received += 1
+            client.last_seen = time.monotonic()
+            # Re-adds a client that was reaped while the camera stalled
+            self.clients[client.key] = client
+            self.clients.move_to_end(client.key)
+            self._reap()
+            return self.frame
+
+    def remove(self, client):
+        with self.condition:
+            self.clients.pop(client.key, None)
+
+    def _reap(self):
+        # Oldest first, so this stops at the first client still active
+        deadline = time.monotonic() - self.client_timeout
+        while self.clients:
+            key, client = next(iter(self.clients.items()))
+            if client.last_seen > deadline:
+                break
+            del self.clients[key]
+            self.reaped += 1
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                'seq': self.seq,
+                'clients': len(self.clients),
+                'reaped': self.reaped,
+                'dropped': sum(client.dropped for client in self.clients.values()),
+            }
 
 
 class BaseCamera(object):
     thread = None  # background thread that reads frames from camera
     frame = None  # current frame is stored here by background thread
     last_access = 0  # time of last client access to the camera
-    event = CameraEvent()
+    bus = FrameBus()
 
     def __init__(self):
         """Start the background camera thread if it isn't running yet."""
@@ -69,18 +141,17 @@ class BaseCamera(object):
             BaseCamera.thread.start()
 
             # wait until frames are available
-            while self.get_frame() is None:
-                time.sleep(0)
+            BaseCamera.bus.wait_for(0)
 
     def get_frame(self):
-        """Return the current camera frame."""
+        """Return the next camera frame for the calling thread."""
         BaseCamera.last_access = time.time()
+        return BaseCamera.bus.client(get_ident()).next()
 
-        # wait for a signal from the camera thread
-        BaseCamera.event.wait()
-        BaseCamera.event.clear()
-
-        return BaseCamera.frame
+    def frame_client(self):
+        """A client of its own for a stream that may hop between threads."""
+        BaseCamera.last_access = time.time()
+        return BaseCamera.bus.client()
 
     @staticmethod
     def frames():
@@ -94,8 +165,7 @@ class BaseCamera(object):
         frames_iterator = cls.frames()
         for frame in frames_iterator:
             BaseCamera.frame = frame
-            BaseCamera.event.set()  # send signal to clients
-            time.sleep(0)
+            BaseCamera.bus.publish(frame)  # send signal to clients
 
             # if there hasn't been any clients asking for frames in
             # the last 10 seconds then stop the thread
@@ -0,0 +1,204 @@
+"""Single owner thread for the shared I2C bus
+
+The PCA9685 servo driver and the MPU6050 sit on the same I2C bus, and used
+to be driven directly by whichever thread happened to need them. BusOwner
+is the only thread that touches the chips. Everyone else gets a client
+object with the usual set_pwm()/get_accel_data() interface that enqueues
+the request at a fixed priority.
+
+Queues are per priority collections.deque instances (append and popleft
+are atomic), so producers never take a lock. The owner always drains the
+most urgent non-empty queue first and coalesces repeated writes to the
+same channel into the latest value before bursting them through a
+PWMFrame.
+
+With SIMULATE_HARDWARE=true the bus drives pca9685_sim.SimulatedPCA9685
+instead of the real chip, so nothing has to be imported from the Pi-only
+Adafruit driver.
+"""
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import pwm_bus
+
+logger = logging.getLogger(__name__)
+
+# Environment variable to control hardware simulation
+SIMULATE_HARDWARE = os.getenv('SIMULATE_HARDWARE', 'false').lower() == 'true'
+
+# Request priorities, most urgent first
+PRIORITY_BALANCE = 0
+PRIORITY_MOTION = 1
+PRIORITY_HEAD = 2
+PRIORITY_BACKGROUND = 3
+PRIORITY_LEVELS = 4
+
+_WRITE = 0
+_CALL = 1
+
+
+class BusOwner(threading.Thread):
+    """Serializes all PCA9685 and MPU6050 traffic on one thread"""
+
+    def __init__(self, pwm, sensor=None):
+        super(BusOwner, self).__init__(daemon=True)
+        self.pwm = pwm
+        self.frame = pwm_bus.PWMFrame(pwm)
+        self.sensor = sensor
+        self._queues = [deque() for _ in range(PRIORITY_LEVELS)]
+        self._wakeup = threading.Event()
+
+        self.writes = 0
+        self.calls = 0
+        self.transactions = 0
+        self.errors = 0
+
+    def attach_sensor(self, sensor):
+        """Hand the IMU over to the bus owner"""
+        self.sensor = sensor
+
+    def write(self, channel, on, off, priority=PRIORITY_MOTION):
+        """Queue a channel write; later writes to the same channel win"""
+        self._queues[priority].append((_WRITE, channel, on, off))
+        self._wakeup.set()
+
+    def submit(self, func, *args, priority=PRIORITY_MOTION):
+        """Run func(*args) on the bus thread and return a Future for its result"""
+        future = Future()
+        self._queues[priority].append((_CALL, func, args, future))
+        self._wakeup.set()
+        return future
+
+    def flush(self, priority=PRIORITY_BACKGROUND, timeout=None):
+        """Block until everything queued at or above priority has been sent"""
+        self.submit(lambda: None, priority=priority).result(timeout)
+
+    def pwm_client(self, priority=PRIORITY_MOTION):
+        return BusPWM(self, priority)
+
+    def sensor_client(self, priority=PRIORITY_BALANCE):
+        return BusSensor(self, priority)
+
+    def run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            level = self._next_level()
+            while level is not None:
+                self._drain(level)
+                level = self._next_level()
+
+    def _next_level(self):
+        for level, queue in enumerate(self._queues):
+            if queue:
+                return level
+        return None
+
+    def _drain(self, level):
+        """Process one priority level, stopping early if a more urgent request arrives"""
+        queue = self._queues[level]
+        while queue:
+            kind, *request = queue.popleft()
+            if kind == _WRITE:
+                channel, on, off = request
+                self.frame.stage(channel, off, on)
+                self.writes += 1
+            else:
+                self._commit()
+                func, args, future = request
+                self.calls += 1
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    self.errors += 1
+                    future.set_exception(e)
+            if any(self._queues[:level]):
+                break
+        self._commit()
+
+    def _commit(self):
+        try:
+            self.transactions += self.frame.commit()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"I2C write failed: {e}")
+
+    def get_stats(self):
+        """Get bus traffic counters"""
+        return {
+            'writes': self.writes,
+            'calls': self.calls,
+            'transactions': self.transactions,
+            'errors': self.errors,
+            'queued': [len(queue) for queue in self._queues],
+            'pwm_cache': self.pwm.get_stats() if hasattr(self.pwm, 'get_stats') else None,
+        }
+
+
+class BusPWM:
+    """PCA9685 stand-in that routes writes through the bus owner at one priority"""
+
+    def __init__(self, bus, priority):
+        self.bus = bus
+        self.priority = priority
+
+    def set_pwm(self, channel, on, off):
+        self.bus.write(channel, on, off, self.priority)
+
+    def set_all_pwm(self, on, off):
+        self.bus.submit(self.bus.pwm.set_all_pwm, on, off, priority=self.priority).result()
+
+    def set_pwm_freq(self, freq_hz):
+        self.bus.submit(self.bus.pwm.set_pwm_freq, freq_hz, priority=self.priority).result()
+
+    def flush(self, timeout=None):
+        self.bus.flush(self.priority, timeout)
+
+    def get_stats(self):
+        return self.bus.get_stats()
+
+
+class BusSensor:
+    """MPU6050 stand-in whose reads run on the bus owner thread"""
+
+    def __init__(self, bus, priority):
+        self.bus = bus
+        self.priority = priority
+
+    def get_accel_data(self, timeout=1.0):
+        return self.bus.submit(self.bus.sensor.get_accel_data, priority=self.priority).result(timeout)
+
+    def __getattr__(self, name):
+        method = getattr(self.bus.sensor, name)
+        if not callable(method):
+            return method
+        return lambda *args: self.bus.submit(method, *args, priority=self.priority).result()
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def create_pca9685():
+    """Real PCA9685 driver, or the simulated one when SIMULATE_HARDWARE is set"""
+    if SIMULATE_HARDWARE:
+        import pca9685_sim
+        logger.info("Using simulated PCA9685")
+        return pca9685_sim.SimulatedPCA9685()
+    import Adafruit_PCA9685
+    return Adafruit_PCA9685.PCA9685()
+
+
+def get_bus():
+    """Return the process-wide bus owner, starting it on first use"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            pwm = pwm_bus.ShadowPCA9685(create_pca9685())
+            pwm.set_pwm_freq(50)
+            _bus = BusOwner(pwm)
+            _bus.start()
+        return _bus
@@ -7,12 +7,16 @@ import cv2
 import imutils
 import numpy as np
 
+import Kalman_filter
 import PID
+import line_scan
 import move
 import robotLight
 import switch
 from base_camera import BaseCamera
-from initialization import kalman_filter_X, kalman_filter_Y, sc
+from color_tracker import DEFAULT_SCALE, MAX_MISSES, ColorTracker, PredictiveColorTracker
+from frame_pipeline import JPEGPipeline
+from initialization import sc
 
 led = robotLight.RobotLight()
 pid = PID.PID()
@@ -29,6 +33,10 @@ findLineError = 60
 
 colorUpper = np.array([44, 255, 255])
 colorLower = np.array([24, 100, 100])
+# Color tracking runs on frames shrunk by this factor
+COLOR_TRACK_SCALE = float(os.environ.get('COLOR_TRACK_SCALE', DEFAULT_SCALE))
+# Misses in the predicted window before the full frame is searched again
+COLOR_TRACK_MISSES = int(os.environ.get('COLOR_TRACK_MISSES', MAX_MISSES))
 
 
 class CVThread(threading.Thread):
@@ -47,6 +55,11 @@ class CVThread(threading.Thread):
     Y_lock = 0
     X_lock = 0
     tor = 27
+    # Pixel errors get their own filter; the IMU filters follow a different signal.
+    # Errors jump by up to +-320 px when the target moves, so keep the baseline's
+    # large-jump blending for them
+    errorFilter = Kalman_filter.VectorKalmanFilter(('x', 'y'), 0.01, 0.1, jump_threshold=60)
+    colorTracker = PredictiveColorTracker(ColorTracker(COLOR_TRACK_SCALE), max_misses=COLOR_TRACK_MISSES)
 
     scGear = sc
     scGear.moveInit()
@@ -111,12 +124,14 @@ class CVThread(threading.Thread):
                 cv2.rectangle(imgInput, (int(self.box_x - self.radius), int(self.box_y + self.radius)),
                               (int(self.box_x + self.radius), int(self.box_y - self.radius)), (255, 255, 255), 1)
 
+            roi = CVThread.colorTracker.roi
+            if roi is not None:
+                cv2.rectangle(imgInput, roi[:2], (roi[2] - 1, roi[3] - 1), (128, 128, 128), 1)
+
         elif self.CVMode == 'findlineCV':
-            if frameRender:
-                imgInput = cv2.cvtColor(imgInput, cv2.COLOR_BGR2GRAY)
-                retval_bw, imgInput = cv2.threshold(imgInput, 0, 255, cv2.THRESH_OTSU)
-                imgInput = cv2.erode(imgInput, None, iterations=6)
             try:
+                if frameRender:
+                    imgInput = line_scan.paste_bands(imgInput, self.lineScan)
                 if lineColorSet == 255:
                     cv2.putText(imgInput, ('Following White Line'), (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
                                 (128, 255, 128), 1, cv2.LINE_AA)
@@ -222,42 +237,18 @@ class CVThread(threading.Thread):
                 pass
 
     def findlineCV(self, frame_image):
-        frame_findline = cv2.cvtColor(frame_image, cv2.COLOR_BGR2GRAY)
-        retval, frame_findline = cv2.threshold(frame_findline, 0, 255, cv2.THRESH_OTSU)
-        frame_findline = cv2.erode(frame_findline, None, iterations=6)
-        colorPos_1 = frame_findline[linePos_1]
-        colorPos_2 = frame_findline[linePos_2]
-        try:
-            lineColorCount_Pos1 = np.sum(colorPos_1 == lineColorSet)
-            lineColorCount_Pos2 = np.sum(colorPos_2 == lineColorSet)
-
-            lineIndex_Pos1 = np.where(colorPos_1 == lineColorSet)
-            lineIndex_Pos2 = np.where(colorPos_2 == lineColorSet)
-
-            if lineColorCount_Pos1 == 0:
-                lineColorCount_Pos1 = 1
-            if lineColorCount_Pos2 == 0:
-                lineColorCount_Pos2 = 1
-
-            self.left_Pos1 = lineIndex_Pos1[0][lineColorCount_Pos1 - 1]
-            self.right_Pos1 = lineIndex_Pos1[0][0]
-            self.center_Pos1 = int((self.left_Pos1 + self.right_Pos1) / 2)
-
-            self.left_Pos2 = lineIndex_Pos2[0][lineColorCount_Pos2 - 1]
-            self.right_Pos2 = lineIndex_Pos2[0][0]
-            self.center_Pos2 = int((self.left_Pos2 + self.right_Pos2) / 2)
-
-            self.center = int((self.center_Pos1 + self.center_Pos2) / 2)
-        except:
-            center = None
-            pass
+        # Only the bands around the two scanlines are binarized and eroded
+        self.lineScan = line_scan.scan_lines(frame_image, (linePos_1, linePos_2), lineColorSet)
+        if self.lineScan.center is not None:
+            self.left_Pos1, self.left_Pos2 = self.lineScan.end.tolist()
+            self.right_Pos1, self.right_Pos2 = self.lineScan.start.tolist()
+            self.center = self.lineScan.center
 
         self.findLineCtrl(self.center, 320)
         self.pause()
 
-    def servoMove(ID, Dir, errorInput):
+    def servoMove(ID, Dir, errorInput, errorGenOut):
         if ID == 12:
-            errorGenOut = kalman_filter_X.kalman(errorInput)
             CVThread.P_anglePos += 0.15 * (errorGenOut * Dir) * CVThread.cameraDiagonalW / CVThread.videoW
 
             if abs(errorInput) > CVThread.tor:
@@ -266,7 +257,6 @@ class CVThread(threading.Thread):
             else:
                 CVThread.X_lock = 1
         elif ID == 13:
-            errorGenOut = kalman_filter_Y.kalman(errorInput)
             CVThread.T_anglePos += 0.15 * (errorGenOut * Dir) * CVThread.cameraDiagonalH / CVThread.videoH
 
             if abs(errorInput) > CVThread.tor:
@@ -278,25 +268,17 @@ class CVThread(threading.Thread):
             print('No servoPort %d assigned.' % ID)
 
     def findColor(self, frame_image):
-        hsv = cv2.cvtColor(frame_image, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, colorLower, colorUpper)  # 1
-        mask = cv2.erode(mask, None, iterations=2)
-        mask = cv2.dilate(mask, None, iterations=2)
-        cnts = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL,
-                                cv2.CHAIN_APPROX_SIMPLE)[-2]
-        center = None
-        if len(cnts) > 0:
+        target = CVThread.colorTracker.track(frame_image, colorLower, colorUpper)  # 1
+        if target is not None:
             self.findColorDetection = 1
-            c = max(cnts, key=cv2.contourArea)
-            ((self.box_x, self.box_y), self.radius) = cv2.minEnclosingCircle(c)
-            M = cv2.moments(c)
-            center = (int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"]))
+            self.box_x, self.box_y, self.radius = target.x, target.y, target.radius
             X = int(self.box_x)
             Y = int(self.box_y)
             error_Y = 240 - Y
             error_X = 320 - X
-            CVThread.servoMove(CVThread.P_servo, CVThread.P_direction, -error_X)
-            CVThread.servoMove(CVThread.T_servo, CVThread.T_direction, -error_Y)
+            filtered_X, filtered_Y = CVThread.errorFilter.update((-error_X, -error_Y))
+            CVThread.servoMove(CVThread.P_servo, CVThread.P_direction, -error_X, filtered_X)
+            CVThread.servoMove(CVThread.T_servo, CVThread.T_direction, -error_Y, filtered_Y)
 
             if CVThread.X_lock == 1 and CVThread.Y_lock == 1:
                 led.setColor(255, 78, 0)
@@ -343,6 +325,7 @@ class CVThread(threading.Thread):
 class Camera(BaseCamera):
     video_source = 0
     modeSelect = 'none'
+    pipeline = JPEGPipeline()  # subscribe() here to share the encoded frames
 
     # modeSelect = 'findlineCV'
     # modeSelect = 'findColor'
@@ -437,6 +420,7 @@ class Camera(BaseCamera):
                 except:
                     pass
 
-            # encode as a jpeg image and return it
-            if cv2.imencode('.jpg', img)[0]:
-                yield cv2.imencode('.jpg', img)[1].tobytes()
+            # encode as a jpeg image once and share it with every client
+            frame = Camera.pipeline.encode(img)
+            if frame is not None:
+                yield frame.data
@@ -0,0 +1,241 @@
+"""Downscaled color-blob detection on preallocated buffers
+
+CVThread.findColor and the FindColorMode block of FPV.capture_thread
+allocated a new full-resolution HSV image, mask, eroded mask, dilated
+mask and mask.copy() on every frame. ColorTracker shrinks the frame by a
+configurable scale first. It then runs resize, HSV conversion, inRange,
+erode and dilate into buffers allocated once per frame size, passed
+through OpenCV's dst= arguments. The largest blob is mapped back to
+full-frame coordinates, so callers keep steering on 640x480 pixel errors.
+
+Once a target is locked, PredictiveColorTracker predicts where it will be
+next frame. It filters the target's velocity with a VectorKalmanFilter of
+its own and searches only a window around the prediction, sized from the
+target's radius, so per-frame work follows the target size instead of the
+frame size. After max_misses frames without a hit it falls back to
+searching the full frame.
+"""
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+import Kalman_filter
+
+DEFAULT_SCALE = 0.5
+MORPH_ITERATIONS = 2
+WINDOW_RADII = 3.0  # search window half-size, in target radii
+MIN_WINDOW = 48  # smallest search window half-size, pixels
+MAX_MISSES = 5
+
+# Full-frame coordinates of the largest blob of the tracked color
+ColorTarget = namedtuple('ColorTarget', 'x y radius center area')
+
+
+class ColorTracker:
+    """Finds the largest blob within an HSV range at a reduced resolution"""
+
+    def __init__(self, scale=DEFAULT_SCALE, erode=MORPH_ITERATIONS, dilate=MORPH_ITERATIONS,
+                 clock=time.perf_counter):
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale must be in (0, 1], got {scale}")
+        self.scale = scale
+        self.erode = erode
+        self.dilate = dilate
+        self._clock = clock
+        self._kernel = np.ones((3, 3), np.uint8)
+        self._shape = None
+        self.reset_stats()
+
+    def _allocate(self, shape):
+        # Flat buffers big enough for the whole frame; any search window uses a
+        # contiguous reshaped view of their start, so windows of changing size
+        # never allocate pixel memory
+        height, width = shape[:2]
+        pixels = self._small_size(width, height)
+        pixels = pixels[0] * pixels[1]
+        self._small = np.empty(pixels * 3, np.uint8)
+        self._hsv = np.empty(pixels * 3, np.uint8)
+        self._mask_buffer = np.empty(pixels, np.uint8)
+        self._work_buffer = np.empty(pixels, np.uint8)
+        self._shape = shape
+        self.allocations += 1
+
+    def _small_size(self, width, height):
+        return max(int(round(width * self.scale)), 1), max(int(round(height * self.scale)), 1)
+
+    def mask(self, frame, lower, upper, roi=None):
+        """Binary mask of the color range at tracker resolution (a reused buffer)
+
+        roi = (x0, y0, x1, y1) limits the search to that part of the frame.
+        """
+        if frame.shape != self._shape:
+            self._allocate(frame.shape)
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = roi if roi is not None else (0, 0, width, height)
+        x0, y0 = min(max(int(x0), 0), width - 1), min(max(int(y0), 0), height - 1)
+        x1, y1 = min(max(int(x1), x0 + 1), width), min(max(int(y1), y0 + 1), height)
+        crop = frame[y0:y1, x0:x1]
+        size = self._small_size(x1 - x0, y1 - y0)
+        # Map pixel centers of the small image back onto the full frame
+        self._origin = (x0, y0)
+        self._factor = ((x1 - x0) / size[0], (y1 - y0) / size[1])
+        shape = (size[1], size[0])
+        pixels = size[0] * size[1]
+
+        hsv = self._hsv[:pixels * 3].reshape(shape + (3,))
+        if self.scale < 1:
+            source = self._small[:pixels * 3].reshape(shape + (3,))
+            cv2.resize(crop, size, dst=source, interpolation=cv2.INTER_AREA)
+        else:
+            source = crop
+        cv2.cvtColor(source, cv2.COLOR_BGR2HSV, dst=hsv)
+        mask = self._mask_buffer[:pixels].reshape(shape)
+        work = self._work_buffer[:pixels].reshape(shape)
+        cv2.inRange(hsv, lower, upper, dst=mask)
+        if self.erode:
+            cv2.erode(mask, self._kernel, dst=work, iterations=self.erode)
+            mask, work = work, mask
+        if self.dilate:
+            cv2.dilate(mask, self._kernel, dst=work, iterations=self.dilate)
+            mask, work = work, mask
+        return mask
+
+    def to_frame(self, x, y):
+        """Full-frame coordinates of a point in the last mask"""
+        return (self._origin[0] + (x + 0.5) * self._factor[0] - 0.5,
+                self._origin[1] + (y + 0.5) * self._factor[1] - 0.5)
+
+    def detect(self, frame, lower, upper, roi=None):
+        """Largest blob of the color range as a ColorTarget, None if there is none"""
+        started = self._clock()
+        mask = self.mask(frame, lower, upper, roi)
+        # OpenCV 4 no longer modifies the image it finds contours in
+        contours = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        target = None
+        if len(contours) > 0:
+            contour = max(contours, key=cv2.contourArea)
+            (x, y), radius = cv2.minEnclosingCircle(contour)
+            moments = cv2.moments(contour)
+            if moments['m00']:
+                center = self.to_frame(moments['m10'] / moments['m00'], moments['m01'] / moments['m00'])
+            else:
+                center = self.to_frame(x, y)
+            x, y = self.to_frame(x, y)
+            scale = max(self._factor)
+            target = ColorTarget(x, y, radius * scale, (int(center[0]), int(center[1])),
+                                 moments['m00'] * self._factor[0] * self._factor[1])
+            self.detections += 1
+        work = self._clock() - started
+        self.frames += 1
+        self.work_total += work
+        self.work_max = max(self.work_max, work)
+        return target
+
+    def reset_stats(self):
+        self.frames = 0
+        self.detections = 0
+        self.allocations = 0
+        self.work_total = 0.0
+        self.work_max = 0.0
+
+    def get_stats(self):
+        """Get detection statistics (times in seconds)"""
+        return {
+            'scale': self.scale,
+            'frames': self.frames,
+            'detections': self.detections,
+            'allocations': self.allocations,
+            'work_mean': self.work_total / self.frames if self.frames else 0.0,
+            'work_max': self.work_max,
+        }
+
+
+class PredictiveColorTracker:
+    """Searches a window around the predicted target, or the full frame when unlocked"""
+
+    def __init__(self, tracker=None, window=WINDOW_RADII, min_window=MIN_WINDOW, max_misses=MAX_MISSES,
+                 Q=1.0, R=4.0):
+        self.tracker = tracker or ColorTracker()
+        self.window = window
+        self.min_window = min_window
+        self.max_misses = max_misses
+        self.Q = Q
+        self.R = R
+        self.reset()
+        self.reset_stats()
+
+    def reset(self):
+        """Drop the lock; the next frame is searched in full"""
+        self.velocity = Kalman_filter.VectorKalmanFilter(('vx', 'vy'), self.Q, self.R)
+        self.position = None  # last measured target position
+        self.prediction = None
+        self.radius = 0.0
+        self.misses = 0
+        self.roi = None
+
+    @property
+    def locked(self):
+        return self.prediction is not None
+
+    def search_window(self, shape):
+        """(x0, y0, x1, y1) around the prediction, widening with every miss"""
+        half = max(self.window * self.radius, self.min_window) * (1 + self.misses)
+        height, width = shape[:2]
+        x, y = self.prediction
+        return (max(int(x - half), 0), max(int(y - half), 0),
+                min(int(x + half) + 1, width), min(int(y + half) + 1, height))
+
+    def track(self, frame, lower, upper):
+        """Detect the target like ColorTracker.detect(), using the lock if there is one"""
+        if self.locked:
+            self.roi = self.search_window(frame.shape)
+            target = self.tracker.detect(frame, lower, upper, self.roi)
+            self.window_searches += 1
+            if target is not None:
+                return self._hit(target)
+            self.misses += 1
+            self.window_misses += 1
+            if self.misses < self.max_misses:
+                # Coast along the last velocity estimate
+                self.prediction = self.prediction + self.velocity.x
+                return None
+            self.reset()
+            self.lost += 1
+
+        self.roi = None
+        target = self.tracker.detect(frame, lower, upper)
+        self.full_searches += 1
+        if target is not None:
+            return self._hit(target)
+        return None
+
+    def _hit(self, target):
+        position = np.array([target.x, target.y])
+        if self.position is not None:
+            # Spread the displacement over the frames it took
+            self.velocity.update((position - self.position) / (self.misses + 1))
+        self.position = position
+        self.prediction = position + self.velocity.x
+        self.radius = target.radius
+        self.misses = 0
+        return target
+
+    def reset_stats(self):
+        self.window_searches = 0
+        self.window_misses = 0
+        self.full_searches = 0
+        self.lost = 0
+
+    def get_stats(self):
+        """Get search statistics plus the detector's"""
+        stats = self.tracker.get_stats()
+        stats.update({
+            'locked': self.locked,
+            'window_searches': self.window_searches,
+            'window_misses': self.window_misses,
+            'full_searches': self.full_searches,
+            'lost': self.lost,
+        })
+        return stats
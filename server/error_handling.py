@@ -58,14 +58,14 @@ def monitor_balance(threshold=30):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            from initialization import sensor, mpu6050_connection
+            from initialization import imu, mpu6050_connection
             if not mpu6050_connection:
                 return func(*args, **kwargs)
             
             try:
-                initial = sensor.get_accel_data()
+                initial = imu.get_accel_data()
                 result = func(*args, **kwargs)
-                final = sensor.get_accel_data()
+                final = imu.get_accel_data()
                 
                 # Check if balance was maintained
                 delta_x = abs(final['x'] - initial['x'])
@@ -0,0 +1,106 @@
+"""Encode-once JPEG pipeline for the camera streams
+
+Camera.frames() used to call cv2.imencode() twice per frame, once to see
+whether encoding worked and again for the bytes it yielded, and FPV ran
+its own encode for the ZMQ stream. JPEGPipeline encodes every frame
+exactly once. The resulting EncodedFrame is the one buffer handed to
+every consumer: the MJPEG clients through BaseCamera.frame, plus any
+subscribed callbacks (the FPV ZMQ publisher, a recorder). Encode time and
+output frame rate are tracked for get_stats().
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUALITY = 95  # cv2.imencode's own default
+FPS_SMOOTHING = 0.1
+
+# data is immutable bytes, so consumers can keep a frame as long as they like
+EncodedFrame = namedtuple('EncodedFrame', 'seq data timestamp encode_time')
+
+
+class JPEGPipeline:
+    """Encodes raw frames once and fans the bytes out to all consumers"""
+
+    def __init__(self, quality=DEFAULT_QUALITY, clock=time.perf_counter):
+        self._clock = clock
+        self._params = []
+        self.set_quality(quality)
+        self._consumers = ()
+        self._lock = threading.Lock()
+        self.latest = None
+        self.reset_stats()
+
+    def set_quality(self, quality):
+        self.quality = int(quality)
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+
+    def subscribe(self, consumer):
+        """consumer(frame) is called with every EncodedFrame on the camera thread"""
+        with self._lock:
+            self._consumers = self._consumers + (consumer,)
+
+    def unsubscribe(self, consumer):
+        with self._lock:
+            self._consumers = tuple(c for c in self._consumers if c != consumer)
+
+    def encode(self, img):
+        """Encode img once, publish it and return the EncodedFrame (None on failure)"""
+        started = self._clock()
+        ok, buffer = cv2.imencode('.jpg', img, self._params)
+        if not ok:
+            self.failures += 1
+            return None
+        data = buffer.tobytes()
+        now = self._clock()
+        encode_time = now - started
+
+        self.frames += 1
+        self.bytes_total += len(data)
+        self.encode_total += encode_time
+        self.encode_max = max(self.encode_max, encode_time)
+        if self._last_time is not None:
+            interval = now - self._last_time
+            if interval > 0:
+                fps = 1.0 / interval
+                self.fps = fps if self.fps == 0.0 else self.fps + FPS_SMOOTHING * (fps - self.fps)
+        self._last_time = now
+
+        frame = EncodedFrame(self.frames, data, now, encode_time)
+        self.latest = frame
+        for consumer in self._consumers:
+            try:
+                consumer(frame)
+            except Exception as e:
+                self.consumer_errors += 1
+                logger.error(f"Frame consumer {consumer!r} failed: {e}")
+        return frame
+
+    def reset_stats(self):
+        self.frames = 0
+        self.failures = 0
+        self.consumer_errors = 0
+        self.bytes_total = 0
+        self.encode_total = 0.0
+        self.encode_max = 0.0
+        self.fps = 0.0
+        self._last_time = None
+
+    def get_stats(self):
+        """Get encoder statistics (times in seconds)"""
+        return {
+            'frames': self.frames,
+            'failures': self.failures,
+            'consumers': len(self._consumers),
+            'consumer_errors': self.consumer_errors,
+            'quality': self.quality,
+            'fps': self.fps,
+            'encode_mean': self.encode_total / self.frames if self.frames else 0.0,
+            'encode_max': self.encode_max,
+            'bytes_mean': self.bytes_total / self.frames if self.frames else 0,
+        }
@@ -8,11 +8,11 @@ import threading
 import time
 
 import RPIservo
-from initialization import pwm
+import bus_owner
 
-scGear = RPIservo.ServoCtrl()
+scGear = RPIservo.ServoCtrl(priority=bus_owner.PRIORITY_HEAD)
 
-pwm.set_pwm_freq(50)
+pwm = bus_owner.get_bus().pwm_client(bus_owner.PRIORITY_HEAD)
 
 curpath = os.path.realpath(__file__)
 thisPath = "/" + os.path.dirname(curpath)
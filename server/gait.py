@@ -0,0 +1,188 @@
+"""Precompiled gait frames for the six-legged walk
+
+move.left_I .. move.right_III each walk an if/elif tree over the step
+position, side direction and side height on every call, and move() calls
+six of them per step. GaitCompiler evaluates the same rules once per
+(step, command, speed) and caches the resulting 12-channel PWM frame, so a
+walking step is a dictionary lookup followed by one frame commit.
+
+The smooth (dove) gait is compiled the same way into a time-indexed
+(sub-steps, 12) array per (step, speed, dpi, command), which GaitPlayer
+streams to the servo bus on absolute deadlines.
+
+    left_I   -<forward>-- right_III
+    left_II  ---<BODY>---  right_II
+    left_III -<Backward>-   right_I
+"""
+import numpy as np
+
+from scheduler import DeadlineScheduler
+
+# leg name: (horizontal channel, vertical channel, side)
+LEGS = {
+    'left_I': (0, 1, 'left'),
+    'left_II': (2, 3, 'left'),
+    'left_III': (4, 5, 'left'),
+    'right_I': (6, 7, 'right'),
+    'right_II': (8, 9, 'right'),
+    'right_III': (10, 11, 'right'),
+}
+
+# command: (leg, tripod, wiggle sign) as issued by move.move();
+# tripod 0 uses step_I and tripod 1 uses step_II
+GAIT_COMMANDS = {
+    'no': (('right_I', 0, 1), ('left_II', 0, 1), ('right_III', 0, 1),
+           ('left_I', 1, 1), ('right_II', 1, 1), ('left_III', 1, 1)),
+    'left': (('right_I', 0, 1), ('left_II', 0, -1), ('right_III', 0, 1),
+             ('left_I', 1, -1), ('right_II', 1, 1), ('left_III', 1, -1)),
+    'right': (('right_I', 0, -1), ('left_II', 0, 1), ('right_III', 0, -1),
+              ('left_I', 1, 1), ('right_II', 1, -1), ('left_III', 1, 1)),
+}
+
+# step position: horizontal wiggle multiplier for a forward-facing side
+HORIZONTAL_PATTERN = {1: 0, 2: 1, 3: 0, 4: -1}
+
+# Dove gait tripods: A = left_I, right_II, left_III and B = right_I, left_II, right_III
+DOVE_TRIPODS = (('left_I', 'right_II', 'left_III'), ('right_I', 'left_II', 'right_III'))
+
+# step: (tripod A horizontal sign, horizontal ramp, tripod A lift, tripod B lift)
+# for a forward 'no' step. The ramp is 'rise' (0 -> speed) or 'fall'
+# (speed -> 0), a lift is a ramp scaled by 3 or the constant DOVE_PLANT,
+# and tripod B always swings opposite to tripod A.
+DOVE_PHASES = {
+    1: (-1, 'fall', 'rise', None),
+    2: (1, 'rise', 'fall', None),
+    3: (1, 'fall', None, 'rise'),
+    4: (-1, 'rise', None, 'fall'),
+}
+DOVE_PLANT = -10
+
+
+def tripod_steps(step_input):
+    """Return (step_I, step_II); the second tripod runs two positions ahead"""
+    step_II = step_input + 2
+    if step_II > 4:
+        step_II = step_II - 4
+    return step_input, step_II
+
+
+class GaitCompiler:
+    """Builds and caches PWM frames equivalent to move.move()"""
+
+    def __init__(self, base_pwm, left_direction, right_direction, left_height, right_height, height_change):
+        self.base_pwm = list(base_pwm)
+        self.direction = {'left': left_direction, 'right': right_direction}
+        self.height = {'left': left_height, 'right': right_height}
+        self.height_change = height_change
+        self._cache = {}
+
+    def leg_frame(self, leg, pos, wiggle, heightAdjust=0):
+        """Channel values written by the matching move.<leg>(pos, wiggle, heightAdjust)"""
+        h_channel, v_channel, side = LEGS[leg]
+        height_sign = 1 if self.height[side] else -1
+
+        if pos == 0:
+            return {v_channel: self.base_pwm[v_channel] + height_sign * heightAdjust}
+        if pos not in HORIZONTAL_PATTERN:
+            return {}
+
+        if self.direction[side]:
+            h_sign = HORIZONTAL_PATTERN[pos]
+            lift = self.height_change
+        else:
+            h_sign = -HORIZONTAL_PATTERN[pos]
+            # the reversed left side historically scales its lift by wiggle
+            lift = wiggle if side == 'left' else self.height_change
+
+        v_offset = 3 * lift if pos == 1 else -lift
+        return {
+            h_channel: self.base_pwm[h_channel] + h_sign * wiggle,
+            v_channel: self.base_pwm[v_channel] + height_sign * v_offset,
+        }
+
+    def compile(self, step_input, command, speed):
+        """Build the frame for one step as a tuple of (channel, value) pairs"""
+        steps = tripod_steps(step_input)
+        frame = {}
+        for leg, tripod, sign in GAIT_COMMANDS.get(command, ()):
+            frame.update(self.leg_frame(leg, steps[tripod], sign * speed))
+        return tuple(sorted(frame.items()))
+
+    def frame(self, step_input, command, speed):
+        """Cached compile()"""
+        key = (step_input, command, speed)
+        frame = self._cache.get(key)
+        if frame is None:
+            frame = self._cache[key] = self.compile(step_input, command, speed)
+        return frame
+
+    def dove_frames(self, step_input, speed, dpi, command):
+        """Cached (sub-steps, 12) int array of channel values for one smooth step
+
+        Matches the old per-sub-step move.dove() loop: speed ramps in
+        int(speed / dpi) increments, backward steps only support 'no' and
+        turning flips the horizontal swing of one side.
+        """
+        key = ('dove', step_input, speed, dpi, command)
+        frames = self._cache.get(key)
+        if frames is None:
+            frames = self._cache[key] = self._compile_dove(step_input, speed, dpi, command)
+        return frames
+
+    def _compile_dove(self, step_input, speed, dpi, command):
+        backward = speed < 0
+        speed = abs(speed)
+        if step_input not in DOVE_PHASES or command not in GAIT_COMMANDS or (backward and command != 'no'):
+            return np.empty((0, len(LEGS) * 2), dtype=int)
+
+        increment = max(int(speed / dpi), 1)
+        ramps = {'rise': np.arange(0, speed + increment, increment)}
+        ramps['fall'] = speed - ramps['rise']
+
+        a_sign, horizontal, a_lift, b_lift = DOVE_PHASES[step_input]
+        if backward:
+            a_sign = -a_sign
+        frames = np.empty((len(ramps['rise']), len(LEGS) * 2), dtype=int)
+        for tripod, sign, lift in ((0, a_sign, a_lift), (1, -a_sign, b_lift)):
+            vertical = 3 * ramps[lift] if lift else DOVE_PLANT
+            for leg in DOVE_TRIPODS[tripod]:
+                h_channel, v_channel, side = LEGS[leg]
+                leg_sign = -sign if command == side else sign
+                direction_sign = 1 if self.direction[side] else -1
+                height_sign = 1 if self.height[side] else -1
+                frames[:, h_channel] = self.base_pwm[h_channel] + direction_sign * leg_sign * ramps[horizontal]
+                frames[:, v_channel] = self.base_pwm[v_channel] + height_sign * vertical
+        frames.setflags(write=False)
+        return frames
+
+    def clear(self):
+        """Drop cached frames after changing base positions or gait settings"""
+        self._cache.clear()
+
+
+class GaitPlayer:
+    """Streams compiled frames to a PWMFrame at a fixed rate"""
+
+    def __init__(self, frame, scheduler=None):
+        self.frame = frame
+        self.scheduler = scheduler or DeadlineScheduler(0.01)
+
+    def play(self, frames, period, keep_going=None):
+        """Commit one row per period; stop early once keep_going() is false
+
+        Returns the number of rows sent.
+        """
+        self.scheduler.start(period)
+        sent = 0
+        for row in frames:
+            if keep_going is not None and not keep_going():
+                break
+            for channel, value in enumerate(row):
+                self.frame.stage(channel, value)
+            self.frame.commit()
+            sent += 1
+            self.scheduler.wait()
+        return sent
+
+    def get_stats(self):
+        return self.scheduler.get_stats()
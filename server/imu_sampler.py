@@ -0,0 +1,264 @@
+"""Fixed-rate MPU6050 sampling into a timestamped ring buffer
+
+Balance control, the stability metric, the status endpoint and the
+monitor_balance decorator used to call get_accel_data() whenever they
+needed a reading: one blocking I2C transaction per call, and every
+consumer saw a different sample. IMUSampler is the only reader of the
+IMU. It polls at a fixed rate on its own thread and publishes into a
+SampleRing, from which consumers take the latest sample or a window
+without touching the bus.
+
+On the real chip FIFOSource lets the MPU6050 sample into its own FIFO at
+the configured rate and empties it in 32-byte bursts at a lower poll rate,
+instead of one register read per sample.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+from scheduler import DeadlineScheduler
+
+logger = logging.getLogger(__name__)
+
+ACCEL_AXES = ('x', 'y', 'z')
+GYRO_AXES = ('gyro_x', 'gyro_y', 'gyro_z')
+
+# MPU6050 registers
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+GYRO_CONFIG = 0x1B
+ACCEL_CONFIG = 0x1C
+FIFO_EN = 0x23
+USER_CTRL = 0x6A
+FIFO_COUNTH = 0x72
+FIFO_R_W = 0x74
+
+FIFO_ACCEL = 0x08
+FIFO_GYRO = 0x70
+USER_FIFO_EN = 0x40
+USER_FIFO_RESET = 0x04
+DLPF_184HZ = 0x01  # Any DLPF setting drops the gyro output rate to 1 kHz
+FIFO_SIZE = 1024
+I2C_BLOCK_MAX = 32
+
+# Raw counts per unit for each full-scale setting, in the units of the
+# mpu6050 package (m/s^2 and deg/s)
+GRAVITY_MS2 = 9.80665
+ACCEL_COUNTS_PER_G = (16384.0, 8192.0, 4096.0, 2048.0)
+GYRO_COUNTS_PER_DPS = (131.0, 65.5, 32.8, 16.4)
+
+DEFAULT_RATE = 200
+FIFO_POLL_RATE = 50
+
+
+class SampleRing:
+    """Fixed-size ring of timestamped rows with one writer and lock-free readers
+
+    The writer fills a slot and then publishes it by advancing count. Readers
+    copy the slots they want and look at count again afterwards; if the
+    writer could have reached any of those slots during the copy they retry,
+    so a read never mixes two samples and nobody takes a lock.
+    """
+
+    def __init__(self, columns, capacity):
+        self.capacity = capacity
+        self._times = np.zeros(capacity)
+        self._values = np.zeros((capacity, columns))
+        self.count = 0
+
+    def push(self, timestamp, values):
+        slot = self.count % self.capacity
+        self._times[slot] = timestamp
+        self._values[slot] = values
+        self.count += 1
+
+    def last(self, n):
+        """Copies of the newest n timestamps and rows, oldest first
+
+        At most capacity - 1 rows are returned; the remaining slot is the
+        one the writer may be filling.
+        """
+        while True:
+            end = self.count
+            size = max(min(n, end, self.capacity - 1), 0)
+            slots = np.arange(end - size, end) % self.capacity
+            times = self._times[slots]
+            values = self._values[slots]
+            if self.count - end < self.capacity - size:
+                return times, values
+
+
+class PollingSource:
+    """One get_accel_data() (and get_gyro_data()) call per sample"""
+
+    def __init__(self, sensor, rate=DEFAULT_RATE, gyro=False):
+        self.sensor = sensor
+        self.gyro = gyro
+        self.axes = ACCEL_AXES + (GYRO_AXES if gyro else ())
+        self.rate = rate
+        self.poll_rate = rate
+
+    def read(self):
+        accel = self.sensor.get_accel_data()
+        row = [accel['x'], accel['y'], accel['z']]
+        if self.gyro:
+            gyro = self.sensor.get_gyro_data()
+            row += [gyro['x'], gyro['y'], gyro['z']]
+        return [row]
+
+
+class FIFOSource:
+    """Burst reads from the MPU6050 FIFO, sampled by the chip at a fixed rate
+
+    device is the mpu6050 instance (its smbus handle and address are used
+    directly); call runs a function wherever the bus may be touched, e.g. on
+    the bus owner thread. Samples come back in the same units as
+    get_accel_data() and get_gyro_data().
+    """
+
+    def __init__(self, device, rate=DEFAULT_RATE, gyro=False, poll_rate=FIFO_POLL_RATE, call=None):
+        self.device = device
+        self.gyro = gyro
+        self.axes = ACCEL_AXES + (GYRO_AXES if gyro else ())
+        self.frame_bytes = 2 * len(self.axes)
+        self.divider = min(max(int(round(1000.0 / rate)) - 1, 0), 255)
+        self.rate = 1000.0 / (self.divider + 1)
+        self.poll_rate = min(poll_rate, self.rate)
+        self.overflows = 0
+        self._call = call or (lambda func: func())
+        self._scale = None
+        self._call(self.configure)
+
+    def _write(self, register, value):
+        self.device.bus.write_byte_data(self.device.address, register, value)
+
+    def _read(self, register):
+        return self.device.bus.read_byte_data(self.device.address, register)
+
+    def configure(self):
+        """Set the sample rate, read back the full-scale ranges and start the FIFO"""
+        self._write(CONFIG, DLPF_184HZ)
+        self._write(SMPLRT_DIV, self.divider)
+        accel_range = (self._read(ACCEL_CONFIG) >> 3) & 0x03
+        scale = [GRAVITY_MS2 / ACCEL_COUNTS_PER_G[accel_range]] * 3
+        if self.gyro:
+            gyro_range = (self._read(GYRO_CONFIG) >> 3) & 0x03
+            scale += [1.0 / GYRO_COUNTS_PER_DPS[gyro_range]] * 3
+        self._scale = np.array(scale)
+        self._write(FIFO_EN, FIFO_ACCEL | (FIFO_GYRO if self.gyro else 0))
+        self._reset()
+
+    def _reset(self):
+        self._write(USER_CTRL, USER_FIFO_RESET)
+        self._write(USER_CTRL, USER_FIFO_EN)
+
+    def _drain(self):
+        high, low = self.device.bus.read_i2c_block_data(self.device.address, FIFO_COUNTH, 2)
+        available = high << 8 | low
+        if available > FIFO_SIZE - self.frame_bytes:
+            # A full FIFO has dropped bytes and lost frame alignment
+            self.overflows += 1
+            self._reset()
+            return b''
+        chunk = I2C_BLOCK_MAX // self.frame_bytes * self.frame_bytes
+        data = bytearray()
+        remaining = available - available % self.frame_bytes
+        while remaining:
+            size = min(chunk, remaining)
+            data += bytes(self.device.bus.read_i2c_block_data(self.device.address, FIFO_R_W, size))
+            remaining -= size
+        return bytes(data)
+
+    def read(self):
+        raw = np.frombuffer(self._call(self._drain), dtype='>i2').reshape(-1, len(self.axes))
+        return raw * self._scale
+
+
+class IMUSampler(threading.Thread):
+    """Reads the IMU at a fixed rate and keeps the samples in a SampleRing
+
+    Rows are timestamped with time.monotonic(). A burst of several FIFO
+    samples is spread back from the read time at the source's sample
+    period.
+    """
+
+    def __init__(self, source, capacity=1024, scheduler=None, clock=time.monotonic):
+        super(IMUSampler, self).__init__(daemon=True)
+        self.source = source
+        self.axes = source.axes
+        self.period = 1.0 / source.rate
+        self.ring = SampleRing(len(self.axes), capacity)
+        self.scheduler = scheduler or DeadlineScheduler(1.0 / source.poll_rate)
+        self._clock = clock
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self.reads = 0
+        self.errors = 0
+
+    def run(self):
+        self.scheduler.start()
+        while not self._stopped.is_set():
+            self.poll()
+            self.scheduler.wait()
+
+    def stop(self):
+        self._stopped.set()
+
+    def poll(self):
+        """Read whatever the source has and publish it; returns the number of samples"""
+        try:
+            rows = np.asarray(self.source.read(), dtype=float).reshape(-1, len(self.axes))
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 100 == 0:
+                logger.warning(f"IMU read failed ({self.errors} so far): {e}")
+            return 0
+        now = self._clock()
+        self.reads += 1
+        count = len(rows)
+        for i, row in enumerate(rows):
+            self.ring.push(now - (count - 1 - i) * self.period, row)
+        if count:
+            self._ready.set()
+        return count
+
+    def latest(self, timeout=1.0):
+        """Newest sample as a dict keyed by axis, plus its 'timestamp'"""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("No IMU sample received yet")
+        times, values = self.ring.last(1)
+        sample = dict(zip(self.axes, values[0].tolist()))
+        sample['timestamp'] = float(times[0])
+        return sample
+
+    def window(self, count=None, seconds=None):
+        """Timestamps and (n, axes) rows of the newest samples, oldest first
+
+        Limited by count, by age relative to the newest sample, or both;
+        with neither, everything the ring holds.
+        """
+        times, values = self.ring.last(self.ring.capacity if count is None else count)
+        if seconds is not None and len(times):
+            recent = times >= times[-1] - seconds
+            times, values = times[recent], values[recent]
+        return times, values
+
+    def get_accel_data(self, timeout=1.0):
+        """Latest accelerometer reading, shaped like mpu6050.get_accel_data()"""
+        sample = self.latest(timeout)
+        return {axis: sample[axis] for axis in ACCEL_AXES}
+
+    def get_stats(self):
+        """Get sampling counters (rates in Hz)"""
+        stats = {
+            'rate': self.source.rate,
+            'poll_rate': self.source.poll_rate,
+            'samples': self.ring.count,
+            'reads': self.reads,
+            'errors': self.errors,
+        }
+        if isinstance(self.source, FIFOSource):
+            stats['overflows'] = self.source.overflows
+        return stats
@@ -12,6 +12,8 @@ import time
 from dataclasses import asdict, dataclass
 from typing import Dict, Any
 
+from snapshot_cache import SnapshotCache
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -22,9 +24,40 @@ class SystemStatus:
     stability: float = 0.0
     uptime: float = 0.0
 
+# Seconds each reading is reused for, however many clients ask for it
+STATUS_TTL = {
+    'imu': float(os.getenv('STATUS_TTL_IMU', 0.05)),
+    'cpu_temp': float(os.getenv('STATUS_TTL_CPU_TEMP', 2.0)),
+    'cpu_usage': float(os.getenv('STATUS_TTL_CPU_USAGE', 1.0)),
+    'ram_usage': float(os.getenv('STATUS_TTL_RAM_USAGE', 2.0)),
+    'stability': float(os.getenv('STATUS_TTL_STABILITY', 0.2)),
+}
+
+
+def _read_imu():
+    from initialization import read_imu
+    return read_imu()
+
+
+def _read_stability():
+    from move import calc_stability_metric
+    return calc_stability_metric()
+
+
 class SystemMonitor:
-    def __init__(self):
+    def __init__(self, ttl=None):
         self.start_time = time.time()
+        ttl = dict(STATUS_TTL, **(ttl or {}))
+        self.snapshots = SnapshotCache()
+        self.snapshots.register('imu', _read_imu, ttl['imu'])
+        self.snapshots.register('cpu_temp', self.get_cpu_temp, ttl['cpu_temp'])
+        self.snapshots.register('cpu_usage', self.get_cpu_usage, ttl['cpu_usage'])
+        self.snapshots.register('ram_usage', self.get_ram_usage, ttl['ram_usage'])
+        self.snapshots.register('stability', _read_stability, ttl['stability'])
+
+    def snapshot(self, name):
+        """Cached reading of one source ('imu', 'cpu_temp', 'cpu_usage', 'ram_usage' or 'stability')"""
+        return self.snapshots.get(name)
 
     def get_cpu_temp(self) -> float:
         """Get CPU temperature"""
@@ -50,14 +83,12 @@ class SystemMonitor:
         return time.time() - self.start_time
 
     def get_status(self) -> SystemStatus:
-        """Get complete system status"""
-        from move import calc_stability_metric
-        
+        """Get complete system status from the cached readings"""
         return SystemStatus(
-            cpu_temp=self.get_cpu_temp(),
-            cpu_usage=self.get_cpu_usage(),
-            ram_usage=self.get_ram_usage(),
-            stability=calc_stability_metric(),
+            cpu_temp=self.snapshot('cpu_temp'),
+            cpu_usage=self.snapshot('cpu_usage'),
+            ram_usage=self.snapshot('ram_usage'),
+            stability=self.snapshot('stability'),
             uptime=self.get_uptime()
         )
 
@@ -1,10 +1,9 @@
 import os
 import logging
-import Adafruit_PCA9685
-from mpu6050 import mpu6050
 import Kalman_filter
-import PID
 import RPIservo
+import bus_owner
+import imu_sampler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,24 +12,34 @@ logger = logging.getLogger(__name__)
 # Environment variable to control hardware simulation
 SIMULATE_HARDWARE = os.getenv('SIMULATE_HARDWARE', 'false').lower() == 'true'
 
-# Initialize Kalman filters
+# Single-axis Kalman filters, kept for the standalone test scripts; the
+# balance, status and vision code each build their own VectorKalmanFilter
 kalman_filter_X = Kalman_filter.Kalman_filter(0.01, 0.1)
 kalman_filter_Y = Kalman_filter.Kalman_filter(0.01, 0.1)
 
-# Initialize PID controllers
-X_pid = PID.PID()
-X_pid.SetKp(5)
-X_pid.SetKd(0.01)
-X_pid.SetKi(0)
-Y_pid = PID.PID()
-Y_pid.SetKp(5)
-Y_pid.SetKd(0.01)
-Y_pid.SetKi(0)
+# IMU sampling rate in Hz, and whether to burst-read it from the MPU6050 FIFO
+IMU_RATE = float(os.getenv('IMU_RATE', imu_sampler.DEFAULT_RATE))
+IMU_FIFO = os.getenv('IMU_FIFO', 'true').lower() == 'true'
+
+# The bus owner thread is the only one allowed to talk to the PCA9685 and MPU6050
+bus = bus_owner.get_bus()
 
 # Initialize MPU6050 sensor
+gyro_available = False
+imu = None
 try:
     if not SIMULATE_HARDWARE:
-        sensor = mpu6050(0x68)
+        from mpu6050 import mpu6050
+        device = mpu6050(0x68)
+        bus.attach_sensor(device)
+        sensor = bus.sensor_client(bus_owner.PRIORITY_BALANCE)
+        gyro_available = hasattr(sensor, 'get_gyro_data')
+        if IMU_FIFO:
+            source = imu_sampler.FIFOSource(
+                device, IMU_RATE, gyro_available,
+                call=lambda func: bus.submit(func, priority=bus_owner.PRIORITY_BALANCE).result(1.0))
+        else:
+            source = imu_sampler.PollingSource(sensor, IMU_RATE, gyro_available)
         mpu6050_connection = True
         logger.info("MPU6050 initialized successfully")
     else:
@@ -39,19 +48,34 @@ try:
             def get_accel_data(self):
                 return {'x': 0.0, 'y': 0.0, 'z': 1.0}
         sensor = MockMPU6050()
+        source = imu_sampler.PollingSource(sensor, IMU_RATE)
         mpu6050_connection = True
         logger.info("Using simulated MPU6050")
+
+    # The only reader of the IMU; everyone else takes samples from its ring
+    imu = imu_sampler.IMUSampler(source)
+    imu.start()
 except:
     mpu6050_connection = False
     logger.warning("MPU6050 initialization failed - balance control will be disabled")
 
+
+def make_imu_filter(Q=0.01, R=0.1):
+    """New filter over the accelerometer axes, plus the gyro when the sensor has one"""
+    return Kalman_filter.VectorKalmanFilter(imu.axes if imu is not None else imu_sampler.ACCEL_AXES, Q, R)
+
+
+def read_imu():
+    """Latest IMU sample keyed by the axes make_imu_filter() uses, plus its 'timestamp'"""
+    return imu.latest()
+
+
 # Initialize Servo Controller
 sc = RPIservo.ServoCtrl()
 sc.start()
 
 # Initialize PWM
-pwm = Adafruit_PCA9685.PCA9685()
-pwm.set_pwm_freq(50)
+pwm = bus.pwm_client(bus_owner.PRIORITY_MOTION)
 
 # Define target servo positions (PWM values) for the 3 phases
 CROUCH_POSITIONS = {
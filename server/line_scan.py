@@ -0,0 +1,58 @@
+"""Scanline-band line detection for line following
+
+Line following only ever looks at two rows of the binarized frame
+(linePos_1 and linePos_2), but findlineCV and FPV.cvFindLine converted,
+Otsu-thresholded and eroded all 640x480 pixels to get them. scan_lines()
+crops a band of ERODE_ITERATIONS rows on each side of every scanline.
+Six 3x3 erosions reach exactly that far, so the eroded scanline rows are
+the same as in the full-frame path. Only those bands are converted,
+thresholded and eroded. Otsu picks its threshold from the pixels of all
+bands together rather than the whole frame, which is the one place the
+two paths can differ. The line edges on every row are then found at
+once with NumPy.
+"""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+ERODE_ITERATIONS = 6
+
+# start/end: first and last column of the line on each scanline
+# center: mean line center over all scanlines, None if any of them lost the line
+# bands: (top row, binarized band) pairs for drawing
+LineScan = namedtuple('LineScan', 'rows start end center bands')
+
+
+def band_bounds(row, height, margin=ERODE_ITERATIONS):
+    """Rows [top, bottom) of the band needed to erode one scanline"""
+    return max(row - margin, 0), min(row + margin + 1, height)
+
+
+def scan_lines(frame, rows, color=255, iterations=ERODE_ITERATIONS):
+    """Find the line on each scanline row of a BGR frame"""
+    height, width = frame.shape[:2]
+    bounds = [band_bounds(row, height, iterations) for row in rows]
+    grays = [cv2.cvtColor(frame[top:bottom], cv2.COLOR_BGR2GRAY) for top, bottom in bounds]
+    # One Otsu threshold over all bands, applied to each band separately
+    threshold, _ = cv2.threshold(np.vstack(grays), 0, 255, cv2.THRESH_OTSU)
+    bands = []
+    for gray in grays:
+        _, binary = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+        bands.append(cv2.erode(binary, None, iterations=iterations))
+
+    lines = np.stack([band[row - top] for band, row, (top, _) in zip(bands, rows, bounds)]) == color
+    found = lines.any(axis=1)
+    start = lines.argmax(axis=1)
+    end = width - 1 - lines[:, ::-1].argmax(axis=1)
+    center = None
+    if found.all():
+        center = int(((start + end) // 2).mean())
+    return LineScan(list(rows), start, end, center, [(top, band) for band, (top, _) in zip(bands, bounds)])
+
+
+def paste_bands(image, scan):
+    """Show the binarized bands in place on a BGR or gray image"""
+    for top, band in scan.bands:
+        image[top:top + band.shape[0]] = band[..., None] if image.ndim == 3 else band
+    return image
@@ -10,19 +10,16 @@ import json
 import threading
 import time
 
-import Adafruit_PCA9685
-from mpu6050_connection import mpu6050_connection
-
-import Kalman_filter
 import PID
-from initialization import kalman_filter_X, kalman_filter_Y, X_pid, Y_pid, sensor, mpu6050_connection, sc, pwm, \
+import RPIservo
+import balance
+import gait
+import pwm_bus
+from initialization import sensor, mpu6050_connection, imu, sc, pwm, make_imu_filter, read_imu, \
     CROUCH_POSITIONS, LAUNCH_POSITIONS, LANDING_POSITIONS
 from lighting_utils import LightingError
 from robotLight import RobotLight
 
-# Initialize the servo controller using RPIservo's ServoCtrl class
-sc.start()  # Start the servo control thread
-
 # Initialize LED controller with error handling
 try:
     led = RobotLight()
@@ -33,13 +30,10 @@ except LightingError as e:
     led = None
 
 
-def _safe_light_call(func, *args, **kwargs):
-    """Helper to safely call light functions"""
+def _safe_light_call(name, *args, **kwargs):
+    """Post a light command to the RobotLight thread without waiting for it"""
     if led is not None:
-        try:
-            func(*args, **kwargs)
-        except LightingError as e:
-            print(f"Light system warning: {e}")
+        led.post(name, *args, **kwargs)
 
 
 # Define desired targets for balance (in accelerometer units)
@@ -54,9 +48,12 @@ pwm12 = pwm13 = pwm14 = pwm15 = 300
 
 # Create a dictionary to store PWM values for easier access
 PWM_VALUES = {
-    i: locals()[f'pwm{i}'] for i in range(16)
+    i: globals()[f'pwm{i}'] for i in range(16)
 }
 
+# Extra wait on top of a planned servo move before giving up on the servo thread
+SERVO_TIMEOUT_MARGIN = 1.0
+
 
 def get_pwm(channel):
     """Get PWM value for a channel"""
@@ -69,70 +66,75 @@ def set_pwm(channel, value):
     pwm.set_pwm(channel, 0, value)
 
 
-def set_all_servos(positions, speed):
+def set_all_servos(positions, speed=None, duration=0.0, timeout=None):
     """
-    Set all leg servos to the specified absolute positions using
-    the ServoCtrl class for smooth transitions.
+    Move the servos in positions ({channel: pwm}) to their absolute targets
+    together, at most speed degrees per second (None for the servo limits)
+    and taking at least duration seconds, and block until they arrive.
+
+    Without a timeout, waits SERVO_TIMEOUT_MARGIN seconds longer than the
+    move is planned to take and then raises TimeoutError.
+    Returns True on arrival, False if another move took over first.
     """
-    for i in range(12):
-        # Here we assume your ServoCtrl class provides a way to get the current position.
-        # Replace sc.getServoPosition(i) with your actual method if available.
-        current_val = sc.getServoPosition(i) if hasattr(sc, 'getServoPosition') else 0
-        diff = positions[i] - current_val
-        direction = 1 if diff >= 0 else -1
-        # singleServo(servo_index, direction, speed) initiates a controlled movement.
-        sc.singleServo(i, direction, speed)
-    # Allow time for the servos to reach close to the target.
-    time.sleep(0.5)
-    sc.stopWiggle()
+    channels = sorted(positions)
+    goals = [positions[i] for i in channels]
+    if timeout is None:
+        timeout = sc.moveTime(channels, goals, speed, duration) + SERVO_TIMEOUT_MARGIN
+    arrival = sc.moveTo(channels, goals, speed, duration)
+    return arrival.result(timeout)
+
 
+def hop(crouch_delay=0.2, launch_delay=0.15, air_time=0.3, landing_delay=0.25, speed=None, move_time=0.5):
+    """Execute a hopping sequence with smooth visual transitions
 
-def hop(crouch_delay=0.2, launch_delay=0.15, air_time=0.3, landing_delay=0.25, speed=20):
-    """Execute a hopping sequence with smooth visual transitions"""
+    Each of the crouch, launch and landing moves takes at least move_time
+    seconds (at most speed degrees per second, None for the servo limits),
+    and the legs then hold that pose for the phase's delay.
+    """
     global move_stu
     move_stu = 0
 
-    _safe_light_call(led.setStatus, 'active')
+    _safe_light_call('setStatus', 'active')
 
     try:
         # Phase 1: Crouch - Fade to green
-        _safe_light_call(led.fadeToColor, 0, 255, 0, steps=15)
-        set_all_servos(CROUCH_POSITIONS, speed)
+        _safe_light_call('fadeToColor', 0, 255, 0, steps=15)
+        set_all_servos(CROUCH_POSITIONS, speed, move_time)
         time.sleep(crouch_delay)
 
         # Phase 2: Launch - Quick transition to cyan
-        _safe_light_call(led.fadeToColor, 0, 255, 255, steps=10, delay=0.01)
-        set_all_servos(LAUNCH_POSITIONS, speed)
+        _safe_light_call('fadeToColor', 0, 255, 255, steps=10, delay=0.01)
+        set_all_servos(LAUNCH_POSITIONS, speed, move_time)
         time.sleep(launch_delay)
 
         # Phase 3: Air time - Rainbow effect
-        _safe_light_call(led.rainbow)
+        _safe_light_call('rainbow')
         start_time = time.time()
         while time.time() - start_time < air_time:
             if mpu6050_connection:
-                accelerometer_data = sensor.get_accel_data()
-                X = kalman_filter_X.kalman(accelerometer_data['x'])
-                Y = kalman_filter_Y.kalman(accelerometer_data['y'])
+                balance_filter.update(read_imu())
+                X = balance_filter.value('x')
+                Y = balance_filter.value('y')
 
                 # Adjust brightness based on orientation
                 tilt = abs(X) + abs(Y)
                 brightness = max(50, 255 - int(tilt * 20))
-                _safe_light_call(led.setBrightness, brightness)
+                _safe_light_call('setBrightness', brightness)
 
             time.sleep(0.02)
 
         # Phase 4: Landing - Smooth transition to orange
-        _safe_light_call(led.fadeToColor, 255, 165, 0, steps=20)
-        set_all_servos(LANDING_POSITIONS, speed)
+        _safe_light_call('fadeToColor', 255, 165, 0, steps=20)
+        set_all_servos(LANDING_POSITIONS, speed, move_time)
         time.sleep(landing_delay)
 
         move_stu = 1
         # Smooth transition back to idle
-        _safe_light_call(led.fadeToColor, 0, 128, 255, steps=30)
-        _safe_light_call(led.setStatus, 'idle')
+        _safe_light_call('fadeToColor', 0, 128, 255, steps=30)
+        _safe_light_call('setStatus', 'idle')
 
     except Exception as e:
-        _safe_light_call(led.setStatus, 'error')
+        _safe_light_call('setStatus', 'error')
         raise e
 
 
@@ -198,30 +200,16 @@ steady_X_set = 73
 Set PID
 '''
 P = 5
-I = 0.01
-D = 0
+I = 0
+D = 0.01
+BALANCE_RATE = 100  # Balance loop rate, Hz
 
 '''
 >>> instantiation <<<
 '''
-X_pid = PID.PID()
-X_pid.SetKp(P)
-X_pid.SetKd(I)
-X_pid.SetKi(D)
-Y_pid = PID.PID()
-Y_pid.SetKp(P)
-Y_pid.SetKd(I)
-Y_pid.SetKi(D)
-pwm = Adafruit_PCA9685.PCA9685()
-pwm.set_pwm_freq(50)
-kalman_filter_X = Kalman_filter.Kalman_filter(0.001, 0.1)
-kalman_filter_Y = Kalman_filter.Kalman_filter(0.001, 0.1)
-
-try:
-    sensor = mpu6050_connection(0x68)
-    mpu6050_connection = 1
-except:
-    mpu6050_connection = 0
+balance_pid = PID.PIDBank(('x', 'y'), 1.0 / BALANCE_RATE, Kp=P, Ki=I, Kd=D)
+frame = pwm_bus.PWMFrame(pwm)
+balance_filter = make_imu_filter(0.001, 0.1)
 
 '''
 change these two variable to adjuest the steady status.
@@ -242,6 +230,15 @@ Set a default pwm value for all servos.
 for i in range(0, 16):
     exec('pwm%d=RPIservo.init_pwm%d' % (i, i))
 
+'''
+Walking frames for move(), compiled from the settings above.
+Call gait_compiler.clear() after changing any of them at runtime.
+'''
+gait_compiler = gait.GaitCompiler([globals()['pwm%d' % i] for i in range(16)],
+                                  leftSide_direction, rightSide_direction,
+                                  leftSide_height, rightSide_height, height_change)
+dove_player = gait.GaitPlayer(frame)
+
 '''
 Get raw data from mpu6050.
 '''
@@ -301,6 +298,9 @@ left_III -<Backward>-   right_I
     pos=2---pos=3---pos=4
 
 Change the value of wiggle to set the range and direction that the legs moves.
+
+The leg functions only stage their channels, call frame.commit() once all
+legs for a step are staged so the whole step goes out as one I2C burst.
 '''
 
 
@@ -308,180 +308,180 @@ def left_I(pos, wiggle, heightAdjust=0):
     if pos == 0:
         # pwm.set_pwm(0,0,pwm0)
         if leftSide_height:
-            pwm.set_pwm(1, 0, pwm1 + heightAdjust)
+            frame.stage(1, pwm1 + heightAdjust)
         else:
-            pwm.set_pwm(1, 0, pwm1 - heightAdjust)
+            frame.stage(1, pwm1 - heightAdjust)
     else:
         if leftSide_direction:
             if pos == 1:
-                pwm.set_pwm(0, 0, pwm0)
+                frame.stage(0, pwm0)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 + 3 * height_change)
+                    frame.stage(1, pwm1 + 3 * height_change)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 - 3 * height_change)
+                    frame.stage(1, pwm1 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(0, 0, pwm0 + wiggle)
+                frame.stage(0, pwm0 + wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 - height_change)
+                    frame.stage(1, pwm1 - height_change)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 + height_change)
+                    frame.stage(1, pwm1 + height_change)
             elif pos == 3:
-                pwm.set_pwm(0, 0, pwm0)
+                frame.stage(0, pwm0)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 - height_change)
+                    frame.stage(1, pwm1 - height_change)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 + height_change)
+                    frame.stage(1, pwm1 + height_change)
             elif pos == 4:
-                pwm.set_pwm(0, 0, pwm0 - wiggle)
+                frame.stage(0, pwm0 - wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 - height_change)
+                    frame.stage(1, pwm1 - height_change)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 + height_change)
+                    frame.stage(1, pwm1 + height_change)
         else:
             if pos == 1:
-                pwm.set_pwm(0, 0, pwm0)
+                frame.stage(0, pwm0)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 + 3 * wiggle)
+                    frame.stage(1, pwm1 + 3 * wiggle)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 - 3 * wiggle)
+                    frame.stage(1, pwm1 - 3 * wiggle)
             elif pos == 2:
-                pwm.set_pwm(0, 0, pwm0 - wiggle)
+                frame.stage(0, pwm0 - wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 - wiggle)
+                    frame.stage(1, pwm1 - wiggle)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 + wiggle)
+                    frame.stage(1, pwm1 + wiggle)
             elif pos == 3:
-                pwm.set_pwm(0, 0, pwm0)
+                frame.stage(0, pwm0)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 - wiggle)
+                    frame.stage(1, pwm1 - wiggle)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 + wiggle)
+                    frame.stage(1, pwm1 + wiggle)
             elif pos == 4:
-                pwm.set_pwm(0, 0, pwm0 + wiggle)
+                frame.stage(0, pwm0 + wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(1, 0, pwm1 - wiggle)
+                    frame.stage(1, pwm1 - wiggle)
                 else:
-                    pwm.set_pwm(1, 0, pwm1 + wiggle)
+                    frame.stage(1, pwm1 + wiggle)
 
 
 def left_II(pos, wiggle, heightAdjust=0):
     if pos == 0:
         # pwm.set_pwm(2,0,pwm2)
         if leftSide_height:
-            pwm.set_pwm(3, 0, pwm3 + heightAdjust)
+            frame.stage(3, pwm3 + heightAdjust)
         else:
-            pwm.set_pwm(3, 0, pwm3 - heightAdjust)
+            frame.stage(3, pwm3 - heightAdjust)
     else:
         if leftSide_direction:
             if pos == 1:
-                pwm.set_pwm(2, 0, pwm2)
+                frame.stage(2, pwm2)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 + 3 * height_change)
+                    frame.stage(3, pwm3 + 3 * height_change)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 - 3 * height_change)
+                    frame.stage(3, pwm3 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(2, 0, pwm2 + wiggle)
+                frame.stage(2, pwm2 + wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 - height_change)
+                    frame.stage(3, pwm3 - height_change)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 + height_change)
+                    frame.stage(3, pwm3 + height_change)
             elif pos == 3:
-                pwm.set_pwm(2, 0, pwm2)
+                frame.stage(2, pwm2)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 - height_change)
+                    frame.stage(3, pwm3 - height_change)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 + height_change)
+                    frame.stage(3, pwm3 + height_change)
             elif pos == 4:
-                pwm.set_pwm(2, 0, pwm2 - wiggle)
+                frame.stage(2, pwm2 - wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 - height_change)
+                    frame.stage(3, pwm3 - height_change)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 + height_change)
+                    frame.stage(3, pwm3 + height_change)
         else:
             if pos == 1:
-                pwm.set_pwm(2, 0, pwm2)
+                frame.stage(2, pwm2)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 + 3 * wiggle)
+                    frame.stage(3, pwm3 + 3 * wiggle)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 - 3 * wiggle)
+                    frame.stage(3, pwm3 - 3 * wiggle)
             elif pos == 2:
-                pwm.set_pwm(2, 0, pwm2 - wiggle)
+                frame.stage(2, pwm2 - wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 - wiggle)
+                    frame.stage(3, pwm3 - wiggle)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 + wiggle)
+                    frame.stage(3, pwm3 + wiggle)
             elif pos == 3:
-                pwm.set_pwm(2, 0, pwm2)
+                frame.stage(2, pwm2)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 - wiggle)
+                    frame.stage(3, pwm3 - wiggle)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 + wiggle)
+                    frame.stage(3, pwm3 + wiggle)
             elif pos == 4:
-                pwm.set_pwm(2, 0, pwm2 + wiggle)
+                frame.stage(2, pwm2 + wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(3, 0, pwm3 - wiggle)
+                    frame.stage(3, pwm3 - wiggle)
                 else:
-                    pwm.set_pwm(3, 0, pwm3 + wiggle)
+                    frame.stage(3, pwm3 + wiggle)
 
 
 def left_III(pos, wiggle, heightAdjust=0):
     if pos == 0:
         # pwm.set_pwm(4,0,pwm4)
         if leftSide_height:
-            pwm.set_pwm(5, 0, pwm5 + heightAdjust)
+            frame.stage(5, pwm5 + heightAdjust)
         else:
-            pwm.set_pwm(5, 0, pwm5 - heightAdjust)
+            frame.stage(5, pwm5 - heightAdjust)
     else:
         if leftSide_direction:
             if pos == 1:
-                pwm.set_pwm(4, 0, pwm4)
+                frame.stage(4, pwm4)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 + 3 * height_change)
+                    frame.stage(5, pwm5 + 3 * height_change)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 - 3 * height_change)
+                    frame.stage(5, pwm5 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(4, 0, pwm4 + wiggle)
+                frame.stage(4, pwm4 + wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 - height_change)
+                    frame.stage(5, pwm5 - height_change)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 + height_change)
+                    frame.stage(5, pwm5 + height_change)
             elif pos == 3:
-                pwm.set_pwm(4, 0, pwm4)
+                frame.stage(4, pwm4)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 - height_change)
+                    frame.stage(5, pwm5 - height_change)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 + height_change)
+                    frame.stage(5, pwm5 + height_change)
             elif pos == 4:
-                pwm.set_pwm(4, 0, pwm4 - wiggle)
+                frame.stage(4, pwm4 - wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 - height_change)
+                    frame.stage(5, pwm5 - height_change)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 + height_change)
+                    frame.stage(5, pwm5 + height_change)
         else:
             if pos == 1:
-                pwm.set_pwm(4, 0, pwm4)
+                frame.stage(4, pwm4)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 + 3 * wiggle)
+                    frame.stage(5, pwm5 + 3 * wiggle)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 - 3 * wiggle)
+                    frame.stage(5, pwm5 - 3 * wiggle)
             elif pos == 2:
-                pwm.set_pwm(4, 0, pwm4 - wiggle)
+                frame.stage(4, pwm4 - wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 - wiggle)
+                    frame.stage(5, pwm5 - wiggle)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 + wiggle)
+                    frame.stage(5, pwm5 + wiggle)
             elif pos == 3:
-                pwm.set_pwm(4, 0, pwm4)
+                frame.stage(4, pwm4)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 - wiggle)
+                    frame.stage(5, pwm5 - wiggle)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 + wiggle)
+                    frame.stage(5, pwm5 + wiggle)
             elif pos == 4:
-                pwm.set_pwm(4, 0, pwm4 + wiggle)
+                frame.stage(4, pwm4 + wiggle)
                 if leftSide_height:
-                    pwm.set_pwm(5, 0, pwm5 - wiggle)
+                    frame.stage(5, pwm5 - wiggle)
                 else:
-                    pwm.set_pwm(5, 0, pwm5 + wiggle)
+                    frame.stage(5, pwm5 + wiggle)
 
 
 def right_I(pos, wiggle, heightAdjust=0):
@@ -489,60 +489,60 @@ def right_I(pos, wiggle, heightAdjust=0):
     if pos == 0:
         # pwm.set_pwm(6,0,pwm6)
         if rightSide_height:
-            pwm.set_pwm(7, 0, pwm7 + heightAdjust)
+            frame.stage(7, pwm7 + heightAdjust)
         else:
-            pwm.set_pwm(7, 0, pwm7 - heightAdjust)
+            frame.stage(7, pwm7 - heightAdjust)
     else:
         if rightSide_direction:
             if pos == 1:
-                pwm.set_pwm(6, 0, pwm6)
+                frame.stage(6, pwm6)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 + 3 * height_change)
+                    frame.stage(7, pwm7 + 3 * height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 - 3 * height_change)
+                    frame.stage(7, pwm7 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(6, 0, pwm6 + wiggle)
+                frame.stage(6, pwm6 + wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 - height_change)
+                    frame.stage(7, pwm7 - height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 + height_change)
+                    frame.stage(7, pwm7 + height_change)
             elif pos == 3:
-                pwm.set_pwm(6, 0, pwm6)
+                frame.stage(6, pwm6)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 - height_change)
+                    frame.stage(7, pwm7 - height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 + height_change)
+                    frame.stage(7, pwm7 + height_change)
             elif pos == 4:
-                pwm.set_pwm(6, 0, pwm6 - wiggle)
+                frame.stage(6, pwm6 - wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 - height_change)
+                    frame.stage(7, pwm7 - height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 + height_change)
+                    frame.stage(7, pwm7 + height_change)
         else:
             if pos == 1:
-                pwm.set_pwm(6, 0, pwm6)
+                frame.stage(6, pwm6)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 + 3 * height_change)
+                    frame.stage(7, pwm7 + 3 * height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 - 3 * height_change)
+                    frame.stage(7, pwm7 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(6, 0, pwm6 - wiggle)
+                frame.stage(6, pwm6 - wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 - height_change)
+                    frame.stage(7, pwm7 - height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 + height_change)
+                    frame.stage(7, pwm7 + height_change)
             elif pos == 3:
-                pwm.set_pwm(6, 0, pwm6)
+                frame.stage(6, pwm6)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 - height_change)
+                    frame.stage(7, pwm7 - height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 + height_change)
+                    frame.stage(7, pwm7 + height_change)
             elif pos == 4:
-                pwm.set_pwm(6, 0, pwm6 + wiggle)
+                frame.stage(6, pwm6 + wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(7, 0, pwm7 - height_change)
+                    frame.stage(7, pwm7 - height_change)
                 else:
-                    pwm.set_pwm(7, 0, pwm7 + height_change)
+                    frame.stage(7, pwm7 + height_change)
 
 
 def right_II(pos, wiggle, heightAdjust=0):
@@ -550,60 +550,60 @@ def right_II(pos, wiggle, heightAdjust=0):
     if pos == 0:
         # pwm.set_pwm(8,0,pwm8)
         if rightSide_height:
-            pwm.set_pwm(9, 0, pwm9 + heightAdjust)
+            frame.stage(9, pwm9 + heightAdjust)
         else:
-            pwm.set_pwm(9, 0, pwm9 - heightAdjust)
+            frame.stage(9, pwm9 - heightAdjust)
     else:
         if rightSide_direction:
             if pos == 1:
-                pwm.set_pwm(8, 0, pwm8)
+                frame.stage(8, pwm8)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 + 3 * height_change)
+                    frame.stage(9, pwm9 + 3 * height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 - 3 * height_change)
+                    frame.stage(9, pwm9 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(8, 0, pwm8 + wiggle)
+                frame.stage(8, pwm8 + wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 - height_change)
+                    frame.stage(9, pwm9 - height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 + height_change)
+                    frame.stage(9, pwm9 + height_change)
             elif pos == 3:
-                pwm.set_pwm(8, 0, pwm8)
+                frame.stage(8, pwm8)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 - height_change)
+                    frame.stage(9, pwm9 - height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 + height_change)
+                    frame.stage(9, pwm9 + height_change)
             elif pos == 4:
-                pwm.set_pwm(8, 0, pwm8 - wiggle)
+                frame.stage(8, pwm8 - wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 - height_change)
+                    frame.stage(9, pwm9 - height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 + height_change)
+                    frame.stage(9, pwm9 + height_change)
         else:
             if pos == 1:
-                pwm.set_pwm(8, 0, pwm8)
+                frame.stage(8, pwm8)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 + 3 * height_change)
+                    frame.stage(9, pwm9 + 3 * height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 - 3 * height_change)
+                    frame.stage(9, pwm9 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(8, 0, pwm8 - wiggle)
+                frame.stage(8, pwm8 - wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 - height_change)
+                    frame.stage(9, pwm9 - height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 + height_change)
+                    frame.stage(9, pwm9 + height_change)
             elif pos == 3:
-                pwm.set_pwm(8, 0, pwm8)
+                frame.stage(8, pwm8)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 - height_change)
+                    frame.stage(9, pwm9 - height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 + height_change)
+                    frame.stage(9, pwm9 + height_change)
             elif pos == 4:
-                pwm.set_pwm(8, 0, pwm8 + wiggle)
+                frame.stage(8, pwm8 + wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(9, 0, pwm9 - height_change)
+                    frame.stage(9, pwm9 - height_change)
                 else:
-                    pwm.set_pwm(9, 0, pwm9 + height_change)
+                    frame.stage(9, pwm9 + height_change)
 
 
 def right_III(pos, wiggle, heightAdjust=0):
@@ -611,98 +611,72 @@ def right_III(pos, wiggle, heightAdjust=0):
     if pos == 0:
         # pwm.set_pwm(10,0,pwm10)
         if rightSide_height:
-            pwm.set_pwm(11, 0, pwm11 + heightAdjust)
+            frame.stage(11, pwm11 + heightAdjust)
         else:
-            pwm.set_pwm(11, 0, pwm11 - heightAdjust)
+            frame.stage(11, pwm11 - heightAdjust)
     else:
         if rightSide_direction:
             if pos == 1:
-                pwm.set_pwm(10, 0, pwm10)
+                frame.stage(10, pwm10)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 + 3 * height_change)
+                    frame.stage(11, pwm11 + 3 * height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 - 3 * height_change)
+                    frame.stage(11, pwm11 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(10, 0, pwm10 + wiggle)
+                frame.stage(10, pwm10 + wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 - height_change)
+                    frame.stage(11, pwm11 - height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 + height_change)
+                    frame.stage(11, pwm11 + height_change)
             elif pos == 3:
-                pwm.set_pwm(10, 0, pwm10)
+                frame.stage(10, pwm10)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 - height_change)
+                    frame.stage(11, pwm11 - height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 + height_change)
+                    frame.stage(11, pwm11 + height_change)
             elif pos == 4:
-                pwm.set_pwm(10, 0, pwm10 - wiggle)
+                frame.stage(10, pwm10 - wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 - height_change)
+                    frame.stage(11, pwm11 - height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 + height_change)
+                    frame.stage(11, pwm11 + height_change)
         else:
             if pos == 1:
-                pwm.set_pwm(10, 0, pwm10)
+                frame.stage(10, pwm10)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 + 3 * height_change)
+                    frame.stage(11, pwm11 + 3 * height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 - 3 * height_change)
+                    frame.stage(11, pwm11 - 3 * height_change)
             elif pos == 2:
-                pwm.set_pwm(10, 0, pwm10 - wiggle)
+                frame.stage(10, pwm10 - wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 - height_change)
+                    frame.stage(11, pwm11 - height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 + height_change)
+                    frame.stage(11, pwm11 + height_change)
             elif pos == 3:
-                pwm.set_pwm(10, 0, pwm10)
+                frame.stage(10, pwm10)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 - height_change)
+                    frame.stage(11, pwm11 - height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 + height_change)
+                    frame.stage(11, pwm11 + height_change)
             elif pos == 4:
-                pwm.set_pwm(10, 0, pwm10 + wiggle)
+                frame.stage(10, pwm10 + wiggle)
                 if rightSide_height:
-                    pwm.set_pwm(11, 0, pwm11 - height_change)
+                    frame.stage(11, pwm11 - height_change)
                 else:
-                    pwm.set_pwm(11, 0, pwm11 + height_change)
+                    frame.stage(11, pwm11 + height_change)
 
 
 def move(step_input, speed, command):
     """Movement control with visual feedback"""
-    step_I = step_input
-    step_II = step_input + 2
-
-    if step_II > 4:
-        step_II = step_II - 4
     if speed == 0:
-        _safe_light_call(led.setStatus, 'idle')
+        _safe_light_call('setStatus', 'idle')
         return
 
-    _safe_light_call(led.setStatus, 'active')
-    if command == 'no':
-        right_I(step_I, speed, 0)
-        left_II(step_I, speed, 0)
-        right_III(step_I, speed, 0)
-
-        left_I(step_II, speed, 0)
-        right_II(step_II, speed, 0)
-        left_III(step_II, speed, 0)
-    elif command == 'left':
-        right_I(step_I, speed, 0)
-        left_II(step_I, -speed, 0)
-        right_III(step_I, speed, 0)
-
-        left_I(step_II, -speed, 0)
-        right_II(step_II, speed, 0)
-        left_III(step_II, -speed, 0)
-    elif command == 'right':
-        right_I(step_I, -speed, 0)
-        left_II(step_I, speed, 0)
-        right_III(step_I, -speed, 0)
-
-        left_I(step_II, speed, 0)
-        right_II(step_II, -speed, 0)
-        left_III(step_II, speed, 0)
+    _safe_light_call('setStatus', 'active')
+    for channel, value in gait_compiler.frame(step_input, command, speed):
+        frame.stage(channel, value)
+    frame.commit()
 
 
 def stand():
@@ -799,308 +773,91 @@ def dove_Right_III(horizontal, vertical):
 
 
 def dove(step_input, speed, timeLast, dpi, command):
-    step_I = step_input
-    step_II = step_input + 2
-
-    if step_II > 4:
-        step_II = step_II - 4
-
-    if speed > 0:
-        if step_input == 1:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_I, 3 * speed_II)
-                    dove_Right_II(-speed_I, 3 * speed_II)
-                    dove_Left_III(-speed_I, 3 * speed_II)
-
-                    dove_Right_I(speed_I, -10)
-                    dove_Left_II(speed_I, -10)
-                    dove_Right_III(speed_I, -10)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if command == 'left':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_I, 3 * speed_II)
-                    dove_Right_II(-speed_I, 3 * speed_II)
-                    dove_Left_III(speed_I, 3 * speed_II)
-
-                    dove_Right_I(speed_I, -10)
-                    dove_Left_II(-speed_I, -10)
-                    dove_Right_III(speed_I, -10)
-                    time.sleep(timeLast / dpi)
-                elif command == 'right':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_I, 3 * speed_II)
-                    dove_Right_II(speed_I, 3 * speed_II)
-                    dove_Left_III(-speed_I, 3 * speed_II)
-
-                    dove_Right_I(-speed_I, -10)
-                    dove_Left_II(speed_I, -10)
-                    dove_Right_III(-speed_I, -10)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if move_stu == 0 and command == 'no':
-                    break
-
-        elif step_input == 2:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_II, 3 * (speed - speed_II))
-                    dove_Right_II(speed_II, 3 * (speed - speed_II))
-                    dove_Left_III(speed_II, 3 * (speed - speed_II))
-
-                    dove_Right_I(-speed_II, -10)
-                    dove_Left_II(-speed_II, -10)
-                    dove_Right_III(-speed_II, -10)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if command == 'left':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_II, 3 * (speed - speed_II))
-                    dove_Right_II(speed_II, 3 * (speed - speed_II))
-                    dove_Left_III(-speed_II, 3 * (speed - speed_II))
-
-                    dove_Right_I(-speed_II, -10)
-                    dove_Left_II(speed_II, -10)
-                    dove_Right_III(-speed_II, -10)
-                    time.sleep(timeLast / dpi)
-                elif command == 'right':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_II, 3 * (speed - speed_II))
-                    dove_Right_II(-speed_II, 3 * (speed - speed_II))
-                    dove_Left_III(speed_II, 3 * (speed - speed_II))
-
-                    dove_Right_I(speed_II, -10)
-                    dove_Left_II(-speed_II, -10)
-                    dove_Right_III(speed_II, -10)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if move_stu == 0 and command == 'no':
-                    break
-        elif step_input == 3:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_I, -10)
-                    dove_Right_II(speed_I, -10)
-                    dove_Left_III(speed_I, -10)
-
-                    dove_Right_I(-speed_I, 3 * speed_II)
-                    dove_Left_II(-speed_I, 3 * speed_II)
-                    dove_Right_III(-speed_I, 3 * speed_II)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if command == 'left':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_I, -10)
-                    dove_Right_II(speed_I, -10)
-                    dove_Left_III(-speed_I, -10)
-
-                    dove_Right_I(-speed_I, 3 * speed_II)
-                    dove_Left_II(speed_I, 3 * speed_II)
-                    dove_Right_III(-speed_I, 3 * speed_II)
-                    time.sleep(timeLast / dpi)
-                elif command == 'right':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_I, -10)
-                    dove_Right_II(-speed_I, -10)
-                    dove_Left_III(speed_I, -10)
-
-                    dove_Right_I(speed_I, 3 * speed_II)
-                    dove_Left_II(-speed_I, 3 * speed_II)
-                    dove_Right_III(speed_I, 3 * speed_II)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if move_stu == 0 and command == 'no':
-                    break
-        elif step_input == 4:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_II, -10)
-                    dove_Right_II(-speed_II, -10)
-                    dove_Left_III(-speed_II, -10)
-
-                    dove_Right_I(speed_II, 3 * (speed - speed_II))
-                    dove_Left_II(speed_II, 3 * (speed - speed_II))
-                    dove_Right_III(speed_II, 3 * (speed - speed_II))
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if command == 'left':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_II, -10)
-                    dove_Right_II(-speed_II, -10)
-                    dove_Left_III(speed_II, -10)
-
-                    dove_Right_I(speed_II, 3 * (speed - speed_II))
-                    dove_Left_II(-speed_II, 3 * (speed - speed_II))
-                    dove_Right_III(speed_II, 3 * (speed - speed_II))
-                    time.sleep(timeLast / dpi)
-                elif command == 'right':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_II, -10)
-                    dove_Right_II(speed_II, -10)
-                    dove_Left_III(-speed_II, -10)
-
-                    dove_Right_I(-speed_II, 3 * (speed - speed_II))
-                    dove_Left_II(speed_II, 3 * (speed - speed_II))
-                    dove_Right_III(-speed_II, 3 * (speed - speed_II))
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-
-                if move_stu == 0 and command == 'no':
-                    break
-    else:
-        speed = -speed
-        if step_input == 1:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_I, 3 * speed_II)
-                    dove_Right_II(speed_I, 3 * speed_II)
-                    dove_Left_III(speed_I, 3 * speed_II)
-
-                    dove_Right_I(-speed_I, -10)
-                    dove_Left_II(-speed_I, -10)
-                    dove_Right_III(-speed_I, -10)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-        elif step_input == 2:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_II, 3 * (speed - speed_II))
-                    dove_Right_II(-speed_II, 3 * (speed - speed_II))
-                    dove_Left_III(-speed_II, 3 * (speed - speed_II))
-
-                    dove_Right_I(speed_II, -10)
-                    dove_Left_II(speed_II, -10)
-                    dove_Right_III(speed_II, -10)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-        elif step_input == 3:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(-speed_I, -10)
-                    dove_Right_II(-speed_I, -10)
-                    dove_Left_III(-speed_I, -10)
-
-                    dove_Right_I(speed_I, 3 * speed_II)
-                    dove_Left_II(speed_I, 3 * speed_II)
-                    dove_Right_III(speed_I, 3 * speed_II)
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
-        elif step_input == 4:
-            for speed_I in range(0, (speed + int(speed / dpi)), int(speed / dpi)):
-                if move_stu and command == 'no':
-                    speed_II = speed_I
-                    speed_I = speed - speed_I
-                    dove_Left_I(speed_II, -10)
-                    dove_Right_II(speed_II, -10)
-                    dove_Left_III(speed_II, -10)
-
-                    dove_Right_I(-speed_II, 3 * (speed - speed_II))
-                    dove_Left_II(-speed_II, 3 * (speed - speed_II))
-                    dove_Right_III(-speed_II, 3 * (speed - speed_II))
-                    time.sleep(timeLast / dpi)
-                else:
-                    pass
+    """Smooth step: stream the compiled sub-step frames, one every timeLast / dpi seconds"""
+    frames = gait_compiler.dove_frames(step_input, speed, dpi, command)
+    keep_going = (lambda: move_stu) if command == 'no' else None
+    dove_player.play(frames, timeLast / dpi, keep_going)
 
 
 def steady_X():
+    """Stage the steady-mode horizontal positions; steady() commits them with the leg heights"""
     if leftSide_direction:
-        pwm.set_pwm(0, 0, pwm0 + steady_X_set)
-        pwm.set_pwm(2, 0, pwm2)
-        pwm.set_pwm(4, 0, pwm4 - steady_X_set)
+        frame.stage(0, pwm0 + steady_X_set)
+        frame.stage(2, pwm2)
+        frame.stage(4, pwm4 - steady_X_set)
     else:
-        pwm.set_pwm(0, 0, pwm0 + steady_X_set)
-        pwm.set_pwm(2, 0, pwm2)
-        pwm.set_pwm(4, 0, pwm4 - steady_X_set)
+        frame.stage(0, pwm0 + steady_X_set)
+        frame.stage(2, pwm2)
+        frame.stage(4, pwm4 - steady_X_set)
 
     if rightSide_direction:
-        pwm.set_pwm(10, 0, pwm10 + steady_X_set)
-        pwm.set_pwm(8, 0, pwm8)
-        pwm.set_pwm(6, 0, pwm6 - steady_X_set)
+        frame.stage(10, pwm10 + steady_X_set)
+        frame.stage(8, pwm8)
+        frame.stage(6, pwm6 - steady_X_set)
     else:
-        pwm.set_pwm(10, 0, pwm10 - steady_X_set)
-        pwm.set_pwm(8, 0, pwm8)
-        pwm.set_pwm(6, 0, pwm6 + steady_X_set)
+        frame.stage(10, pwm10 - steady_X_set)
+        frame.stage(8, pwm8)
+        frame.stage(6, pwm6 + steady_X_set)
+
+
+def stage_leg_heights(heights):
+    """Stage a height offset for every leg and send them as one burst"""
+    for leg, height in zip(balance.LEGS, heights):
+        for channel, value in gait_compiler.leg_frame(leg, 0, 35, int(height)).items():
+            frame.stage(channel, value)
+    frame.commit()
+
+
+balancer = balance.BalanceController(read_imu, balance_filter, balance_pid, stage_leg_heights,
+                                     steady_range_Min, steady_range_Max, BALANCE_RATE)
+LIGHT_DECIMATION = 10  # Balance ticks per tilt light update
 
 
 def steady():
-    """Enhanced balance control with responsive visual feedback"""
-    global X_fix_output, Y_fix_output
-    if mpu6050_connection:
-        try:
-            accelerometer_data = sensor.get_accel_data()
-            X = kalman_filter_X.kalman(accelerometer_data['x'])
-            Y = kalman_filter_Y.kalman(accelerometer_data['y'])
-
-            # Calculate tilt severity
-            tilt_magnitude = (abs(X) + abs(Y)) / 2
-
-            if tilt_magnitude > 5:
-                # Red warning for severe tilt
-                _safe_light_call(led.fadeToColor, 255, 0, 0)
-            elif tilt_magnitude > 2:
-                # Yellow warning for moderate tilt
-                _safe_light_call(led.fadeToColor, 255, 255, 0)
-            else:
-                # Green for stable
-                _safe_light_call(led.fadeToColor, 0, 255, 0)
+    """One fixed-rate balance step: IMU sample, Kalman, PID, leg heights
 
-            # Adjust brightness based on motion
-            brightness = max(50, 255 - int(tilt_magnitude * 20))
-            _safe_light_call(led.setBrightness, brightness)
+    Returns after the balance period, so callers can simply loop on it.
+    """
+    if not mpu6050_connection:
+        time.sleep(1.0 / BALANCE_RATE)
+        return
+    try:
+        balancer.tick((target_X, target_Y))
+        if balancer.ticks % LIGHT_DECIMATION == 0:
+            show_tilt(*balancer.tilt)
+    except Exception as e:
+        _safe_light_call('setStatus', 'error')
+        print(f"Balance error: {e}")
+        time.sleep(1.0 / BALANCE_RATE)
+
+
+def show_tilt(X, Y):
+    """Visual feedback for the current body tilt"""
+    # Calculate tilt severity
+    tilt_magnitude = (abs(X) + abs(Y)) / 2
+
+    if tilt_magnitude > 5:
+        # Red warning for severe tilt
+        _safe_light_call('fadeToColor', 255, 0, 0)
+    elif tilt_magnitude > 2:
+        # Yellow warning for moderate tilt
+        _safe_light_call('fadeToColor', 255, 255, 0)
+    else:
+        # Green for stable
+        _safe_light_call('fadeToColor', 0, 255, 0)
 
-            if X < -2:
-                _safe_light_call(led.turnLeft)
-            elif X > 2:
-                _safe_light_call(led.turnRight)
+    # Adjust brightness based on motion
+    brightness = max(50, 255 - int(tilt_magnitude * 20))
+    _safe_light_call('setBrightness', brightness)
 
-            # Return to idle if very stable
-            if abs(X) <= 1 and abs(Y) <= 1:
-                _safe_light_call(led.setStatus, 'idle')
+    if X < -2:
+        _safe_light_call('turnLeft')
+    elif X > 2:
+        _safe_light_call('turnRight')
 
-        except Exception as e:
-            _safe_light_call(led.setStatus, 'error')
-            print(f"Balance error: {e}")
+    # Return to idle if very stable
+    if abs(X) <= 1 and abs(Y) <= 1:
+        _safe_light_call('setStatus', 'idle')
 
 
 def steadyTest():
@@ -1132,6 +889,7 @@ def steadyTest():
         right_I(0, 35, right_H)
         right_II(0, 35, right_H)
         right_III(0, 35, right_H)
+        frame.commit()
 
         time.sleep(1)
 
@@ -1144,6 +902,7 @@ def steadyTest():
         right_I(0, 35, right_H)
         right_II(0, 35, right_H)
         right_III(0, 35, right_H)
+        frame.commit()
 
         time.sleep(1)
 
@@ -1206,11 +965,13 @@ def relesae():
 
 def clean_all():
     """Clean shutdown with visual indication"""
-    _safe_light_call(led.setStatus, 'warning')  # Show warning state
+    _safe_light_call('setStatus', 'warning')  # Show warning state
     time.sleep(0.5)
     pwm.set_all_pwm(0, 0)
-    _safe_light_call(led.pause)
-    _safe_light_call(led.setColor, 0, 0, 0)  # Turn off all LEDs
+    _safe_light_call('pause')
+    _safe_light_call('setColor', 0, 0, 0)  # Turn off all LEDs
+    if led is not None:
+        led.flush()  # The process may exit right after this
 
 
 def destroy():
@@ -1379,9 +1140,11 @@ def commandInput(command_input, speed=20):
         rm.resume()
         SmoothMode = 1
     elif command_input == 'KD':
+        balancer.reset()
         steadyMode = 1
         rm.resume()
     elif command_input == 'speech':
+        balancer.reset()
         steadyMode = 1
         rm.resume()
     elif command_input == 'speechOff':
@@ -1403,34 +1166,25 @@ def handle_parameter_update(params, command_data):
         # Kalman filter parameters
         if param_name in ['Q', 'R', 'alpha', 'history']:
             if param_name == 'Q':
-                kalman_filter_X.Q = value
-                kalman_filter_Y.Q = value
+                balance_filter.set_noise(Q=value)
             elif param_name == 'R':
-                kalman_filter_X.R = value
-                kalman_filter_Y.R = value
+                balance_filter.set_noise(R=value)
             elif param_name == 'alpha':
-                kalman_filter_X.alpha_R = value
-                kalman_filter_Y.alpha_R = value
-                kalman_filter_X.alpha_Q = value * 0.1  # Keep Q learning rate lower
-                kalman_filter_Y.alpha_Q = value * 0.1
+                balance_filter.alpha_R = value
+                balance_filter.alpha_Q = value * 0.1  # Keep Q learning rate lower
             elif param_name == 'history':
-                kalman_filter_X.history_max_size = int(value)
-                kalman_filter_Y.history_max_size = int(value)
+                balance_filter.history_max_size = int(value)
 
         # PID parameters
         elif param_name in ['P', 'I', 'D', 'windup']:
             if param_name == 'P':
-                X_pid.SetKp(value)
-                Y_pid.SetKp(value)
+                balance_pid.set_gains(Kp=value)
             elif param_name == 'I':
-                X_pid.SetKi(value)
-                Y_pid.SetKi(value)
+                balance_pid.set_gains(Ki=value)
             elif param_name == 'D':
-                X_pid.SetKd(value)
-                Y_pid.SetKd(value)
+                balance_pid.set_gains(Kd=value)
             elif param_name == 'windup':
-                X_pid.SetWindup(value)
-                Y_pid.SetWindup(value)
+                balance_pid.set_windup(value)
 
         # Movement parameters
         elif param_name in ['speed_scale', 'turn_scale', 'step_size', 'smoothing']:
@@ -1465,14 +1219,20 @@ def handle_parameter_update(params, command_data):
 
 def get_monitor_data():
     """Collect current monitoring data for parameter panel"""
+    from info import monitor
+
     monitor_data = {
-        'kalman_x': kalman_filter_X.get_parameters(),
-        'kalman_y': kalman_filter_Y.get_parameters(),
-        'pid_x': X_pid.get_status(),
-        'pid_y': Y_pid.get_status(),
-        'balance_error': abs(target_X - kalman_filter_X.kalman_adc_old) + abs(
-            target_Y - kalman_filter_Y.kalman_adc_old),
-        'stability': calc_stability_metric()
+        'kalman_x': balance_filter.get_parameters('x'),
+        'kalman_y': balance_filter.get_parameters('y'),
+        'pid_x': balance_pid.get_status('x'),
+        'pid_y': balance_pid.get_status('y'),
+        'balance_error': abs(target_X - balance_filter.value('x')) + abs(
+            target_Y - balance_filter.value('y')),
+        'stability': monitor.snapshot('stability'),
+        'pwm_cache': pwm.get_stats(),
+        'imu': imu.get_stats() if imu is not None else None,
+        'balance': balancer.get_stats(),
+        'snapshots': monitor.snapshots.get_stats()
     }
     return json.dumps(monitor_data)
 
@@ -1483,7 +1243,8 @@ def calc_stability_metric():
         return 0
 
     try:
-        accel_data = sensor.get_accel_data()
+        from info import monitor
+        accel_data = monitor.snapshot('imu')
         x_error = abs(accel_data['x'] - target_X)
         y_error = abs(accel_data['y'] - target_Y)
 
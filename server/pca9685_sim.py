@@ -0,0 +1,169 @@
+"""Simulated PCA9685 for running the servo stack off the Pi
+
+SimulatedPCA9685 has the same interface as Adafruit_PCA9685.PCA9685 and sits
+on a SimulatedI2CDevice that keeps the chip's 256-byte register file, applies
+writes the way the silicon does (auto-increment, ALL_LED fan-out), charges
+every transaction to a latency model and logs it. bus_owner.get_bus() uses
+it when SIMULATE_HARDWARE=true, which makes gait and servo-loop throughput
+measurable on a plain Linux box and bus traffic checkable in tests.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+import pwm_bus
+
+logger = logging.getLogger(__name__)
+
+# PCA9685 registers and bits not already in pwm_bus
+MODE2 = 0x01
+ALL_LED_ON_L = 0xFA
+PRESCALE = 0xFE
+SLEEP = 0x10
+ALLCALL = 0x01
+OUTDRV = 0x04
+OSCILLATOR_HZ = 25000000.0
+
+
+class LatencyModel:
+    """Bus time for one transaction: fixed overhead plus a cost per data byte
+
+    The defaults approximate a 100 kHz bus: START, address and register
+    byte cost about 0.2 ms, and every data byte another 9 bit times. With
+    realtime=True the caller is also blocked for that long.
+    """
+
+    def __init__(self, per_transaction=200e-6, per_byte=90e-6, realtime=False, sleep=time.sleep):
+        self.per_transaction = per_transaction
+        self.per_byte = per_byte
+        self.realtime = realtime
+        self._sleep = sleep
+
+    def cost(self, data_bytes):
+        return self.per_transaction + self.per_byte * data_bytes
+
+    def charge(self, data_bytes):
+        cost = self.cost(data_bytes)
+        if self.realtime and cost > 0:
+            self._sleep(cost)
+        return cost
+
+
+class SimulatedI2CDevice:
+    """In-memory stand-in for Adafruit_GPIO.I2C.Device at one address"""
+
+    def __init__(self, address=0x40, latency=None, log_size=4096):
+        self._address = address
+        self.latency = latency or LatencyModel()
+        self.registers = bytearray(256)
+        self.registers[pwm_bus.MODE1] = SLEEP | ALLCALL
+        self.log = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bus_time = 0.0
+
+    def _record(self, kind, register, data):
+        self.transactions += 1
+        self.bytes_written += len(data)
+        self.bus_time += self.latency.charge(len(data))
+        self.log.append((time.monotonic(), kind, register, bytes(data)))
+
+    def _store(self, register, value):
+        self.registers[register] = value & 0xFF
+        if ALL_LED_ON_L <= register < ALL_LED_ON_L + pwm_bus.REGISTERS_PER_CHANNEL:
+            offset = register - ALL_LED_ON_L
+            for channel in range(pwm_bus.CHANNEL_COUNT):
+                self.registers[pwm_bus.LED0_ON_L + pwm_bus.REGISTERS_PER_CHANNEL * channel + offset] = value & 0xFF
+
+    def write8(self, register, value):
+        with self._lock:
+            self._store(register, value)
+            self._record('write8', register, [value])
+
+    def writeList(self, register, data):
+        with self._lock:
+            if self.registers[pwm_bus.MODE1] & pwm_bus.AUTO_INCREMENT:
+                for offset, value in enumerate(data):
+                    self._store((register + offset) & 0xFF, value)
+            else:
+                # Without AI every byte lands on the same register
+                for value in data:
+                    self._store(register, value)
+            self._record('writeList', register, data)
+
+    def readU8(self, register):
+        with self._lock:
+            self._record('readU8', register, [])
+            return self.registers[register]
+
+    def readList(self, register, length):
+        with self._lock:
+            self._record('readList', register, [])
+            return [self.registers[(register + i) & 0xFF] for i in range(length)]
+
+    def channel(self, channel):
+        """Decoded (on, off) of one channel"""
+        base = pwm_bus.LED0_ON_L + pwm_bus.REGISTERS_PER_CHANNEL * channel
+        on_l, on_h, off_l, off_h = self.registers[base:base + pwm_bus.REGISTERS_PER_CHANNEL]
+        return (on_h & 0x0F) << 8 | on_l, (off_h & 0x0F) << 8 | off_l
+
+    def reset_stats(self):
+        with self._lock:
+            self.log.clear()
+            self.transactions = 0
+            self.bytes_written = 0
+            self.bus_time = 0.0
+
+    def get_stats(self):
+        """Get bus traffic counters (bus_time in seconds)"""
+        with self._lock:
+            return {
+                'transactions': self.transactions,
+                'bytes_written': self.bytes_written,
+                'bus_time': self.bus_time,
+            }
+
+
+class SimulatedPCA9685:
+    """Drop-in replacement for Adafruit_PCA9685.PCA9685 backed by SimulatedI2CDevice
+
+    Register traffic matches the Adafruit driver byte for byte, so per-channel
+    writes still cost four transactions and burst writes through PWMFrame
+    show up as one.
+    """
+
+    def __init__(self, address=0x40, latency=None, **kwargs):
+        self._device = SimulatedI2CDevice(address, latency)
+        self.set_all_pwm(0, 0)
+        self._device.write8(MODE2, OUTDRV)
+        self._device.write8(pwm_bus.MODE1, ALLCALL)
+        mode1 = self._device.readU8(pwm_bus.MODE1)
+        self._device.write8(pwm_bus.MODE1, mode1 & ~SLEEP)
+
+    def set_pwm_freq(self, freq_hz):
+        prescale = int(math.floor(OSCILLATOR_HZ / 4096.0 / float(freq_hz) - 1.0 + 0.5))
+        logger.debug(f"Simulated PCA9685 prescale {prescale} for {freq_hz} Hz")
+        oldmode = self._device.readU8(pwm_bus.MODE1)
+        self._device.write8(pwm_bus.MODE1, (oldmode & 0x7F) | SLEEP)
+        self._device.write8(PRESCALE, prescale)
+        self._device.write8(pwm_bus.MODE1, oldmode)
+        self._device.write8(pwm_bus.MODE1, oldmode | 0x80)
+
+    def set_pwm(self, channel, on, off):
+        base = pwm_bus.LED0_ON_L + pwm_bus.REGISTERS_PER_CHANNEL * channel
+        for offset, value in enumerate(pwm_bus.channel_bytes(on, off)):
+            self._device.write8(base + offset, value)
+
+    def set_all_pwm(self, on, off):
+        for offset, value in enumerate(pwm_bus.channel_bytes(on, off)):
+            self._device.write8(ALL_LED_ON_L + offset, value)
+
+    def channels(self):
+        """Current off value of every channel, as the servos would see it"""
+        return [self._device.channel(channel)[1] for channel in range(pwm_bus.CHANNEL_COUNT)]
+
+    def get_stats(self):
+        return self._device.get_stats()
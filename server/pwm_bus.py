@@ -0,0 +1,196 @@
+"""Batched register access for the PCA9685 servo driver
+
+The Adafruit driver writes every channel one register byte at a time, so a
+single set_pwm() costs four I2C transactions and refreshing all 16 servos
+costs 64. PWMFrame stages channel values and flushes each run of adjacent
+channels as one auto-increment burst starting at LED0_ON_L + 4 * channel.
+
+ShadowPCA9685 sits in front of the driver and remembers the last value
+written to every channel, so writes that would not change anything never
+reach the bus.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# PCA9685 registers and bits
+MODE1 = 0x00
+AUTO_INCREMENT = 0x20
+LED0_ON_L = 0x06
+CHANNEL_COUNT = 16
+REGISTERS_PER_CHANNEL = 4
+
+
+def enable_auto_increment(device):
+    """Set the MODE1 AI bit so block writes walk consecutive registers"""
+    mode1 = device.readU8(MODE1)
+    if not mode1 & AUTO_INCREMENT:
+        device.write8(MODE1, mode1 | AUTO_INCREMENT)
+
+
+def channel_bytes(on, off):
+    """Encode one channel as LEDn_ON_L, LEDn_ON_H, LEDn_OFF_L, LEDn_OFF_H"""
+    return [on & 0xFF, (on >> 8) & 0x0F, off & 0xFF, (off >> 8) & 0x0F]
+
+
+class ShadowRegisters:
+    """Last (on, off) pair written to each channel of one PCA9685"""
+
+    def __init__(self):
+        self.values = [None] * CHANNEL_COUNT
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def update(self, channel, on, off):
+        """Record a channel write and return True if it must reach the bus"""
+        value = (int(on), int(off))
+        with self._lock:
+            if self.values[channel] == value:
+                self.hits += 1
+                return False
+            self.values[channel] = value
+            self.misses += 1
+            return True
+
+    def update_all(self, on, off):
+        """Record an ALL_LED write and return True if any channel changes"""
+        value = (int(on), int(off))
+        with self._lock:
+            if all(v == value for v in self.values):
+                self.hits += CHANNEL_COUNT
+                return False
+            self.values = [value] * CHANNEL_COUNT
+            self.misses += CHANNEL_COUNT
+            return True
+
+    def invalidate(self, channel=None):
+        """Forget cached values so the next write always goes out"""
+        with self._lock:
+            if channel is None:
+                self.values = [None] * CHANNEL_COUNT
+            else:
+                self.values[channel] = None
+
+    def get_stats(self):
+        """Get write-suppression counters"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'saved_transactions': self.hits * REGISTERS_PER_CHANNEL,
+        }
+
+
+# One register file per chip address, shared by every wrapper of that chip
+_shadow_files = {}
+
+
+def _shadow_for(pwm):
+    device = getattr(pwm, '_device', None)
+    key = getattr(device, '_address', id(pwm))
+    return _shadow_files.setdefault(key, ShadowRegisters())
+
+
+class ShadowPCA9685:
+    """Drop-in PCA9685 wrapper that skips writes of unchanged channel values"""
+
+    def __init__(self, pwm):
+        self.pwm = pwm
+        self._device = getattr(pwm, '_device', None)
+        self.shadow = _shadow_for(pwm)
+
+    def set_pwm(self, channel, on, off):
+        if self.shadow.update(channel, on, off):
+            self.pwm.set_pwm(channel, on, off)
+
+    def set_all_pwm(self, on, off):
+        if self.shadow.update_all(on, off):
+            self.pwm.set_all_pwm(on, off)
+
+    def set_pwm_freq(self, freq_hz):
+        self.pwm.set_pwm_freq(freq_hz)
+
+    def get_stats(self):
+        return self.shadow.get_stats()
+
+    def __getattr__(self, name):
+        return getattr(self.pwm, name)
+
+
+class PWMFrame:
+    """Stages PWM values for a PCA9685 and commits them in burst writes
+
+    Call stage() for every channel that changes during a tick and commit()
+    once at the end. Drivers without a raw I2C device (mocks, simulators)
+    fall back to one set_pwm() call per staged channel.
+    """
+
+    def __init__(self, pwm):
+        self.pwm = pwm
+        self._staged = {}
+        self._lock = threading.Lock()
+        self._device = getattr(pwm, '_device', None)
+        if self._device is not None:
+            try:
+                enable_auto_increment(self._device)
+            except Exception as e:
+                logger.warning(f"PCA9685 auto-increment unavailable, using per-channel writes: {e}")
+                self._device = None
+
+    def stage(self, channel, value, on=0):
+        """Queue a channel value for the next commit"""
+        with self._lock:
+            self._staged[channel] = (int(on), int(value))
+
+    def discard(self):
+        """Drop everything staged since the last commit"""
+        with self._lock:
+            self._staged = {}
+
+    def commit(self):
+        """Write all staged channels and return the number of transactions"""
+        with self._lock:
+            staged, self._staged = self._staged, {}
+        shadow = getattr(self.pwm, 'shadow', None)
+        if self._device is not None and shadow is not None:
+            staged = {channel: value for channel, value in staged.items() if shadow.update(channel, *value)}
+        if not staged:
+            return 0
+
+        if self._device is None:
+            for channel in sorted(staged):
+                on, off = staged[channel]
+                self.pwm.set_pwm(channel, on, off)
+            return len(staged)
+
+        transactions = 0
+        for first, run in self._runs(staged):
+            data = []
+            for on, off in run:
+                data.extend(channel_bytes(on, off))
+            self._device.writeList(LED0_ON_L + REGISTERS_PER_CHANNEL * first, data)
+            transactions += 1
+        return transactions
+
+    def set_pwm(self, channel, on, off):
+        """Immediate single-channel write routed through the frame"""
+        self.stage(channel, off, on)
+        self.commit()
+
+    @staticmethod
+    def _runs(staged):
+        """Split staged channels into runs of consecutive channel numbers"""
+        first = None
+        run = []
+        for channel in sorted(staged):
+            if run and channel != first + len(run):
+                yield first, run
+                run = []
+            if not run:
+                first = channel
+            run.append(staged[channel])
+        if run:
+            yield first, run
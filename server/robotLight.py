@@ -12,6 +12,26 @@ from rpi_ws281x import PixelStrip
 from lighting_utils import safe_light_command
 from Adeept_RaspClaws.server.LED import Color
 
+# Mailbox slot per light command; a newer command replaces a pending one in the same slot.
+# Mode changes and strip colors have slots of their own, so a setStatus() posted right
+# after a fadeToColor() does not cancel the fade.
+MAILBOX_SLOTS = {
+    'setBrightness': 'brightness',
+    'turnLeft': 'indicator',
+    'turnRight': 'indicator',
+    'both_on': 'indicator',
+    'both_off': 'indicator',
+    'pause': 'mode',
+    'resume': 'mode',
+    'setStatus': 'mode',
+    'breath': 'mode',
+    'rainbow': 'mode',
+    'pulse': 'mode',
+    'police': 'mode',
+}
+DEFAULT_SLOT = 'strip'
+FLUSH_SLOT = 'flush'
+
 
 class RobotLight(threading.Thread):
     def __init__(self, *args, **kwargs):
@@ -62,6 +82,11 @@ class RobotLight(threading.Thread):
         # Intialize the library (must be called once before other functions).
         self.strip.begin()
 
+        # Commands posted by other threads, drained by the light thread
+        self._mailbox = {}
+        self._mailLock = threading.Lock()
+        self._mail = threading.Event()
+
         super(RobotLight, self).__init__(*args, **kwargs)
         self.__flag = threading.Event()
         self.__flag.clear()
@@ -145,6 +170,52 @@ class RobotLight(threading.Thread):
     def resume(self):
         self.__flag.set()
 
+    def post(self, name, *args, **kwargs):
+        """Queue a light command for the light thread and return immediately
+
+        Only the latest command per MAILBOX_SLOTS slot is kept, so motion code
+        can post on every iteration without building up a backlog.
+        """
+        self._post(MAILBOX_SLOTS.get(name, DEFAULT_SLOT), getattr(self, name), args, kwargs)
+
+    def _post(self, slot, func, args, kwargs):
+        with self._mailLock:
+            self._mailbox.pop(slot, None)
+            self._mailbox[slot] = (func, args, kwargs)
+            self._mail.set()
+        self.__flag.set()
+
+    def flush(self, timeout=1.0):
+        """Wait until every command posted so far has run; False on timeout"""
+        if not self.is_alive():
+            self._drain()
+            return True
+        done = threading.Event()
+        # Slots drain in posting order, so this runs after everything before it
+        self._post(FLUSH_SLOT, done.set, (), {})
+        return done.wait(timeout)
+
+    def _pending(self, slot):
+        with self._mailLock:
+            return slot in self._mailbox
+
+    def _drain(self):
+        """Run pending commands in the order they were last posted"""
+        with self._mailLock:
+            pending, self._mailbox = self._mailbox, {}
+            self._mail.clear()
+        for func, args, kwargs in pending.values():
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Light system warning: {e}")
+        return bool(pending)
+
+    def _idle(self, delay):
+        """Sleep between animation frames, running any commands posted meanwhile"""
+        if self._mail.wait(delay):
+            self._drain()
+
     def police(self):
         self.lightMode = 'police'
         self.resume()
@@ -154,21 +225,21 @@ class RobotLight(threading.Thread):
             for i in range(0, 3):
                 self.setSomeColor(0, 0, 255, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
                 self.blue()
-                time.sleep(0.05)
+                self._idle(0.05)
                 self.setSomeColor(0, 0, 0, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
                 self.both_off()
-                time.sleep(0.05)
+                self._idle(0.05)
             if self.lightMode != 'police':
                 break
-            time.sleep(0.1)
+            self._idle(0.1)
             for i in range(0, 3):
                 self.setSomeColor(255, 0, 0, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
                 self.red()
-                time.sleep(0.05)
+                self._idle(0.05)
                 self.setSomeColor(0, 0, 0, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
                 self.both_off()
-                time.sleep(0.05)
-            time.sleep(0.1)
+                self._idle(0.05)
+            self._idle(0.1)
 
     def breath(self, R_input, G_input, B_input):
         self.lightMode = 'breath'
@@ -184,14 +255,14 @@ class RobotLight(threading.Thread):
                     break
                 self.setColor(self.colorBreathR * i / self.breathSteps, self.colorBreathG * i / self.breathSteps,
                               self.colorBreathB * i / self.breathSteps)
-                time.sleep(0.03)
+                self._idle(0.03)
             for i in range(0, self.breathSteps):
                 if self.lightMode != 'breath':
                     break
                 self.setColor(self.colorBreathR - (self.colorBreathR * i / self.breathSteps),
                               self.colorBreathG - (self.colorBreathG * i / self.breathSteps),
                               self.colorBreathB - (self.colorBreathB * i / self.breathSteps))
-                time.sleep(0.03)
+                self._idle(0.03)
 
     def frontLight(self, switch):
         if switch == 'on':
@@ -256,6 +327,9 @@ class RobotLight(threading.Thread):
             r = int(current_R + (target_R - current_R) * ratio)
             g = int(current_G + (target_G - current_G) * ratio)
             b = int(current_B + (target_B - current_B) * ratio)
+            if self._pending(DEFAULT_SLOT):
+                # A newer strip command is waiting, let it take over
+                break
             self.setColor(r, g, b)
             time.sleep(delay)
 
@@ -292,7 +366,7 @@ class RobotLight(threading.Thread):
                 for i in range(self.strip.numPixels()):
                     self.strip.setPixelColor(i, self.wheel((i + j) & 255))
                 self.strip.show()
-                time.sleep(0.02)
+                self._idle(0.02)
 
     @safe_light_command
     def pulse(self, R, G, B):
@@ -315,7 +389,7 @@ class RobotLight(threading.Thread):
                 g = int(self.colorBreathG * ratio)
                 b = int(self.colorBreathB * ratio)
                 self.setColor(r, g, b)
-                time.sleep(0.03)
+                self._idle(0.03)
 
     def wheel(self, pos):
         """Generate rainbow colors across 0-255 positions."""
@@ -343,8 +417,13 @@ class RobotLight(threading.Thread):
     def run(self):
         while 1:
             self.__flag.wait()
+            if self._drain() and self.lightMode == 'none':
+                # Nothing to animate; sleep until the next command
+                self.__flag.clear()
+                if self._mail.is_set():
+                    self.__flag.set()
+                continue
             self.lightChange()
-            pass
 
 
 if __name__ == '__main__':
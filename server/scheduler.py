@@ -0,0 +1,81 @@
+"""Fixed-rate loop pacing on absolute monotonic deadlines
+
+Sleeping for "period minus work time" lets every overrun push all later
+ticks back. DeadlineScheduler instead keeps an absolute deadline that
+advances by exactly one period per tick, so the average rate stays at the
+nominal frequency no matter how long the work inside the loop takes.
+"""
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """Paces a loop to a fixed period and records jitter and overruns
+
+    Ticks that finish late run the next tick immediately to catch up. If the
+    loop falls more than max_lag periods behind, the missed ticks are skipped
+    and counted instead of being replayed back to back.
+    """
+
+    def __init__(self, period, max_lag=2, clock=time.monotonic, sleep=time.sleep):
+        self.period = period
+        self.max_lag = max_lag
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._deadline = None
+        self.reset_stats()
+
+    def start(self, period=None):
+        """Anchor the first deadline one period from now"""
+        if period is not None:
+            self.period = period
+        self._deadline = self._clock() + self.period
+
+    def wait(self):
+        """Block until the current deadline and advance to the next one"""
+        if self._deadline is None:
+            self.start()
+
+        now = self._clock()
+        if now < self._deadline:
+            self._sleep(self._deadline - now)
+            now = self._clock()
+            overrun = False
+        else:
+            overrun = True
+
+        lateness = now - self._deadline
+        skipped = 0
+        if lateness > self.max_lag * self.period:
+            skipped = int(lateness // self.period)
+            self._deadline += skipped * self.period
+        self._deadline += self.period
+
+        with self._lock:
+            self.ticks += 1
+            self.overruns += overrun
+            self.skipped += skipped
+            self.jitter_total += lateness
+            self.jitter_max = max(self.jitter_max, lateness)
+        return lateness
+
+    def reset_stats(self):
+        with self._lock:
+            self.ticks = 0
+            self.overruns = 0
+            self.skipped = 0
+            self.jitter_total = 0.0
+            self.jitter_max = 0.0
+
+    def get_stats(self):
+        """Get loop timing statistics (jitter in seconds)"""
+        with self._lock:
+            return {
+                'period': self.period,
+                'ticks': self.ticks,
+                'overruns': self.overruns,
+                'skipped': self.skipped,
+                'jitter_mean': self.jitter_total / self.ticks if self.ticks else 0.0,
+                'jitter_max': self.jitter_max,
+            }
@@ -11,13 +11,14 @@ import socket
 import threading
 import time
 
-import Adafruit_PCA9685
 import psutil
 from rpi_ws281x import *
 from rpi_ws281x import Color
 
 import FPV
 import LED
+import bus_owner
+import info
 import move
 import switch
 from move import params
@@ -29,8 +30,7 @@ DPI = 17
 new_frame = 0
 direction_command = 'no'
 turn_command = 'no'
-pwm = Adafruit_PCA9685.PCA9685()
-pwm.set_pwm_freq(50)
+pwm = bus_owner.get_bus().pwm_client()
 LED = LED.LED()
 
 SmoothMode = 0
@@ -47,15 +47,7 @@ def ap_thread():
 
 def get_cpu_tempfunc():
     """ Return CPU temperature """
-    result = 0
-    mypath = "/sys/class/thermal/thermal_zone0/temp"
-    with open(mypath, 'r') as mytmpfile:
-        for line in mytmpfile:
-            result = line
-
-    result = float(result) / 1000
-    result = round(result, 1)
-    return str(result)
+    return str(info.monitor.snapshot('cpu_temp'))
 
 
 def get_gpu_tempfunc():
@@ -66,14 +58,12 @@ def get_gpu_tempfunc():
 
 def get_cpu_use():
     """ Return CPU usage using psutil"""
-    cpu_cent = psutil.cpu_percent()
-    return str(cpu_cent)
+    return str(info.monitor.snapshot('cpu_usage'))
 
 
 def get_ram_info():
     """ Return RAM usage using psutil """
-    ram_cent = psutil.virtual_memory()[2]
-    return str(ram_cent)
+    return str(info.monitor.snapshot('ram_usage'))
 
 
 def get_swap_info():
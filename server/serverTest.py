@@ -11,11 +11,11 @@ import socket
 import threading
 import time
 
-import Adafruit_PCA9685
 import psutil
 from rpi_ws281x import *
 
 import LED
+import bus_owner
 import move
 import switch
 
@@ -26,8 +26,7 @@ DPI = 17
 new_frame = 0
 direction_command = 'no'
 turn_command = 'no'
-pwm = Adafruit_PCA9685.PCA9685()
-pwm.set_pwm_freq(50)
+pwm = bus_owner.get_bus().pwm_client()
 LED = LED.LED()
 
 SmoothMode = 0
@@ -7,7 +7,7 @@ from __future__ import division
 
 import time
 
-import Adafruit_PCA9685
+import bus_owner
 
 '''
 change this form 1 to 0 to reverse servos
@@ -17,8 +17,7 @@ pwm1_direction = 1
 pwm2_direction = 1
 pwm3_direction = 1
 
-pwm = Adafruit_PCA9685.PCA9685()
-pwm.set_pwm_freq(50)
+pwm = bus_owner.get_bus().pwm_client(bus_owner.PRIORITY_HEAD)
 
 pwm0_init = 300
 pwm0_max = 450
@@ -193,9 +192,6 @@ def servo_init():
 
 
 def clean_all():
-    global pwm
-    pwm = Adafruit_PCA9685.PCA9685()
-    pwm.set_pwm_freq(50)
     pwm.set_all_pwm(0, 0)
 
 
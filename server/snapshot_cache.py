@@ -0,0 +1,77 @@
+"""Time-to-live snapshots of slow or shared readings for status endpoints
+
+Status requests (get_info over the WebSocket, the TCP get_monitor_data
+command, the info socket) each used to read the CPU temperature, psutil
+counters, the IMU and the stability metric themselves, so N polling
+clients cost N reads. SnapshotCache keeps the last value of every
+registered source and only calls the reader again once that value is
+older than the source's TTL. Concurrent callers that find a stale value
+wait for the one refresh in progress instead of starting their own.
+"""
+import threading
+import time
+
+
+class _Source:
+    def __init__(self, read, ttl):
+        self.read = read
+        self.ttl = ttl
+        self.snapshot = None  # (timestamp, value), replaced as a whole
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.hits = 0
+
+
+class SnapshotCache:
+    """Named readers whose results are reused for ttl seconds"""
+
+    def __init__(self, default_ttl=1.0, clock=time.monotonic):
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._sources = {}
+
+    def register(self, name, read, ttl=None):
+        """Add (or replace) a source; read() is called with no arguments"""
+        self._sources[name] = _Source(read, self.default_ttl if ttl is None else ttl)
+
+    def set_ttl(self, name, ttl):
+        self._sources[name].ttl = ttl
+
+    def invalidate(self, name=None):
+        """Force the next get() of one source, or of all of them, to read again"""
+        for source in ([self._sources[name]] if name is not None else self._sources.values()):
+            source.snapshot = None
+
+    def _fresh(self, source):
+        snapshot = source.snapshot
+        if snapshot is not None and self._clock() - snapshot[0] < source.ttl:
+            return snapshot
+        return None
+
+    def get(self, name):
+        """Cached value of a source, read again if it is older than its TTL"""
+        source = self._sources[name]
+        snapshot = self._fresh(source)
+        if snapshot is None:
+            with source.lock:
+                # Another caller may have refreshed it while we waited
+                snapshot = self._fresh(source)
+                if snapshot is None:
+                    source.reads += 1
+                    snapshot = (self._clock(), source.read())
+                    source.snapshot = snapshot
+                    return snapshot[1]
+        source.hits += 1
+        return snapshot[1]
+
+    def age(self, name):
+        """Seconds since the source was last read, or None if it never was"""
+        snapshot = self._sources[name].snapshot
+        return None if snapshot is None else self._clock() - snapshot[0]
+
+    def get_stats(self):
+        """Get per-source read and hit counters"""
+        return {
+            name: {'ttl': source.ttl, 'reads': source.reads, 'hits': source.hits}
+            for name, source in self._sources.items()
+        }
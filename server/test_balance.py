@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Test suite for the fixed-rate balance controller."""
+import unittest
+
+import numpy as np
+
+import Kalman_filter
+import PID
+import balance
+
+
+def ctrl_range(raw, max_genout, min_genout):
+    return int(min(max(raw, min_genout), max_genout))
+
+
+def adeept_mix(X_fix, Y_fix, range_min, range_max):
+    """Leg inputs as the original steady() computed them"""
+    return [
+        ctrl_range(X_fix + Y_fix, range_max, range_min),
+        ctrl_range(abs(X_fix * 0.5) + Y_fix, range_max, range_min),
+        ctrl_range(-X_fix + Y_fix, range_max, range_min),
+        ctrl_range(-X_fix - Y_fix, range_max, range_min),
+        ctrl_range(abs(-X_fix * 0.5) - Y_fix, range_max, range_min),
+        ctrl_range(X_fix - Y_fix, range_max, range_min),
+    ]
+
+
+class FakeScheduler:
+    def __init__(self, period=0.01):
+        self.period = period
+        self.waits = 0
+
+    def start(self, period=None):
+        pass
+
+    def wait(self):
+        self.waits += 1
+        return 0.0
+
+    def reset_stats(self):
+        pass
+
+    def get_stats(self):
+        return {'period': self.period, 'ticks': self.waits}
+
+
+class TestBalanceController(unittest.TestCase):
+    def setUp(self):
+        self.applied = []
+        self.samples = []
+        self.kalman = Kalman_filter.VectorKalmanFilter(('x', 'y', 'z'), 0.01, 0.1)
+        self.pid = PID.PIDBank(('x', 'y'), Kp=5, Kd=0.01)
+        self.scheduler = FakeScheduler()
+        self.controller = balance.BalanceController(
+            lambda: self.samples.pop(0), self.kalman, self.pid, self.applied.append, -40, 130,
+            rate=100, scheduler=self.scheduler)
+
+    def test_mix_matches_original_steady(self):
+        for X_fix, Y_fix in ((0, 0), (10, 3), (-20, 7), (60, -45), (-130, 130), (3.5, -2.25)):
+            heights = np.clip(balance.MIX @ (X_fix, Y_fix) + balance.MIDDLE * abs(X_fix), -40, 130).astype(int)
+            self.assertEqual(heights.tolist(), adeept_mix(X_fix, Y_fix, -40, 130))
+
+    def test_tilt_drives_correction(self):
+        for _ in range(5):
+            heights = self.controller.step({'x': 2.0, 'y': 0.0, 'z': 9.8})
+        # Nose down (x > 0) raises the rear legs and lowers the front ones
+        self.assertLess(self.controller.correction[0], 0)
+        self.assertGreater(heights[2], heights[0])
+        self.assertGreater(heights[3], heights[5])
+
+    def test_correction_is_held_in_range(self):
+        for _ in range(200):
+            self.controller.step({'x': -50.0, 'y': 50.0, 'z': 9.8})
+        self.assertEqual(self.controller.correction.tolist(), [130, -130])
+        self.assertTrue((self.controller.heights >= -40).all() and (self.controller.heights <= 130).all())
+
+    def test_tick_reads_applies_and_waits(self):
+        self.samples = [{'x': 1.0, 'y': -1.0, 'z': 9.8}] * 3
+        for _ in range(3):
+            self.controller.tick((0.0, 0.0))
+        self.assertEqual(len(self.applied), 3)
+        self.assertEqual(self.scheduler.waits, 3)
+        self.assertEqual(self.applied[-1].dtype.kind, 'i')
+        stats = self.controller.get_stats()
+        self.assertEqual(stats['rate'], 100)
+        self.assertGreater(stats['work_max'], 0)
+        self.assertEqual(self.pid.sample_time, 0.01)
+
+    def test_tick_skips_repeated_sample(self):
+        # The FIFO sampler publishes every other tick, so read() repeats itself
+        fresh = {'x': 2.0, 'y': -1.0, 'z': 9.8, 'timestamp': 1.0}
+        newer = {'x': 2.0, 'y': -1.0, 'z': 9.8, 'timestamp': 1.02}
+        self.samples = [fresh, fresh, newer, newer]
+        for _ in range(4):
+            self.controller.tick((0.0, 0.0))
+        self.assertEqual(len(self.applied), 2)
+        self.assertEqual(self.scheduler.waits, 4)
+        self.assertEqual(self.controller.get_stats()['stale'], 2)
+
+        reference = PID.PIDBank(('x', 'y'), Kp=5, Kd=0.01)
+        kalman = Kalman_filter.VectorKalmanFilter(('x', 'y', 'z'), 0.01, 0.1)
+        for sample in (fresh, newer):
+            kalman.update(sample)
+            reference.update([kalman.value('x'), kalman.value('y')])
+        np.testing.assert_allclose(self.pid.ITerm, reference.ITerm)
+        np.testing.assert_allclose(self.pid.DTerm, reference.DTerm)
+
+    def test_reset_clears_correction(self):
+        self.controller.step({'x': 3.0, 'y': 3.0, 'z': 9.8})
+        self.controller.reset()
+        self.assertEqual(self.controller.correction.tolist(), [0, 0])
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Test suite for how move applies the balance controller's leg heights."""
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import balance
+import move
+
+
+class RecordingFrame:
+    def __init__(self):
+        self.values = {}
+        self.commits = 0
+
+    def stage(self, channel, value, on=0):
+        self.values[channel] = value
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestMoveBalance(unittest.TestCase):
+    def test_leg_heights_go_out_in_one_burst(self):
+        heights = [12, -5, 30, 0, 7, -40]
+        staged, expected = RecordingFrame(), RecordingFrame()
+        with patch.object(move, 'frame', staged):
+            move.stage_leg_heights(np.array(heights))
+        with patch.object(move, 'frame', expected):
+            for leg, height in zip(balance.LEGS, heights):
+                getattr(move, leg)(0, 35, height)
+        self.assertEqual(staged.values, expected.values)
+        self.assertEqual(staged.commits, 1)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Test suite for the I2C bus owner."""
+import unittest
+
+from bus_owner import BusOwner, PRIORITY_BALANCE, PRIORITY_HEAD, PRIORITY_MOTION
+
+
+class RecordingPWM:
+    """PCA9685 stand-in without a raw I2C device"""
+    _device = None
+
+    def __init__(self):
+        self.writes = []
+
+    def set_pwm(self, channel, on, off):
+        self.writes.append((channel, off))
+
+    def set_all_pwm(self, on, off):
+        self.writes.append(('all', off))
+
+    def set_pwm_freq(self, freq_hz):
+        pass
+
+
+class FakeSensor:
+    def get_accel_data(self):
+        return {'x': 0.1, 'y': -0.2, 'z': 1.0}
+
+
+class TestBusOwnerQueue(unittest.TestCase):
+    """Drives the drain loop by hand so ordering is deterministic"""
+
+    def setUp(self):
+        self.pwm = RecordingPWM()
+        self.bus = BusOwner(self.pwm)
+
+    def drain_all(self):
+        level = self.bus._next_level()
+        while level is not None:
+            self.bus._drain(level)
+            level = self.bus._next_level()
+
+    def test_writes_to_same_channel_coalesce(self):
+        client = self.bus.pwm_client(PRIORITY_MOTION)
+        for value in (300, 310, 320):
+            client.set_pwm(0, 0, value)
+        self.drain_all()
+        self.assertEqual(self.pwm.writes, [(0, 320)])
+        self.assertEqual(self.bus.get_stats()['writes'], 3)
+
+    def test_balance_served_before_head(self):
+        self.bus.pwm_client(PRIORITY_HEAD).set_pwm(12, 0, 350)
+        self.bus.pwm_client(PRIORITY_BALANCE).set_pwm(1, 0, 280)
+        self.drain_all()
+        self.assertEqual(self.pwm.writes, [(1, 280), (12, 350)])
+
+    def test_calls_keep_order_with_writes(self):
+        client = self.bus.pwm_client(PRIORITY_MOTION)
+        client.set_pwm(3, 0, 400)
+        future = self.bus.submit(lambda: list(self.pwm.writes), priority=PRIORITY_MOTION)
+        self.drain_all()
+        self.assertEqual(future.result(0), [(3, 400)])
+
+    def test_failed_call_sets_exception(self):
+        future = self.bus.submit(lambda: 1 / 0)
+        self.drain_all()
+        with self.assertRaises(ZeroDivisionError):
+            future.result(0)
+        self.assertEqual(self.bus.get_stats()['errors'], 1)
+
+
+class TestBusOwnerThread(unittest.TestCase):
+    def test_sensor_reads_run_on_owner(self):
+        bus = BusOwner(RecordingPWM(), FakeSensor())
+        bus.start()
+        sensor = bus.sensor_client()
+        self.assertEqual(sensor.get_accel_data()['y'], -0.2)
+
+        pwm = bus.pwm_client()
+        pwm.set_pwm(5, 0, 333)
+        pwm.flush(timeout=1)
+        self.assertIn((5, 333), bus.pwm.writes)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test suite for the downscaled, preallocated color tracker."""
+import unittest
+
+import cv2
+import numpy as np
+
+from color_tracker import ColorTracker, PredictiveColorTracker
+
+LOWER = np.array([24, 100, 100])
+UPPER = np.array([44, 255, 255])
+
+
+def ball_frame(x, y, radius, shape=(480, 640)):
+    """Yellow disc on a dark blue background"""
+    frame = np.zeros(shape + (3,), np.uint8)
+    frame[:] = (90, 30, 20)
+    cv2.circle(frame, (x, y), radius, (0, 255, 255), -1)
+    return frame
+
+
+class TestColorTracker(unittest.TestCase):
+    def test_full_scale_finds_ball(self):
+        target = ColorTracker(scale=1.0).detect(ball_frame(400, 150, 40), LOWER, UPPER)
+        self.assertAlmostEqual(target.x, 400, delta=1.5)
+        self.assertAlmostEqual(target.y, 150, delta=1.5)
+        self.assertAlmostEqual(target.radius, 40, delta=3)
+
+    def test_downscaled_coordinates_are_full_frame(self):
+        for scale in (0.5, 0.25):
+            tracker = ColorTracker(scale=scale)
+            for x, y in ((100, 100), (320, 240), (560, 400)):
+                target = tracker.detect(ball_frame(x, y, 30), LOWER, UPPER)
+                self.assertAlmostEqual(target.x, x, delta=2 / scale)
+                self.assertAlmostEqual(target.y, y, delta=2 / scale)
+                self.assertAlmostEqual(target.center[0], x, delta=2 / scale)
+                self.assertAlmostEqual(target.radius, 30, delta=4 / scale)
+
+    def test_no_target(self):
+        tracker = ColorTracker()
+        frame = ball_frame(320, 240, 30)
+        frame[:] = (90, 30, 20)
+        self.assertIsNone(tracker.detect(frame, LOWER, UPPER))
+        self.assertEqual(tracker.get_stats()['detections'], 0)
+
+    def test_buffers_are_reused(self):
+        tracker = ColorTracker(scale=0.5)
+        for i in range(6):
+            tracker.detect(ball_frame(200 + 10 * i, 240, 30), LOWER, UPPER)
+            roi = (100 + 20 * i, 100, 300 + 10 * i, 260)
+            for window in (None, roi):
+                mask = tracker.mask(ball_frame(300, 200, 20), LOWER, UPPER, window)
+                # OpenCV wrote into the preallocated buffers rather than new arrays
+                self.assertTrue(np.shares_memory(mask, tracker._mask_buffer)
+                                or np.shares_memory(mask, tracker._work_buffer))
+        self.assertEqual(tracker.get_stats()['allocations'], 1)
+        self.assertEqual(tracker.mask(ball_frame(300, 200, 20), LOWER, UPPER).shape, (240, 320))
+
+        tracker.detect(ball_frame(100, 100, 20, shape=(240, 320)), LOWER, UPPER)
+        self.assertEqual(tracker.get_stats()['allocations'], 2)
+
+    def test_window_search_reports_full_frame_coordinates(self):
+        tracker = ColorTracker(scale=0.5)
+        frame = ball_frame(450, 300, 25)
+        target = tracker.detect(frame, LOWER, UPPER, roi=(380, 220, 540, 380))
+        self.assertAlmostEqual(target.x, 450, delta=4)
+        self.assertAlmostEqual(target.y, 300, delta=4)
+        self.assertIsNone(tracker.detect(frame, LOWER, UPPER, roi=(0, 0, 200, 200)))
+
+    def test_scale_is_validated(self):
+        with self.assertRaises(ValueError):
+            ColorTracker(scale=0)
+        with self.assertRaises(ValueError):
+            ColorTracker(scale=2)
+
+
+class TestPredictiveColorTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = PredictiveColorTracker(ColorTracker(scale=0.5), max_misses=3)
+
+    def test_locked_target_is_searched_in_a_window(self):
+        for i in range(20):
+            x = 120 + 15 * i
+            target = self.tracker.track(ball_frame(x, 240, 20), LOWER, UPPER)
+            self.assertAlmostEqual(target.x, x, delta=4)
+        stats = self.tracker.get_stats()
+        self.assertEqual((stats['full_searches'], stats['window_searches']), (1, 19))
+        x0, y0, x1, y1 = self.tracker.roi
+        self.assertLess((x1 - x0) * (y1 - y0) * 4, 640 * 480)
+        # The velocity filter has picked up the motion
+        self.assertAlmostEqual(self.tracker.prediction[0], 120 + 15 * 19 + 15, delta=5)
+
+    def test_falls_back_to_full_frame_after_misses(self):
+        self.tracker.track(ball_frame(100, 100, 20), LOWER, UPPER)
+        self.tracker.track(ball_frame(100, 100, 20), LOWER, UPPER)
+        # The target jumps outside the window; the third miss falls back to a full search
+        results = [self.tracker.track(ball_frame(540, 400, 20), LOWER, UPPER) for _ in range(3)]
+        self.assertEqual(results[:2], [None, None])
+        self.assertAlmostEqual(results[2].x, 540, delta=4)
+        stats = self.tracker.get_stats()
+        self.assertEqual((stats['window_misses'], stats['lost'], stats['full_searches']), (3, 1, 2))
+        self.assertTrue(stats['locked'])
+
+    def test_reset_unlocks(self):
+        self.tracker.track(ball_frame(300, 200, 20), LOWER, UPPER)
+        self.assertTrue(self.tracker.locked)
+        self.tracker.reset()
+        self.assertFalse(self.tracker.locked)
+        self.assertIsNone(self.tracker.roi)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
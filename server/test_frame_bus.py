@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Test suite for the sequence-numbered camera frame bus."""
+import threading
+import unittest
+from unittest import mock
+
+import base_camera
+from base_camera import FrameBus
+
+
+class TestFrameBus(unittest.TestCase):
+    def setUp(self):
+        self.bus = FrameBus(client_timeout=5)
+
+    def test_frames_are_numbered(self):
+        self.assertEqual(self.bus.publish(b'a'), 1)
+        self.assertEqual(self.bus.publish(b'b'), 2)
+        self.assertEqual(self.bus.wait_for(1), (2, b'b'))
+
+    def test_new_client_gets_current_frame_then_only_newer(self):
+        self.bus.publish(b'a')
+        client = self.bus.client()
+        self.assertEqual(client.next(), b'a')
+        with self.assertRaises(TimeoutError):
+            client.next(timeout=0.01)
+        self.bus.publish(b'b')
+        self.assertEqual(client.next(timeout=0.01), b'b')
+
+    def test_skipped_frames_are_counted_per_client(self):
+        fast, slow = self.bus.client(), self.bus.client()
+        for i in range(6):
+            self.bus.publish(i)
+            fast.next()
+            if i in (0, 5):
+                slow.next()
+        self.assertEqual((fast.received, fast.dropped), (6, 0))
+        self.assertEqual((slow.received, slow.dropped), (2, 4))
+        self.assertEqual(self.bus.get_stats()['dropped'], 4)
+
+    def test_idle_clients_are_reaped(self):
+        now = [100.0]
+        with mock.patch.object(base_camera.time, 'monotonic', lambda: now[0]):
+            idle = self.bus.client('idle')
+            active = self.bus.client('active')
+            self.bus.publish(b'a')
+            now[0] = 104.0
+            active.next()
+            now[0] = 106.0
+            self.bus.publish(b'b')
+            active.next()
+            self.assertEqual(list(self.bus.clients), ['active'])
+            self.assertEqual(self.bus.get_stats()['reaped'], 1)
+            # A reaped client that comes back is tracked again
+            idle.next()
+            self.assertEqual(list(self.bus.clients), ['active', 'idle'])
+
+    def test_keyed_client_is_reused_and_closed(self):
+        self.assertIs(self.bus.client('viewer'), self.bus.client('viewer'))
+        self.bus.client('viewer').close()
+        self.assertEqual(self.bus.get_stats()['clients'], 0)
+
+    def test_many_viewers_see_every_frame(self):
+        frames = 50
+        viewers = 24
+        received = [[] for _ in range(viewers)]
+        ready = threading.Barrier(viewers + 1)
+        acks = threading.Semaphore(0)
+
+        def view(frames_out):
+            client = self.bus.client()
+            ready.wait()
+            for _ in range(frames):
+                frames_out.append(client.next(timeout=5))
+                acks.release()
+
+        threads = [threading.Thread(target=view, args=(out,)) for out in received]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        for i in range(frames):
+            self.bus.publish(i)
+            for _ in range(viewers):  # lock-step so no viewer may drop a frame
+                acks.acquire()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(out == list(range(frames)) for out in received))
+        self.assertEqual(self.bus.get_stats()['dropped'], 0)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
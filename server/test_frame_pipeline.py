@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Test suite for the encode-once JPEG frame pipeline."""
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import frame_pipeline
+from frame_pipeline import JPEGPipeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestJPEGPipeline(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.pipeline = JPEGPipeline(quality=80, clock=self.clock)
+        self.image = np.zeros((48, 64, 3), dtype=np.uint8)
+        self.image[10:30, 20:40] = (0, 128, 255)
+
+    def test_encodes_each_frame_once(self):
+        with mock.patch.object(frame_pipeline.cv2, 'imencode', wraps=frame_pipeline.cv2.imencode) as imencode:
+            frame = self.pipeline.encode(self.image)
+        self.assertEqual(imencode.call_count, 1)
+        self.assertIsInstance(frame.data, bytes)
+        self.assertTrue(frame.data.startswith(b'\xff\xd8'))  # JPEG SOI marker
+        self.assertIs(self.pipeline.latest, frame)
+
+    def test_consumers_share_one_buffer(self):
+        received = [], []
+        self.pipeline.subscribe(received[0].append)
+        self.pipeline.subscribe(received[1].append)
+        frame = self.pipeline.encode(self.image)
+        self.assertIs(received[0][0].data, frame.data)
+        self.assertIs(received[1][0].data, frame.data)
+
+        self.pipeline.unsubscribe(received[1].append)
+        self.pipeline.encode(self.image)
+        self.assertEqual((len(received[0]), len(received[1])), (2, 1))
+
+    def test_failing_consumer_does_not_stop_others(self):
+        received = []
+
+        def broken(frame):
+            raise IOError("socket closed")
+
+        self.pipeline.subscribe(broken)
+        self.pipeline.subscribe(received.append)
+        self.pipeline.encode(self.image)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(self.pipeline.get_stats()['consumer_errors'], 1)
+
+    def test_stats_count_frames_and_rate(self):
+        for i in range(5):
+            self.clock.now = i * 0.04
+            frame = self.pipeline.encode(self.image)
+        self.assertEqual(frame.seq, 5)
+        stats = self.pipeline.get_stats()
+        self.assertEqual(stats['frames'], 5)
+        self.assertEqual(stats['quality'], 80)
+        self.assertAlmostEqual(stats['fps'], 25.0)
+        self.assertGreater(stats['bytes_mean'], 0)
+
+    def test_failed_encode_is_counted(self):
+        with mock.patch.object(frame_pipeline.cv2, 'imencode', return_value=(False, None)):
+            self.assertIsNone(self.pipeline.encode(self.image))
+        self.assertEqual(self.pipeline.get_stats()['failures'], 1)
+        self.assertIsNone(self.pipeline.latest)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Parity tests for the precompiled gait frames."""
+import unittest
+from unittest.mock import patch
+
+import gait
+import move
+
+
+class RecordingFrame:
+    """Collects staged channel values in place of move.frame"""
+
+    def __init__(self):
+        self.values = {}
+        self.commits = 0
+
+    def stage(self, channel, value, on=0):
+        self.values[channel] = value
+
+    def commit(self):
+        self.commits += 1
+
+
+def branch_tree_frame(step_input, speed, command):
+    """Replay the per-leg calls move() used to make for one step"""
+    recorder = RecordingFrame()
+    step_I, step_II = gait.tripod_steps(step_input)
+    calls = {
+        'no': ((move.right_I, step_I, speed), (move.left_II, step_I, speed), (move.right_III, step_I, speed),
+               (move.left_I, step_II, speed), (move.right_II, step_II, speed), (move.left_III, step_II, speed)),
+        'left': ((move.right_I, step_I, speed), (move.left_II, step_I, -speed), (move.right_III, step_I, speed),
+                 (move.left_I, step_II, -speed), (move.right_II, step_II, speed), (move.left_III, step_II, -speed)),
+        'right': ((move.right_I, step_I, -speed), (move.left_II, step_I, speed), (move.right_III, step_I, -speed),
+                  (move.left_I, step_II, speed), (move.right_II, step_II, -speed), (move.left_III, step_II, speed)),
+    }
+    with patch.object(move, 'frame', recorder):
+        for leg, pos, wiggle in calls.get(command, ()):
+            leg(pos, wiggle, 0)
+    return tuple(sorted(recorder.values.items()))
+
+
+class TestGaitParity(unittest.TestCase):
+    def test_walk_frames_match_leg_functions(self):
+        for command in ('no', 'left', 'right'):
+            for step in range(1, 5):
+                for speed in (-100, -35, 1, 35, 100):
+                    with self.subTest(command=command, step=step, speed=speed):
+                        compiled = move.gait_compiler.compile(step, command, speed)
+                        self.assertEqual(compiled, branch_tree_frame(step, speed, command))
+                        self.assertEqual(len(compiled), 12)
+
+    def test_all_side_settings_match(self):
+        """Reversed sides take different branches in the leg functions"""
+        for direction in (0, 1):
+            for height in (0, 1):
+                settings = {
+                    'leftSide_direction': direction, 'rightSide_direction': 1 - direction,
+                    'leftSide_height': height, 'rightSide_height': 1 - height,
+                }
+                compiler = gait.GaitCompiler(move.gait_compiler.base_pwm, direction, 1 - direction, height, 1 - height,
+                                             move.height_change)
+                with patch.multiple(move, **settings):
+                    for step in range(1, 5):
+                        for command in ('no', 'left', 'right'):
+                            with self.subTest(direction=direction, height=height, step=step, command=command):
+                                self.assertEqual(compiler.compile(step, command, 35),
+                                                 branch_tree_frame(step, 35, command))
+
+    def test_height_adjust_matches(self):
+        for leg in gait.LEGS:
+            recorder = RecordingFrame()
+            with patch.object(move, 'frame', recorder):
+                getattr(move, leg)(0, 35, 12)
+            self.assertEqual(move.gait_compiler.leg_frame(leg, 0, 35, 12), recorder.values)
+
+
+class RecordingPWM:
+    """Collects set_pwm() calls in place of move.pwm"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set_pwm(self, channel, on, off):
+        self.values[channel] = off
+
+
+def dove_row(calls):
+    recorder = RecordingPWM()
+    with patch.object(move, 'pwm', recorder):
+        for leg, horizontal, vertical in calls:
+            leg(horizontal, vertical)
+    return [recorder.values[channel] for channel in range(12)]
+
+
+class TestDoveParity(unittest.TestCase):
+    """Compiled rows against the dove_* calls the old sub-step loop made"""
+
+    def test_forward_step_one(self):
+        speed = 35
+        frames = move.gait_compiler.dove_frames(1, speed, 17, 'no')
+        self.assertEqual(len(frames), len(range(0, speed + 2, 2)))
+        for rise, row in zip(range(0, speed + 2, 2), frames):
+            fall = speed - rise
+            expected = dove_row(((move.dove_Left_I, -fall, 3 * rise), (move.dove_Right_II, -fall, 3 * rise),
+                                 (move.dove_Left_III, -fall, 3 * rise), (move.dove_Right_I, fall, -10),
+                                 (move.dove_Left_II, fall, -10), (move.dove_Right_III, fall, -10)))
+            self.assertEqual(list(row), expected)
+
+    def test_left_turn_step_two(self):
+        speed = 35
+        frames = move.gait_compiler.dove_frames(2, speed, 17, 'left')
+        for rise, row in zip(range(0, speed + 2, 2), frames):
+            fall = speed - rise
+            expected = dove_row(((move.dove_Left_I, -rise, 3 * fall), (move.dove_Right_II, rise, 3 * fall),
+                                 (move.dove_Left_III, -rise, 3 * fall), (move.dove_Right_I, -rise, -10),
+                                 (move.dove_Left_II, rise, -10), (move.dove_Right_III, -rise, -10)))
+            self.assertEqual(list(row), expected)
+
+    def test_backward_step_three(self):
+        speed = 35
+        frames = move.gait_compiler.dove_frames(3, -speed, 17, 'no')
+        for rise, row in zip(range(0, speed + 2, 2), frames):
+            fall = speed - rise
+            expected = dove_row(((move.dove_Left_I, -fall, -10), (move.dove_Right_II, -fall, -10),
+                                 (move.dove_Left_III, -fall, -10), (move.dove_Right_I, fall, 3 * rise),
+                                 (move.dove_Left_II, fall, 3 * rise), (move.dove_Right_III, fall, 3 * rise)))
+            self.assertEqual(list(row), expected)
+
+    def test_forward_step_one_at_each_resolution(self):
+        speed = 35
+        for dpi in (1, 5, 17):
+            with self.subTest(dpi=dpi):
+                increment = int(speed / dpi)
+                rises = range(0, speed + increment, increment)
+                frames = move.gait_compiler.dove_frames(1, speed, dpi, 'no')
+                self.assertEqual(len(frames), len(rises))
+                for rise, row in zip(rises, frames):
+                    recorder = RecordingPWM()
+                    with patch.object(move, 'pwm', recorder):
+                        move.dove_Left_I(rise - speed, 3 * rise)
+                    self.assertEqual(list(row[:2]), [recorder.values[0], recorder.values[1]])
+
+    def test_forward_step_two(self):
+        speed = 35
+        frames = move.gait_compiler.dove_frames(2, speed, 17, 'no')
+        for rise, row in zip(range(0, speed + 2, 2), frames):
+            fall = speed - rise
+            expected = dove_row(((move.dove_Left_I, rise, 3 * fall), (move.dove_Right_II, rise, 3 * fall),
+                                 (move.dove_Left_III, rise, 3 * fall), (move.dove_Right_I, -rise, -10),
+                                 (move.dove_Left_II, -rise, -10), (move.dove_Right_III, -rise, -10)))
+            self.assertEqual(list(row), expected)
+
+    def test_right_turn_step_one(self):
+        speed = 35
+        frames = move.gait_compiler.dove_frames(1, speed, 17, 'right')
+        for rise, row in zip(range(0, speed + 2, 2), frames):
+            fall = speed - rise
+            expected = dove_row(((move.dove_Left_I, -fall, 3 * rise), (move.dove_Right_II, fall, 3 * rise),
+                                 (move.dove_Left_III, -fall, 3 * rise), (move.dove_Right_I, -fall, -10),
+                                 (move.dove_Left_II, fall, -10), (move.dove_Right_III, -fall, -10)))
+            self.assertEqual(list(row), expected)
+
+    def test_backward_turn_is_empty(self):
+        self.assertEqual(move.gait_compiler.dove_frames(1, -35, 17, 'left').shape, (0, 12))
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.period = None
+        self.waits = 0
+
+    def start(self, period=None):
+        self.period = period
+
+    def wait(self):
+        self.waits += 1
+        return 0.0
+
+
+class TestGaitCompiler(unittest.TestCase):
+    def setUp(self):
+        self.compiler = gait.GaitCompiler([300] * 16, 1, 0, 0, 1, 30)
+
+    def test_frames_are_cached(self):
+        first = self.compiler.frame(2, 'no', 35)
+        self.assertIs(self.compiler.frame(2, 'no', 35), first)
+        self.compiler.clear()
+        self.assertIsNot(self.compiler.frame(2, 'no', 35), first)
+
+    def test_unknown_command_is_empty(self):
+        self.assertEqual(self.compiler.frame(1, 'jump', 35), ())
+
+    def test_dove_frames_are_cached_and_read_only(self):
+        frames = self.compiler.dove_frames(1, 35, 17, 'no')
+        self.assertIs(self.compiler.dove_frames(1, 35, 17, 'no'), frames)
+        self.assertFalse(frames.flags.writeable)
+
+    def test_player_streams_rows_at_period(self):
+        recorder = RecordingFrame()
+        scheduler = FakeScheduler()
+        player = gait.GaitPlayer(recorder, scheduler)
+        frames = self.compiler.dove_frames(1, 35, 17, 'no')
+
+        self.assertEqual(player.play(frames, 0.002), len(frames))
+        self.assertEqual(scheduler.period, 0.002)
+        self.assertEqual((recorder.commits, scheduler.waits), (len(frames), len(frames)))
+        self.assertEqual(recorder.values, dict(enumerate(frames[-1])))
+
+    def test_player_stops_when_told(self):
+        recorder = RecordingFrame()
+        player = gait.GaitPlayer(recorder, FakeScheduler())
+        frames = self.compiler.dove_frames(1, 35, 17, 'no')
+        self.assertEqual(player.play(frames, 0.002, keep_going=lambda: len(recorder.values) == 0), 1)
+
+    def test_tripod_steps_wrap(self):
+        self.assertEqual([gait.tripod_steps(step) for step in range(1, 5)], [(1, 3), (2, 4), (3, 1), (4, 2)])
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
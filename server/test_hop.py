@@ -40,19 +40,19 @@ class HopTest:
         print("Testing CROUCH positions...")
         print(f"Setting servos to: {self.move.CROUCH_POSITIONS}")
         if not self.simulation_mode:
-            self.move.set_all_servos(self.move.CROUCH_POSITIONS, 10)
+            self.move.set_all_servos(self.move.CROUCH_POSITIONS, 100)
         time.sleep(1)
 
         print("\nTesting LAUNCH positions...")
         print(f"Setting servos to: {self.move.LAUNCH_POSITIONS}")
         if not self.simulation_mode:
-            self.move.set_all_servos(self.move.LAUNCH_POSITIONS, 10)
+            self.move.set_all_servos(self.move.LAUNCH_POSITIONS, 100)
         time.sleep(1)
 
         print("\nTesting LANDING positions...")
         print(f"Setting servos to: {self.move.LANDING_POSITIONS}")
         if not self.simulation_mode:
-            self.move.set_all_servos(self.move.LANDING_POSITIONS, 10)
+            self.move.set_all_servos(self.move.LANDING_POSITIONS, 100)
         time.sleep(1)
 
         if not self.simulation_mode:
@@ -62,7 +62,7 @@ class HopTest:
         """Test hop with different speeds"""
         print("\nTesting hop sequence with different speeds:")
 
-        for speed in [10, 20, 30]:
+        for speed in [100, 200, 300]:  # degrees per second
             print(f"Testing hop with speed {speed}...")
             if not self.simulation_mode:
                 self.move.hop(speed=speed)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Test suite for the IMU sampler and its ring buffer."""
+import struct
+import threading
+import unittest
+
+import imu_sampler
+
+
+class FakeSMBus:
+    """MPU6050 registers plus a FIFO the test fills with raw frames"""
+
+    def __init__(self):
+        self.registers = {imu_sampler.ACCEL_CONFIG: 0x08, imu_sampler.GYRO_CONFIG: 0x00}
+        self.fifo = bytearray()
+        self.block_reads = []
+
+    def write_byte_data(self, address, register, value):
+        self.registers[register] = value
+        if register == imu_sampler.USER_CTRL and value & imu_sampler.USER_FIFO_RESET:
+            self.fifo.clear()
+
+    def read_byte_data(self, address, register):
+        return self.registers.get(register, 0)
+
+    def read_i2c_block_data(self, address, register, length):
+        self.block_reads.append((register, length))
+        if register == imu_sampler.FIFO_COUNTH:
+            return [len(self.fifo) >> 8, len(self.fifo) & 0xFF]
+        data, self.fifo[:length] = list(self.fifo[:length]), b''
+        return data
+
+    def push(self, *counts):
+        self.fifo += struct.pack('>%dh' % len(counts), *counts)
+
+
+class FakeDevice:
+    def __init__(self):
+        self.bus = FakeSMBus()
+        self.address = 0x68
+
+
+class FakeSensor:
+    def __init__(self):
+        self.reads = 0
+
+    def get_accel_data(self):
+        self.reads += 1
+        return {'x': 0.1 * self.reads, 'y': -0.2, 'z': 9.8}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSampleRing(unittest.TestCase):
+    def test_last_rows_oldest_first(self):
+        ring = imu_sampler.SampleRing(2, 8)
+        for i in range(20):
+            ring.push(i, (i, -i))
+        times, values = ring.last(3)
+        self.assertEqual(times.tolist(), [17, 18, 19])
+        self.assertEqual(values[:, 1].tolist(), [-17, -18, -19])
+        self.assertEqual(len(ring.last(100)[0]), 7)
+        self.assertEqual(len(imu_sampler.SampleRing(2, 8).last(5)[0]), 0)
+
+    def test_concurrent_reads_are_never_torn(self):
+        ring = imu_sampler.SampleRing(3, 16)
+        done = threading.Event()
+
+        def writer():
+            for i in range(20000):
+                ring.push(i, (i, i, i))
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        while not done.is_set():
+            times, values = ring.last(8)
+            self.assertTrue((values == times[:, None]).all())
+            self.assertTrue((times[1:] - times[:-1] == 1).all())
+        thread.join()
+
+
+class TestFIFOSource(unittest.TestCase):
+    def setUp(self):
+        self.device = FakeDevice()
+
+    def test_configures_rate_and_fifo(self):
+        source = imu_sampler.FIFOSource(self.device, rate=200, gyro=True)
+        registers = self.device.bus.registers
+        self.assertEqual(registers[imu_sampler.SMPLRT_DIV], 4)
+        self.assertEqual(source.rate, 200)
+        self.assertEqual(registers[imu_sampler.FIFO_EN], imu_sampler.FIFO_ACCEL | imu_sampler.FIFO_GYRO)
+        self.assertEqual(registers[imu_sampler.USER_CTRL], imu_sampler.USER_FIFO_EN)
+
+    def test_burst_read_scales_like_the_driver(self):
+        source = imu_sampler.FIFOSource(self.device, gyro=True)
+        for i in range(7):
+            self.device.bus.push(8192, -4096, i, 131, 0, -262)
+        self.device.bus.push(1, 2, 3)  # Half a frame stays for the next read
+
+        rows = source.read()
+        self.assertEqual(rows.shape, (7, 6))
+        # ACCEL_CONFIG 0x08 selects +-4 g, 8192 counts per g
+        self.assertAlmostEqual(rows[0, 0], imu_sampler.GRAVITY_MS2)
+        self.assertAlmostEqual(rows[0, 1], -imu_sampler.GRAVITY_MS2 / 2)
+        self.assertEqual(rows[:, 3].tolist(), [1.0] * 7)
+        self.assertEqual(rows[0, 5], -2.0)
+        self.assertEqual(len(self.device.bus.fifo), 6)
+        reads = [length for register, length in self.device.bus.block_reads if register == imu_sampler.FIFO_R_W]
+        self.assertTrue(all(length <= imu_sampler.I2C_BLOCK_MAX and length % 12 == 0 for length in reads))
+
+    def test_overflow_resets_fifo(self):
+        source = imu_sampler.FIFOSource(self.device)
+        self.device.bus.fifo += bytes(imu_sampler.FIFO_SIZE)
+        self.assertEqual(len(source.read()), 0)
+        self.assertEqual(source.overflows, 1)
+        self.assertEqual(len(self.device.bus.fifo), 0)
+
+    def test_reads_run_through_call(self):
+        calls = []
+        source = imu_sampler.FIFOSource(self.device, call=lambda func: calls.append(func) or func())
+        source.read()
+        self.assertEqual(len(calls), 2)
+
+
+class TestIMUSampler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_latest_and_window(self):
+        sensor = FakeSensor()
+        sampler = imu_sampler.IMUSampler(imu_sampler.PollingSource(sensor, rate=100), clock=self.clock)
+        for _ in range(5):
+            sampler.poll()
+            self.clock.now += 0.01
+
+        latest = sampler.latest(0)
+        self.assertAlmostEqual(latest['x'], 0.5)
+        self.assertAlmostEqual(latest['timestamp'], 100.04)
+        self.assertEqual(sampler.get_accel_data(0), {'x': latest['x'], 'y': -0.2, 'z': 9.8})
+        self.assertEqual(sensor.reads, 5)  # Consumers never touch the sensor
+
+        times, values = sampler.window(seconds=0.025)
+        self.assertEqual(len(times), 3)
+        self.assertEqual(values.shape, (3, 3))
+        self.assertEqual(len(sampler.window(count=2)[0]), 2)
+
+    def test_fifo_burst_timestamps_spread_back(self):
+        device = FakeDevice()
+        sampler = imu_sampler.IMUSampler(imu_sampler.FIFOSource(device, rate=100), clock=self.clock)
+        for i in range(4):
+            device.bus.push(i, 0, 0)
+        self.assertEqual(sampler.poll(), 4)
+        times, values = sampler.window()
+        self.assertEqual([round(t, 6) for t in times], [99.97, 99.98, 99.99, 100.0])
+
+    def test_latest_times_out_before_first_sample(self):
+        sampler = imu_sampler.IMUSampler(imu_sampler.PollingSource(FakeSensor()))
+        with self.assertRaises(TimeoutError):
+            sampler.latest(0)
+
+    def test_read_errors_are_counted(self):
+        sensor = FakeSensor()
+        sensor.get_accel_data = lambda: 1 / 0
+        sampler = imu_sampler.IMUSampler(imu_sampler.PollingSource(sensor))
+        with self.assertLogs('imu_sampler', level='WARNING'):
+            self.assertEqual(sampler.poll(), 0)
+        self.assertEqual(sampler.get_stats()['errors'], 1)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Test suite for the incremental EM statistics in Kalman_filter."""
+import random
+import unittest
+
+import numpy as np
+
+import Kalman_filter
+
+
+def windowed_statistics(kf):
+    """E-step statistics recomputed from scratch over the histories"""
+    history_size = min(kf.em_batch_size, len(kf.state_history))
+    innovations = list(kf.innovation_history)[-history_size:]
+    states = list(kf.state_history)[-history_size:]
+    transitions = [(b - a) ** 2 for a, b in zip(states, states[1:])]
+    return sum(inn * inn for inn in innovations) / history_size, sum(transitions) / (len(transitions) or 1)
+
+
+class TestIncrementalEM(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+        self.kf = Kalman_filter.Kalman_filter(0.01, 0.1)
+
+    def feed(self, count, noise=1.0):
+        x = 0.0
+        for _ in range(count):
+            x += random.gauss(0, 0.5)
+            self.kf.kalman(x + random.gauss(0, noise))
+
+    def assert_statistics_match(self):
+        expected = windowed_statistics(self.kf)
+        actual = self.kf._expectation_step()
+        for e, a in zip(expected, actual):
+            self.assertAlmostEqual(a, e, delta=1e-9 * max(1.0, abs(e)))
+
+    def test_matches_recomputation(self):
+        for _ in range(5):
+            self.feed(300, noise=random.choice([0.5, 3.0]))
+            self.assert_statistics_match()
+
+    def test_history_is_bounded(self):
+        self.feed(500)
+        self.assertEqual(len(self.kf.state_history), self.kf.history_max_size)
+        self.assertEqual(len(self.kf.innovation_history), self.kf.history_max_size)
+
+    def test_window_resize_at_runtime(self):
+        self.feed(100)
+        self.kf.history_max_size = 20
+        self.kf.em_batch_size = 15
+        self.feed(1)
+        self.assertEqual(len(self.kf.state_history), 20)
+        self.assert_statistics_match()
+
+        self.kf.history_max_size = 200
+        self.kf.em_batch_size = 120
+        self.feed(150)
+        self.assert_statistics_match()
+
+    def test_running_sum_resums(self):
+        window = Kalman_filter._RunningSum(3)
+        for value in range(Kalman_filter._RunningSum.RESUM_INTERVAL + 5):
+            window.append(value * 0.1)
+        self.assertEqual(window.total, sum(window.values))
+
+
+class TestKalmanBatch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.samples = np.cumsum(rng.normal(0, 1, 3000)) + rng.normal(0, 2, 3000)
+        self.samples[::250] += 80  # outliers take the jump branch
+
+    def test_matches_per_sample_filter(self):
+        reference = Kalman_filter.Kalman_filter(0.01, 0.1)
+        expected = np.array([(reference.kalman(z), reference.Q, reference.R) for z in self.samples])
+
+        batch = Kalman_filter.Kalman_filter(0.01, 0.1)
+        estimates, Q, R = batch.kalman_batch(self.samples[:1000])
+        rest = batch.kalman_batch(self.samples[1000:])
+        actual = np.column_stack([np.concatenate(pair) for pair in zip((estimates, Q, R), rest)])
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+    def test_filter_continues_after_batch(self):
+        reference = Kalman_filter.Kalman_filter(0.01, 0.1)
+        batch = Kalman_filter.Kalman_filter(0.01, 0.1)
+        for z in self.samples[:500]:
+            reference.kalman(z)
+        batch.kalman_batch(self.samples[:500])
+
+        self.assertEqual(batch.get_parameters()['history_size'], reference.get_parameters()['history_size'])
+        np.testing.assert_allclose(list(batch.state_history), list(reference.state_history))
+        for z in self.samples[500:600]:
+            self.assertAlmostEqual(batch.kalman(z), reference.kalman(z), places=9)
+
+    @unittest.skipUnless(Kalman_filter.njit, "numba is not installed")
+    def test_batch_runs_compiled(self):
+        Kalman_filter.Kalman_filter(0.01, 0.1).kalman_batch(self.samples)
+        self.assertTrue(Kalman_filter._kalman_em_loop.signatures)
+        # The compiled loop and its Python source agree
+        args = lambda: (np.zeros(len(self.samples)), np.zeros(len(self.samples)), np.zeros(len(self.samples)))
+        compiled, python = args(), args()
+        state = (0.01, 0.1, 1.0, 0.0, 0.0, 0.0, 0.0, 0)
+        for loop, outputs in ((Kalman_filter._kalman_em_loop, compiled),
+                              (Kalman_filter._kalman_em_loop.py_func, python)):
+            loop(self.samples, *outputs, state, np.zeros(30), 0, np.zeros(29), 0, 30, 50, 10, 0.01, 0.001)
+        np.testing.assert_allclose(compiled, python, rtol=1e-12)
+
+    def test_empty_batch(self):
+        kf = Kalman_filter.Kalman_filter(0.01, 0.1)
+        estimates, Q, R = kf.kalman_batch([])
+        self.assertEqual((len(estimates), len(Q), len(R)), (0, 0, 0))
+        self.assertEqual(kf.Q, 0.01)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
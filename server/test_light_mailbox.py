@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Test suite for the RobotLight command mailbox."""
+import time
+import unittest
+
+from robotLight import RobotLight
+
+
+class TestLightMailbox(unittest.TestCase):
+    def setUp(self):
+        self.light = RobotLight()
+        self.calls = []
+        self.light.fadeToColor = lambda *args, **kwargs: self.calls.append(('fade', args))
+        self.light.setBrightness = lambda brightness: self.calls.append(('brightness', brightness))
+        self.light.setStatus = lambda status: self.calls.append(('status', status))
+
+    def test_post_does_not_block(self):
+        start = time.time()
+        self.light.post('fadeToColor', 255, 0, 0, steps=30)
+        self.assertLess(time.time() - start, 0.01)
+        self.assertEqual(self.calls, [])
+
+    def test_latest_command_per_slot_wins(self):
+        self.light.post('fadeToColor', 255, 0, 0)
+        self.light.post('setBrightness', 100)
+        self.light.post('fadeToColor', 0, 255, 0)
+        self.light.post('setBrightness', 200)
+        self.assertTrue(self.light._drain())
+        self.assertEqual(self.calls, [('fade', (0, 255, 0)), ('brightness', 200)])
+
+    def test_order_follows_latest_post(self):
+        self.light.post('setStatus', 'active')
+        self.light.post('setBrightness', 100)
+        self.light.post('setStatus', 'idle')
+        self.light._drain()
+        self.assertEqual(self.calls, [('brightness', 100), ('status', 'idle')])
+        self.assertFalse(self.light._drain())
+
+    def test_mode_and_color_commands_both_run(self):
+        self.light.pause = lambda: self.calls.append(('pause',))
+        self.light.setColor = lambda *rgb: self.calls.append(('color', rgb))
+        self.light.post('pause')
+        self.light.post('setColor', 0, 0, 0)
+        self.light._drain()
+        self.assertEqual(self.calls, [('pause',), ('color', (0, 0, 0))])
+
+        del self.calls[:]
+        self.light.post('fadeToColor', 0, 255, 0)
+        self.light.post('setStatus', 'idle')
+        self.light._drain()
+        self.assertEqual(self.calls, [('fade', (0, 255, 0)), ('status', 'idle')])
+
+    def test_flush_waits_for_posted_commands(self):
+        self.light.daemon = True
+        self.light.start()
+        self.light.fadeToColor = lambda *args, **kwargs: (time.sleep(0.05), self.calls.append(('fade', args)))
+        self.light.post('fadeToColor', 0, 0, 0)
+        self.light.post('setStatus', 'warning')
+        self.assertTrue(self.light.flush(timeout=1.0))
+        self.assertEqual(self.calls, [('fade', (0, 0, 0)), ('status', 'warning')])
+
+    def test_flush_without_thread_drains_inline(self):
+        self.light.post('setBrightness', 10)
+        self.assertTrue(self.light.flush())
+        self.assertEqual(self.calls, [('brightness', 10)])
+
+    def test_light_thread_drains_mailbox(self):
+        self.light.daemon = True
+        self.light.start()
+        self.light.post('setStatus', 'warning')
+        deadline = time.time() + 1
+        while not self.calls and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.calls, [('status', 'warning')])
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Test suite for scanline-band line detection."""
+import unittest
+
+import cv2
+import numpy as np
+
+import line_scan
+
+
+def full_frame_centers(frame, rows, color):
+    """The original findlineCV path: whole frame Otsu + six erosions"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_OTSU)
+    binary = cv2.erode(binary, None, iterations=6)
+    edges = []
+    for row in rows:
+        index = np.where(binary[row] == color)[0]
+        edges.append((index[0], index[-1]))
+    centers = [int((start + end) / 2) for start, end in edges]
+    return edges, int((centers[0] + centers[1]) / 2)
+
+
+def line_frame(slope=0.3, offset=250, width=60, seed=0):
+    """Bright slanted line on a darker floor, with sensor noise"""
+    rng = np.random.RandomState(seed)
+    frame = np.full((480, 640, 3), 70, dtype=np.int16)
+    for y in range(480):
+        left = int(offset + slope * (y - 240))
+        frame[y, max(left, 0):max(left + width, 0)] = 210
+    frame += rng.randint(-15, 16, frame.shape).astype(np.int16)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+class TestScanLines(unittest.TestCase):
+    rows = (440, 380)
+
+    def test_matches_full_frame_path(self):
+        for slope, offset in ((0.0, 300), (0.3, 250), (-0.5, 400)):
+            frame = line_frame(slope, offset)
+            edges, center = full_frame_centers(frame, self.rows, 255)
+            scan = line_scan.scan_lines(frame, self.rows, 255)
+            self.assertEqual(list(zip(scan.start.tolist(), scan.end.tolist())), [tuple(e) for e in edges])
+            self.assertEqual(scan.center, center)
+
+    def test_black_line(self):
+        frame = 255 - line_frame()
+        edges, center = full_frame_centers(frame, self.rows, 0)
+        scan = line_scan.scan_lines(frame, self.rows, 0)
+        self.assertEqual(scan.center, center)
+
+    def test_lost_line_has_no_center(self):
+        frame = line_frame()
+        frame[self.rows[1] - 10:self.rows[1] + 10] = 70
+        scan = line_scan.scan_lines(frame, self.rows, 255)
+        self.assertIsNone(scan.center)
+        self.assertEqual(scan.start[0], line_scan.scan_lines(line_frame(), self.rows, 255).start[0])
+
+    def test_bands_are_a_small_part_of_the_frame(self):
+        scan = line_scan.scan_lines(line_frame(), self.rows, 255)
+        scanned = sum(band.size for _, band in scan.bands)
+        self.assertLess(scanned * 10, 480 * 640)
+        self.assertEqual(line_scan.band_bounds(477, 480), (471, 480))
+
+    def test_paste_bands(self):
+        scan = line_scan.scan_lines(line_frame(), self.rows, 255)
+        image = line_scan.paste_bands(np.zeros((480, 640, 3), np.uint8), scan)
+        top, band = scan.bands[0]
+        np.testing.assert_array_equal(image[top:top + band.shape[0], :, 1], band)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
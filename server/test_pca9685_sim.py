@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Test suite for the simulated PCA9685."""
+import unittest
+
+import pca9685_sim
+import pwm_bus
+
+
+class TestSimulatedPCA9685(unittest.TestCase):
+    def setUp(self):
+        pwm_bus._shadow_files.clear()
+        self.pwm = pca9685_sim.SimulatedPCA9685(latency=pca9685_sim.LatencyModel(0.001, 0.0001))
+        self.device = self.pwm._device
+        self.device.reset_stats()
+
+    def test_set_pwm_is_four_transactions(self):
+        self.pwm.set_pwm(3, 0, 310)
+        self.assertEqual(self.device.channel(3), (0, 310))
+        self.assertEqual(self.device.get_stats()['transactions'], 4)
+        self.assertAlmostEqual(self.device.get_stats()['bus_time'], 4 * 0.0011)
+
+    def test_all_led_fans_out(self):
+        self.pwm.set_all_pwm(0, 250)
+        self.assertEqual(self.pwm.channels(), [250] * 16)
+
+    def test_frame_burst_is_one_transaction(self):
+        frame = pwm_bus.PWMFrame(self.pwm)
+        self.device.reset_stats()
+        for channel in range(12):
+            frame.stage(channel, 200 + channel)
+        frame.commit()
+        self.assertEqual(self.pwm.channels()[:12], [200 + channel for channel in range(12)])
+        self.assertEqual(self.device.get_stats()['transactions'], 1)
+        self.assertEqual(self.device.get_stats()['bytes_written'], 48)
+
+    def test_block_write_without_auto_increment(self):
+        data = pwm_bus.channel_bytes(0, 300)
+        self.device.writeList(pwm_bus.LED0_ON_L, data)
+        registers = self.device.registers[pwm_bus.LED0_ON_L:pwm_bus.LED0_ON_L + 4]
+        self.assertEqual(list(registers), [data[-1], 0, 0, 0])
+
+    def test_write_log(self):
+        self.pwm.set_pwm(0, 0, 300)
+        _, kind, register, data = self.device.log[-1]
+        self.assertEqual((kind, register, data), ('write8', pwm_bus.LED0_ON_L + 3, bytes([1])))
+
+    def test_prescale_for_servo_frequency(self):
+        self.pwm.set_pwm_freq(50)
+        self.assertEqual(self.device.registers[pca9685_sim.PRESCALE], 121)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test suite for the fixed-step PIDBank."""
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import PID
+
+
+class TestPIDBank(unittest.TestCase):
+    def test_proportional_per_channel(self):
+        bank = PID.PIDBank(3, Kp=[1.0, 2.0, 3.0])
+        np.testing.assert_allclose(bank.update([1.0, 1.0, 1.0], setpoint=2.0), [1.0, 2.0, 3.0])
+
+    def test_integral_steps_by_sample_time(self):
+        bank = PID.PIDBank(('x', 'y'), sample_time=0.02, Ki=5.0)
+        for _ in range(10):
+            output = bank.update([0.0, 0.0], setpoint=[1.0, -2.0])
+        np.testing.assert_allclose(output, [1.0, -2.0])
+        self.assertAlmostEqual(bank.get_status('y')['I'], -2.0)
+
+    def test_integrator_is_clamped(self):
+        bank = PID.PIDBank(1, sample_time=0.1, Ki=10.0, windup_guard=3.0)
+        for _ in range(100):
+            bank.update([0.0], setpoint=5.0)
+        self.assertEqual(bank.output[0], 3.0)
+        # A clamped integrator unwinds as soon as the error changes sign
+        bank.update([6.0], setpoint=5.0)
+        self.assertAlmostEqual(bank.ITerm[0], 2.0)
+
+    def test_derivative_on_measurement(self):
+        bank = PID.PIDBank(1, sample_time=0.01, Kd=0.5)
+        bank.update([0.0], setpoint=0.0)
+        self.assertEqual(bank.update([0.0], setpoint=10.0)[0], 0.0)  # Setpoint step: no kick
+        self.assertAlmostEqual(bank.update([0.1], setpoint=10.0)[0], -0.5 * 0.1 / 0.01)
+
+    def test_filtered_derivative_decays(self):
+        bank = PID.PIDBank(1, sample_time=0.01, Kd=1.0, derivative_filter=0.04)
+        bank.update([0.0])
+        first = bank.update([1.0])[0]
+        self.assertAlmostEqual(first, -1.0 / 0.05)
+        second = bank.update([1.0])[0]
+        self.assertAlmostEqual(second, first * 0.8)
+
+    def test_matches_pid_for_constant_step(self):
+        """Same P/I/D arithmetic as PID.GenOut when the loop runs exactly on time"""
+        pid = PID.PID()
+        pid.SetKp(2.0)
+        pid.SetKi(0.5)
+        pid.SetKd(0.1)
+        pid.Initialize()
+        bank = PID.PIDBank(1, sample_time=0.015625, Kp=2.0, Ki=0.5, Kd=0.1, windup_guard=1e9)
+        pid.prevtime = 0.0
+        clock = [0.0]
+        errors = np.sin(np.arange(50) * 0.3)
+        with mock.patch.object(PID.time, 'time', lambda: clock[0]):
+            for i, error in enumerate(errors):
+                clock[0] += 0.015625
+                expected = pid.GenOut(error)
+                # With a zero setpoint, -measurement is the error
+                output = bank.update([-error])[0]
+                if i:  # GenOut differentiates the first error against zero
+                    self.assertAlmostEqual(output, expected, places=9)
+
+    def test_output_limit_and_status(self):
+        bank = PID.PIDBank(('x', 'y'), Kp=100.0, output_limit=50.0)
+        np.testing.assert_allclose(bank.update([1.0, -1.0]), [-50.0, 50.0])
+        status = bank.get_status('x')
+        self.assertEqual(status['output'], -50.0)
+        self.assertEqual(status['settings']['Kp'], 100.0)
+
+    def test_gain_change_for_one_channel(self):
+        bank = PID.PIDBank(('x', 'y'), Kp=1.0)
+        bank.set_gains(Kp=4.0, channel='y')
+        np.testing.assert_allclose(bank.update([-1.0, -1.0]), [1.0, 4.0])
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
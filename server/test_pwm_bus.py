@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test suite for the shadow-register PCA9685 cache."""
+import unittest
+
+import pwm_bus
+from test_pwm_frame import FakePCA9685
+
+
+class TestShadowPCA9685(unittest.TestCase):
+    def setUp(self):
+        pwm_bus._shadow_files.clear()
+        self.raw = FakePCA9685()
+        self.pwm = pwm_bus.ShadowPCA9685(self.raw)
+
+    def test_repeated_write_suppressed(self):
+        self.pwm.set_pwm(0, 0, 300)
+        self.pwm.set_pwm(0, 0, 300)
+        self.pwm.set_pwm(0, 0, 310)
+        self.assertEqual(self.raw.writes, [(0, 0, 300), (0, 0, 310)])
+
+        stats = self.pwm.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_wrappers_of_same_chip_share_registers(self):
+        other = pwm_bus.ShadowPCA9685(FakePCA9685())
+        self.pwm.set_pwm(4, 0, 300)
+        other.set_pwm(4, 0, 350)
+        self.pwm.set_pwm(4, 0, 300)
+        self.assertEqual(self.raw.writes, [(4, 0, 300), (4, 0, 300)])
+
+    def test_set_all_updates_shadow(self):
+        self.pwm.set_all_pwm(0, 0)
+        self.pwm.set_pwm(2, 0, 0)
+        self.pwm.set_all_pwm(0, 0)
+        self.assertEqual(self.raw.writes, [('all', 0, 0)])
+
+    def test_invalidate_forces_write(self):
+        self.pwm.set_pwm(1, 0, 300)
+        self.pwm.shadow.invalidate(1)
+        self.pwm.set_pwm(1, 0, 300)
+        self.assertEqual(len(self.raw.writes), 2)
+
+    def test_frame_skips_unchanged_channels(self):
+        frame = pwm_bus.PWMFrame(self.pwm)
+        for channel in range(12):
+            frame.stage(channel, 300)
+        frame.commit()
+        for channel in range(12):
+            frame.stage(channel, 300 if channel != 4 else 330)
+        self.assertEqual(frame.commit(), 1)
+        register, data = self.raw._device.block_writes[-1]
+        self.assertEqual(register, pwm_bus.LED0_ON_L + 4 * 4)
+        self.assertEqual(len(data), 4)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
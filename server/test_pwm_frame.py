@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Test suite for burst-written PCA9685 frames."""
+import unittest
+
+import pwm_bus
+
+
+class FakeDevice:
+    """Records raw I2C traffic in place of Adafruit_GPIO.I2C.Device"""
+
+    def __init__(self, address=0x40):
+        self._address = address
+        self.mode1 = 0x01
+        self.block_writes = []
+
+    def readU8(self, register):
+        return self.mode1
+
+    def write8(self, register, value):
+        self.mode1 = value
+
+    def writeList(self, register, data):
+        self.block_writes.append((register, list(data)))
+
+
+class FakePCA9685:
+    def __init__(self, address=0x40):
+        self._device = FakeDevice(address)
+        self.writes = []
+
+    def set_pwm(self, channel, on, off):
+        self.writes.append((channel, on, off))
+
+    def set_all_pwm(self, on, off):
+        self.writes.append(('all', on, off))
+
+    def set_pwm_freq(self, freq_hz):
+        pass
+
+
+class TestPWMFrame(unittest.TestCase):
+    def setUp(self):
+        pwm_bus._shadow_files.clear()
+        self.pwm = FakePCA9685()
+        self.frame = pwm_bus.PWMFrame(self.pwm)
+
+    def test_auto_increment_enabled(self):
+        self.assertTrue(self.pwm._device.mode1 & pwm_bus.AUTO_INCREMENT)
+
+    def test_full_frame_is_one_transaction(self):
+        for channel in range(16):
+            self.frame.stage(channel, 300 + channel)
+        self.assertEqual(self.frame.commit(), 1)
+
+        register, data = self.pwm._device.block_writes[0]
+        self.assertEqual(register, pwm_bus.LED0_ON_L)
+        self.assertEqual(len(data), 64)
+        self.assertEqual(data[-4:], pwm_bus.channel_bytes(0, 315))
+
+    def test_gaps_split_runs(self):
+        for channel in (0, 1, 2, 6, 7, 15):
+            self.frame.stage(channel, 300)
+        self.assertEqual(self.frame.commit(), 3)
+        registers = [register for register, _ in self.pwm._device.block_writes]
+        self.assertEqual(registers, [0x06, 0x06 + 4 * 6, 0x06 + 4 * 15])
+
+    def test_commit_clears_staged(self):
+        self.frame.stage(3, 400)
+        self.frame.commit()
+        self.assertEqual(self.frame.commit(), 0)
+
+    def test_fallback_without_device(self):
+        pwm = FakePCA9685()
+        pwm._device = None
+        frame = pwm_bus.PWMFrame(pwm)
+        frame.stage(5, 350)
+        frame.stage(1, 250)
+        frame.commit()
+        self.assertEqual(pwm.writes, [(1, 0, 250), (5, 0, 350)])
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Test suite for the deadline scheduler."""
+import unittest
+
+from scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sched = DeadlineScheduler(0.01, max_lag=2, clock=self.clock, sleep=self.clock.sleep)
+        self.sched.start()
+
+    def test_work_time_does_not_drift(self):
+        for _ in range(100):
+            self.clock.now += 0.004  # simulated I2C writes
+            self.sched.wait()
+        self.assertAlmostEqual(self.clock.now, 100.0 + 100 * 0.01, places=9)
+        self.assertEqual(self.sched.get_stats()['overruns'], 0)
+
+    def test_small_overrun_catches_up(self):
+        self.clock.now += 0.015
+        self.sched.wait()
+        self.sched.wait()  # runs immediately to catch up
+        stats = self.sched.get_stats()
+        self.assertEqual(stats['overruns'], 1)
+        self.assertEqual(stats['skipped'], 0)
+        self.assertAlmostEqual(self.clock.now, 100.02, places=9)
+
+    def test_large_overrun_skips_ticks(self):
+        self.clock.now += 0.055
+        self.sched.wait()
+        stats = self.sched.get_stats()
+        self.assertEqual(stats['skipped'], 4)
+        self.assertAlmostEqual(stats['jitter_max'], 0.045, places=9)
+
+        self.sched.wait()
+        self.assertAlmostEqual(self.clock.now, 100.06, places=9)
+
+    def test_reset_stats(self):
+        self.sched.wait()
+        self.sched.reset_stats()
+        self.assertEqual(self.sched.get_stats()['ticks'], 0)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test suite for ServoCtrl goal snapshots."""
+import unittest
+
+import RPIservo
+
+
+class TestGoalSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.sc = RPIservo.ServoCtrl()
+
+    def test_published_goal_is_read_only(self):
+        self.sc.publishGoal([0, 1], [350, 250])
+        with self.assertRaises(ValueError):
+            self.sc.goalPos[0] = 300
+
+    def test_snapshot_survives_later_publish(self):
+        self.sc.publishGoal([0], [350])
+        goal, generation = self.sc.goalSnapshot()
+        self.sc.publishGoal([0], [200])
+        self.assertEqual(goal[0], 350)
+        self.assertEqual(self.sc.goalPos[0], 200)
+        self.assertEqual(self.sc.goalGeneration, generation + 1)
+
+    def test_full_publish(self):
+        self.sc.publishGoal(None, self.sc.initPos)
+        self.assertTrue((self.sc.goalPos == self.sc.initPos).all())
+
+    def test_new_goal_interrupts_auto_move(self):
+        self.sc.pause = lambda: None
+        self.sc.scheduler.wait = lambda: self.sc.publishGoal([0], [400])
+        self.sc.autoSpeed([0], [30])
+        self.assertEqual(self.sc.moveAuto(), 1)
+        self.assertEqual(self.sc.lastPos[0], self.sc.nowPos[0])
+
+    def test_plan_move_reaches_goal(self):
+        self.sc.pause = lambda: None
+        self.sc.scheduler.wait = lambda: 0.0
+        for profile, angles in (('minjerk', [40, -25]), ('trapezoid', [-30, 10])):
+            self.sc.planSpeed([0, 3], angles, profile)
+            self.assertEqual(self.sc.movePlan(), 0)
+            self.assertTrue((self.sc.nowPos == self.sc.goalPos).all())
+            self.assertTrue((self.sc.lastPos == self.sc.nowPos).all())
+
+    def test_move_to_arrives_together(self):
+        self.sc.pause = lambda: None
+        ticks = []
+        self.sc.scheduler.wait = lambda: ticks.append(self.sc.nowPos[[0, 5, 9]].tolist())
+        arrival = self.sc.moveTo([0, 5, 9], [450, 150, 320], speedSet=200, duration=0.3)
+        self.assertFalse(arrival.done())
+
+        self.sc.movePlan()
+        self.assertTrue(arrival.result(0))
+        self.assertEqual(ticks[-1], [450, 150, 320])
+        # The short move on channel 9 progresses in step with the long ones
+        for tick in ticks:
+            self.assertAlmostEqual((tick[2] - 300) / 20, (tick[0] - 300) / 150, delta=0.05)
+        self.assertGreaterEqual(len(ticks), 0.3 / self.sc.scDelay)
+
+    def test_move_time_matches_plan(self):
+        self.sc.pause = lambda: None
+        ticks = []
+        self.sc.scheduler.wait = lambda: ticks.append(1)
+        for speed, duration in ((None, 0.5), (100, 0.0), (None, 0.0)):
+            self.sc.nowPos[[0, 5]] = 300
+            expected = self.sc.moveTime([0, 5], [450, 520], speed, duration)
+            del ticks[:]
+            self.sc.moveTo([0, 5], [450, 520], speed, duration)
+            self.sc.movePlan()
+            self.assertAlmostEqual(len(ticks) * self.sc.scDelay, expected, delta=self.sc.scDelay)
+        self.assertEqual(self.sc.moveTime([0], [self.sc.nowPos[0]], None, 0.2), 0.2)
+
+    def test_replaced_move_resolves_false(self):
+        first = self.sc.moveTo([0], [450])
+        second = self.sc.moveTo([0], [200])
+        self.assertFalse(first.result(0))
+        self.assertFalse(second.done())
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
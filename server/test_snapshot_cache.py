@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Test suite for the TTL snapshot cache behind the status endpoints."""
+import threading
+import time
+import unittest
+
+from snapshot_cache import SnapshotCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingReader:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.calls
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SnapshotCache(default_ttl=1.0, clock=self.clock)
+
+    def test_one_read_per_ttl(self):
+        reader = CountingReader()
+        self.cache.register('temp', reader)
+        self.assertEqual([self.cache.get('temp') for _ in range(10)], [1] * 10)
+        self.clock.now = 0.99
+        self.assertEqual(self.cache.get('temp'), 1)
+        self.clock.now = 1.0
+        self.assertEqual(self.cache.get('temp'), 2)
+        self.assertEqual(self.cache.get_stats()['temp'], {'ttl': 1.0, 'reads': 2, 'hits': 10})
+
+    def test_sources_have_their_own_ttl(self):
+        fast, slow = CountingReader(), CountingReader()
+        self.cache.register('imu', fast, ttl=0.05)
+        self.cache.register('temp', slow)
+        for step in range(10):
+            self.clock.now = step * 0.1
+            self.cache.get('imu')
+            self.cache.get('temp')
+        self.assertEqual((fast.calls, slow.calls), (10, 1))
+
+        self.cache.set_ttl('imu', 10.0)
+        self.cache.get('imu')
+        self.assertEqual(fast.calls, 10)
+        self.assertAlmostEqual(self.cache.age('imu'), 0.0)
+
+    def test_invalidate_forces_read(self):
+        reader = CountingReader()
+        self.cache.register('ram', reader)
+        self.cache.get('ram')
+        self.cache.invalidate('ram')
+        self.assertIsNone(self.cache.age('ram'))
+        self.assertEqual(self.cache.get('ram'), 2)
+
+    def test_concurrent_clients_share_one_read(self):
+        cache = SnapshotCache(default_ttl=60.0)
+        reader = CountingReader(delay=0.05)
+        cache.register('stability', reader)
+        results = []
+        clients = [threading.Thread(target=lambda: results.append(cache.get('stability'))) for _ in range(8)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        self.assertEqual(reader.calls, 1)
+        self.assertEqual(results, [1] * 8)
+
+    def test_failed_read_is_not_cached(self):
+        calls = []
+
+        def flaky():
+            calls.append(None)
+            if len(calls) == 1:
+                raise IOError("bus busy")
+            return 42
+
+        self.cache.register('imu', flaky)
+        with self.assertRaises(IOError):
+            self.cache.get('imu')
+        self.assertEqual(self.cache.get('imu'), 42)
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
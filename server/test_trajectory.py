@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test suite for the servo trajectory planner."""
+import unittest
+
+import numpy as np
+
+import trajectory
+
+PERIOD = 0.01
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.start = np.full(16, 300.0)
+        self.goal = self.start.copy()
+        self.goal[[0, 5, 9]] = [420, 180, 310]
+        self.max_vel = np.full(16, 700.0)
+        self.max_acc = np.full(16, 3500.0)
+
+    def check_limits(self, samples):
+        path = np.vstack([self.start, samples])
+        velocity = np.diff(path, axis=0) / PERIOD
+        self.assertTrue((np.abs(velocity) <= self.max_vel * 1.01).all())
+
+    def test_endpoints(self):
+        for profile in trajectory.PROFILES:
+            with self.subTest(profile=profile):
+                samples = trajectory.plan(self.start, self.goal, PERIOD, self.max_vel, self.max_acc, profile)
+                np.testing.assert_array_equal(samples[-1], self.goal)
+                np.testing.assert_array_equal(samples[:, 1], self.start[1])
+
+    def test_velocity_limits_respected(self):
+        for profile in trajectory.PROFILES:
+            with self.subTest(profile=profile):
+                self.check_limits(trajectory.plan(self.start, self.goal, PERIOD, self.max_vel, self.max_acc, profile))
+
+    def test_channels_move_monotonically(self):
+        samples = trajectory.plan(self.start, self.goal, PERIOD, self.max_vel, self.max_acc)
+        steps = np.diff(samples, axis=0)
+        self.assertTrue((steps[:, 0] >= 0).all())
+        self.assertTrue((steps[:, 5] <= 0).all())
+
+    def test_short_moves_take_fewer_ticks(self):
+        short_goal = self.start.copy()
+        short_goal[0] += 10
+        short = trajectory.plan(self.start, short_goal, PERIOD, self.max_vel, self.max_acc)
+        long = trajectory.plan(self.start, self.goal, PERIOD, self.max_vel, self.max_acc)
+        self.assertLess(len(short), len(long))
+
+    def test_trapezoid_reaches_cruise_speed(self):
+        duration = trajectory.trapezoid_duration(np.array([400.0]), 700.0, 3500.0)[0]
+        self.assertAlmostEqual(duration, 400 / 700 + 700 / 3500)
+        t = np.array([[duration / 2]])
+        travel = trajectory.trapezoid_travel(t, duration, np.array([400.0]), 3500.0)
+        self.assertAlmostEqual(travel[0, 0], 200.0)
+
+    def test_no_motion(self):
+        self.assertEqual(len(trajectory.plan(self.start, self.start, PERIOD, self.max_vel, self.max_acc)), 0)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            trajectory.plan(self.start, self.goal, PERIOD, self.max_vel, self.max_acc, 'cubic')
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test suite for the offline Kalman/PID parameter tuner."""
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import tuner
+
+
+def step_trace(length=200, tilt=1.5, seed=0):
+    """Sustained tilt with sensor noise, true values known"""
+    rng = np.random.RandomState(seed)
+    truth = np.tile([tilt, -tilt / 2], (length, 1))
+    return tuner.Trace('step', truth + rng.normal(0, 0.1, truth.shape), truth)
+
+
+class TestTuner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_control_beats_no_control(self):
+        trace = step_trace()
+        idle = tuner.simulate(dict(tuner.DEFAULTS, P=0.0, I=0.0, D=0.0), trace, plant_gain=0.05)
+        active = tuner.simulate(dict(tuner.DEFAULTS, P=5.0), trace, plant_gain=0.05)
+        self.assertLess(active['tilt_rms'], idle['tilt_rms'])
+        self.assertEqual(idle['effort_rms'], 0.0)
+
+    def test_grid_covers_varied_parameters(self):
+        candidates = tuner.grid_candidates(('P', 'history'), steps=3)
+        self.assertEqual(len(candidates), 9)
+        self.assertEqual(sorted(set(c['P'] for c in candidates)), [0.0, 5.0, 10.0])
+        self.assertTrue(all(isinstance(c['history'], int) for c in candidates))
+        self.assertTrue(all(c['Q'] == tuner.DEFAULTS['Q'] for c in candidates))
+
+    def test_random_candidates_stay_in_range(self):
+        for candidate in tuner.random_candidates(count=50, seed=3):
+            for name, (low, high, _) in tuner.RANGES.items():
+                self.assertTrue(low <= candidate[name] <= high, name)
+
+    def test_tune_ranks_and_writes_outputs(self):
+        results = tuner.tune([step_trace()], vary=('P',), steps=4, workers=1, plant_gain=0.05)
+        scores = [result['score'] for result in results]
+        self.assertEqual(scores, sorted(scores))
+        self.assertGreater(results[0]['P'], 0.0)
+
+        tuner.write_results(self.path('results.csv'), results)
+        with open(self.path('results.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([int(row['rank']) for row in rows], [1, 2, 3, 4])
+        self.assertEqual(float(rows[0]['P']), results[0]['P'])
+
+    def test_parameters_keep_panel_layout(self):
+        with open(self.path('parameters.json'), 'w') as f:
+            json.dump({'movement': {'speed_scale': 0.5}, 'pid': {'P': 1.0}}, f)
+        params = dict(tuner.DEFAULTS, P=7.5, Q=0.02)
+        tuner.write_parameters(self.path('parameters.json'), params)
+        with open(self.path('parameters.json')) as f:
+            saved = json.load(f)
+        self.assertEqual(set(saved), set(tuner.PANEL_DEFAULTS))
+        self.assertEqual(saved['movement'], {'speed_scale': 0.5})
+        self.assertEqual(saved['pid']['P'], 7.5)
+        self.assertEqual(saved['kalman']['Q'], 0.02)
+
+    def test_trace_round_trip(self):
+        tuner.save_trace(self.path('trace.csv'), [0.0, 0.01], [(0.1, -0.2), (0.3, 0.4)])
+        trace = tuner.load_trace(self.path('trace.csv'))
+        self.assertEqual(trace.name, 'trace.csv')
+        np.testing.assert_allclose(trace.measured, [[0.1, -0.2], [0.3, 0.4]])
+        self.assertIsNone(trace.truth)
+        self.assertIsNone(tuner.simulate(tuner.DEFAULTS, trace)['filter_rmse'])
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test suite for the multi-axis VectorKalmanFilter."""
+import unittest
+
+import numpy as np
+
+import Kalman_filter
+
+
+class TestVectorKalmanFilter(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(3)
+
+    def test_single_axis_matches_scalar_filter(self):
+        scalar = Kalman_filter.Kalman_filter(0.01, 0.1)
+        vector = Kalman_filter.VectorKalmanFilter(('x',), 0.01, 0.1)
+        signal = np.cumsum(self.rng.normal(0, 0.1, 300)) + self.rng.normal(0, 1, 300)
+        for z in signal:
+            self.assertAlmostEqual(vector.update([z])[0], scalar.kalman(z), places=9)
+        self.assertAlmostEqual(vector.get_parameters('x')['Q'], scalar.Q, places=12)
+        self.assertAlmostEqual(vector.get_parameters('x')['R'], scalar.R, places=12)
+
+    def test_jump_threshold_matches_scalar_filter(self):
+        scalar = Kalman_filter.Kalman_filter(0.01, 0.1)
+        vector = Kalman_filter.VectorKalmanFilter(('x',), 0.01, 0.1, jump_threshold=60)
+        plain = Kalman_filter.VectorKalmanFilter(('x',), 0.01, 0.1)
+        # Pixel errors that jump by up to a few hundred when the target moves
+        signal = np.repeat(self.rng.uniform(-320, 320, 10), 30) + self.rng.normal(0, 2, 300)
+        for z in signal:
+            self.assertAlmostEqual(vector.update([z])[0], scalar.kalman(z), places=6)
+            plain.update([z])
+        self.assertAlmostEqual(vector.get_parameters('x')['Q'], scalar.Q, places=9)
+        # Without the blending the estimate trails a jump further behind
+        lag = vector.value('x') + 200 - vector.update([vector.value('x') + 200])[0]
+        plain_lag = plain.value('x') + 200 - plain.update([plain.value('x') + 200])[0]
+        self.assertLess(lag, plain_lag)
+
+    def test_uncorrelated_axes_match_independent_filters(self):
+        vector = Kalman_filter.VectorKalmanFilter('xyz', 0.01, [0.1, 0.2, 0.3])
+        scalars = [Kalman_filter.Kalman_filter(0.01, r) for r in (0.1, 0.2, 0.3)]
+        vector.min_samples_for_em = 10 ** 6  # No adaptation, so no coupling through Q and R
+        for scalar in scalars:
+            scalar.min_samples_for_em = 10 ** 6
+        for sample in self.rng.normal(0, 1, (50, 3)):
+            expected = [scalar.kalman(z) for scalar, z in zip(scalars, sample)]
+            np.testing.assert_allclose(vector.update(dict(zip('xyz', sample))), expected)
+
+    def test_learns_shared_noise(self):
+        vector = Kalman_filter.VectorKalmanFilter('xy', 0.01, 0.1)
+        for shake in self.rng.normal(0, 1, 400):
+            vector.update((shake, shake))
+        self.assertGreater(vector.R[0, 1], 0.5 * vector.R[0, 0])
+
+    def test_instances_are_independent(self):
+        balance = Kalman_filter.VectorKalmanFilter('xy', 0.01, 0.1)
+        vision = Kalman_filter.VectorKalmanFilter('xy', 0.01, 0.1)
+        for _ in range(20):
+            vision.update((150.0, -80.0))
+        self.assertEqual(balance.value('x'), 0.0)
+        self.assertEqual(balance.get_parameters('x')['history_size'], 0)
+        self.assertEqual(vision.get_parameters()['y']['history_size'], 20)
+
+    def test_rejects_wrong_length(self):
+        vector = Kalman_filter.VectorKalmanFilter('xyz', 0.01, 0.1)
+        with self.assertRaises(ValueError):
+            vector.update((1.0, 2.0))
+        with self.assertRaises(KeyError):
+            vector.update({'x': 1.0, 'y': 2.0})
+
+
+def run_tests():
+    unittest.main(verbosity=2)
+
+
+if __name__ == "__main__":
+    run_tests()
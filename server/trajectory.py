@@ -0,0 +1,91 @@
+"""Point-to-point servo trajectories with velocity and acceleration limits
+
+ServoCtrl's 'auto' mode always takes scSteps ticks and 'certain' mode moves
+at a constant speed with instant starts and stops. plan() instead samples a
+minimum-jerk or trapezoidal velocity profile for every channel at once. The
+move lasts as long as the slowest channel needs under its own limits, and
+every channel is scaled to finish at that same moment, so short moves take
+few ticks and long moves never exceed the per-servo limits.
+"""
+import math
+
+import numpy as np
+
+MIN_JERK = 'minjerk'
+TRAPEZOID = 'trapezoid'
+PROFILES = (MIN_JERK, TRAPEZOID)
+
+# Peak velocity and acceleration of a unit minimum-jerk move over unit time
+MIN_JERK_PEAK_VEL = 1.875
+MIN_JERK_PEAK_ACC = 10 / math.sqrt(3)
+
+
+def min_jerk_duration(distance, max_vel, max_acc):
+    """Shortest minimum-jerk duration per channel that stays within both limits"""
+    distance = np.abs(distance)
+    return np.maximum(MIN_JERK_PEAK_VEL * distance / max_vel,
+                      np.sqrt(MIN_JERK_PEAK_ACC * distance / max_acc))
+
+
+def trapezoid_duration(distance, max_vel, max_acc):
+    """Shortest trapezoidal (or triangular, for short moves) duration per channel"""
+    distance = np.abs(distance)
+    cruise = distance / max_vel + max_vel / max_acc
+    triangle = 2 * np.sqrt(distance / max_acc)
+    return np.where(distance >= max_vel ** 2 / max_acc, cruise, triangle)
+
+
+def min_jerk_fraction(t, duration):
+    """Fraction of the move completed at time t, 0 -> 1"""
+    s = np.clip(t / duration, 0.0, 1.0)
+    return s ** 3 * (10 - 15 * s + 6 * s ** 2)
+
+
+def trapezoid_travel(t, duration, distance, max_acc):
+    """Distance covered at times t (column) by channels accelerating at max_acc
+
+    Each channel cruises at the speed that makes it cover its distance in
+    exactly duration seconds.
+    """
+    distance = np.abs(distance)
+    root = np.sqrt(np.maximum((max_acc * duration) ** 2 - 4 * max_acc * distance, 0.0))
+    cruise_vel = (max_acc * duration - root) / 2
+    ramp = cruise_vel / max_acc
+
+    accelerating = 0.5 * max_acc * t ** 2
+    cruising = 0.5 * max_acc * ramp ** 2 + cruise_vel * (t - ramp)
+    braking = distance - 0.5 * max_acc * (duration - t) ** 2
+    travel = np.where(t < ramp, accelerating, np.where(t < duration - ramp, cruising, braking))
+    return np.clip(travel, 0.0, distance)
+
+
+def plan(start, goal, period, max_vel, max_acc, profile=MIN_JERK, min_duration=0.0):
+    """Sample a synchronized move from start to goal every period seconds
+
+    max_vel and max_acc are per-channel limits in position units per second
+    (and per second squared); min_duration stretches moves that could finish
+    sooner. Returns an (n, channels) float array whose last row is exactly
+    goal, or an empty array if nothing has to move.
+    """
+    start = np.asarray(start, dtype=float)
+    goal = np.asarray(goal, dtype=float)
+    distance = goal - start
+    if not distance.any():
+        return np.empty((0, len(start)))
+
+    if profile == MIN_JERK:
+        duration = float(np.max(min_jerk_duration(distance, max_vel, max_acc)))
+    elif profile == TRAPEZOID:
+        duration = float(np.max(trapezoid_duration(distance, max_vel, max_acc)))
+    else:
+        raise ValueError(f"Unknown trajectory profile: {profile}")
+    duration = max(duration, min_duration)
+
+    steps = max(int(math.ceil(duration / period - 1e-9)), 1)
+    t = np.minimum(np.arange(1, steps + 1) * period, duration)[:, np.newaxis]
+    if profile == MIN_JERK:
+        samples = start + distance * min_jerk_fraction(t, duration)
+    else:
+        samples = start + np.sign(distance) * trapezoid_travel(t, duration, distance, max_acc)
+    samples[-1] = goal
+    return samples
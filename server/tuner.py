@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Offline Kalman/PID parameter sweeps for the balance loop
+
+Tuning Q/R/alpha/history and P/I/D used to mean moving the sliders in
+client/parameter_panel.py and watching the robot. The tuner replays IMU
+traces, recorded on the robot with save_trace() or generated by
+robot_simulator.RobotSimulator, through the same VectorKalmanFilter,
+PIDBank and BalanceController that steady mode runs. It does this for
+every candidate on a grid, a random sample, or a Bayesian search (needs
+the optional scikit-optimize). Candidates are scored in a process pool
+across all cores. The results go to a ranked CSV table, and the winner
+to parameters.json in the layout ParameterPanel.save_parameters() writes,
+so the panel can load it directly.
+
+Scoring closes the loop around a simple plant: each leg-height correction
+count shifts the measured tilt by plant_gain (m/s^2) in the direction the
+controller pushes it, and a candidate costs the RMS of the true tilt plus
+effort_weight times the RMS change in correction per tick.
+
+    python3 tuner.py --simulate 4 --search random --candidates 2000
+    python3 tuner.py --trace walk.csv --trace push.csv --vary Q,R,P,D --steps 5
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Kalman_filter
+import PID
+import balance
+from robot_simulator import RobotSimulator
+
+logger = logging.getLogger(__name__)
+
+# Search ranges of the parameter panel sliders: (low, high, log scale)
+RANGES = {
+    'Q': (0.001, 1.0, True),
+    'R': (0.01, 1.0, True),
+    'alpha': (0.001, 1.0, True),
+    'history': (10, 100, False),
+    'P': (0.0, 10.0, False),
+    'I': (0.0, 1.0, False),
+    'D': (0.0, 1.0, False),
+    'windup': (0.0, 100.0, False),
+}
+PARAMETERS = tuple(RANGES)
+INTEGER_PARAMETERS = ('history',)
+KALMAN_PARAMETERS = ('Q', 'R', 'alpha', 'history')
+PID_PARAMETERS = ('P', 'I', 'D', 'windup')
+
+# Defaults of ParameterPanel.save_parameters()
+PANEL_DEFAULTS = {
+    'kalman': {'Q': 0.01, 'R': 0.1, 'alpha': 0.01, 'history': 50},
+    'pid': {'P': 5.0, 'I': 0.01, 'D': 0.0, 'windup': 20.0},
+    'movement': {'speed_scale': 1.0, 'turn_scale': 1.0, 'step_size': 5, 'smoothing': 0.5},
+    'balance': {'x_target': 0.0, 'y_target': 0.0, 'sensitivity': 1.0, 'threshold': 1.0},
+}
+DEFAULTS = dict(PANEL_DEFAULTS['kalman'], **PANEL_DEFAULTS['pid'])
+
+RATE = 100  # balance loop rate the traces are replayed at, Hz
+PLANT_GAIN = 0.01
+EFFORT_WEIGHT = 0.01
+STEADY_RANGE = (-40, 130)  # move.steady_range_Min / steady_range_Max
+METRICS = ('score', 'tilt_rms', 'filter_rmse', 'effort_rms')
+
+# truth is None for recorded traces, which only have the measurements
+Trace = namedtuple('Trace', 'name measured truth')
+
+
+def save_trace(path, times, values, axes=('x', 'y')):
+    """Write IMU rows (e.g. from IMUSampler.window()) as a CSV trace"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('time',) + tuple(axes))
+        writer.writerows([t] + list(row) for t, row in zip(times, values))
+
+
+def load_trace(path):
+    """Read a CSV trace with x and y columns, plus truth_x/truth_y if known"""
+    data = np.genfromtxt(path, delimiter=',', names=True)
+    measured = np.column_stack((data['x'], data['y']))
+    truth = None
+    if 'truth_x' in data.dtype.names:
+        truth = np.column_stack((data['truth_x'], data['truth_y']))
+    return Trace(os.path.basename(path), measured, truth)
+
+
+def simulated_traces(count, duration=2.0, seed=0):
+    """Balance-disturbance runs of RobotSimulator with known true acceleration"""
+    traces = []
+    for i in range(count):
+        np.random.seed(seed + i)
+        run = RobotSimulator().simulate_balance_disturbance(duration, disturbance_magnitude=1.0 + 0.5 * i)
+        measured = np.array([step['measured_acceleration'][:2] for step in run])
+        truth = np.array([step['true_acceleration'][:2] for step in run])
+        traces.append(Trace(f'simulated-{i}', measured, truth))
+    return traces
+
+
+def simulate(params, trace, plant_gain=PLANT_GAIN, effort_weight=EFFORT_WEIGHT):
+    """Closed-loop replay of one trace with one parameter set; returns its metrics"""
+    kalman = Kalman_filter.VectorKalmanFilter(('x', 'y'), params['Q'], params['R'])
+    # Same mapping as move.handle_parameter_update()
+    kalman.alpha_R = params['alpha']
+    kalman.alpha_Q = params['alpha'] * 0.1
+    kalman.history_max_size = int(params['history'])
+    pid = PID.PIDBank(('x', 'y'), 1.0 / RATE, Kp=params['P'], Ki=params['I'], Kd=params['D'],
+                      windup_guard=params['windup'])
+    controller = balance.BalanceController(None, kalman, pid, None, STEADY_RANGE[0], STEADY_RANGE[1], RATE)
+
+    truth = trace.measured if trace.truth is None else trace.truth
+    tilt_sq = filter_sq = effort_sq = 0.0
+    for measured, true in zip(trace.measured, truth):
+        offset = plant_gain * controller.correction
+        previous = controller.correction
+        controller.step(measured + offset)
+        true_tilt = true + offset
+        tilt_sq += float(true_tilt @ true_tilt)
+        error = controller.tilt - true_tilt
+        filter_sq += float(error @ error)
+        change = controller.correction - previous
+        effort_sq += float(change @ change)
+
+    count = max(len(trace.measured), 1)
+    tilt_rms = math.sqrt(tilt_sq / count)
+    effort_rms = math.sqrt(effort_sq / count)
+    return {
+        'score': tilt_rms + effort_weight * effort_rms,
+        'tilt_rms': tilt_rms,
+        'filter_rmse': math.sqrt(filter_sq / count) if trace.truth is not None else None,
+        'effort_rms': effort_rms,
+    }
+
+
+_traces = ()
+_options = {}
+
+
+def _init_worker(traces, options):
+    global _traces, _options
+    _traces = traces
+    _options = options
+
+
+def evaluate(params):
+    """Mean metrics of a parameter set over the worker's traces"""
+    results = [simulate(params, trace, **_options) for trace in _traces]
+    metrics = dict(params)
+    for name in METRICS:
+        values = [result[name] for result in results if result[name] is not None]
+        metrics[name] = float(np.mean(values)) if values else None
+    return metrics
+
+
+def _complete(values):
+    params = dict(DEFAULTS, **values)
+    for name in INTEGER_PARAMETERS:
+        params[name] = int(round(params[name]))
+    return params
+
+
+def axis_values(name, steps):
+    low, high, log = RANGES[name]
+    values = np.geomspace(low, high, steps) if log else np.linspace(low, high, steps)
+    if name in INTEGER_PARAMETERS:
+        return sorted(set(int(round(v)) for v in values))
+    return [float(v) for v in values]
+
+
+def grid_candidates(vary=PARAMETERS, steps=3):
+    """Every combination of steps values per varied parameter, the rest at their defaults"""
+    axes = [axis_values(name, steps) for name in vary]
+    return [_complete(dict(zip(vary, combination))) for combination in itertools.product(*axes)]
+
+
+def random_candidates(vary=PARAMETERS, count=500, seed=0):
+    """Uniform (log-uniform for log-scaled ranges) samples of the varied parameters"""
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(count):
+        values = {}
+        for name in vary:
+            low, high, log = RANGES[name]
+            values[name] = math.exp(rng.uniform(math.log(low), math.log(high))) if log else rng.uniform(low, high)
+        candidates.append(_complete(values))
+    return candidates
+
+
+def _bayes_search(pool, vary, calls, batch, seed):
+    try:
+        from skopt import Optimizer
+        from skopt.space import Integer, Real
+    except ImportError:
+        raise ImportError("Bayesian search needs scikit-optimize (pip install scikit-optimize)")
+
+    dimensions = []
+    for name in vary:
+        low, high, log = RANGES[name]
+        if name in INTEGER_PARAMETERS:
+            dimensions.append(Integer(low, high, name=name))
+        else:
+            dimensions.append(Real(low, high, prior='log-uniform' if log else 'uniform', name=name))
+    optimizer = Optimizer(dimensions, random_state=seed)
+    results = []
+    while len(results) < calls:
+        points = optimizer.ask(n_points=min(batch, calls - len(results)))
+        scored = list(pool.map(evaluate, [_complete(dict(zip(vary, point))) for point in points]))
+        optimizer.tell(points, [result['score'] for result in scored])
+        results.extend(scored)
+    return results
+
+
+def tune(traces, search='grid', vary=PARAMETERS, steps=3, candidates=500, workers=None, seed=0,
+         plant_gain=PLANT_GAIN, effort_weight=EFFORT_WEIGHT):
+    """Score candidates on all cores and return their metrics, best first"""
+    workers = workers or os.cpu_count() or 1
+    options = {'plant_gain': plant_gain, 'effort_weight': effort_weight}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(tuple(traces), options)) as pool:
+        if search == 'bayes':
+            results = _bayes_search(pool, vary, candidates, workers, seed)
+        else:
+            if search == 'grid':
+                batch = grid_candidates(vary, steps)
+            elif search == 'random':
+                batch = random_candidates(vary, candidates, seed)
+            else:
+                raise ValueError(f"Unknown search: {search}")
+            logger.info(f"Scoring {len(batch)} candidates on {workers} workers")
+            results = list(pool.map(evaluate, batch, chunksize=max(1, len(batch) // (workers * 8))))
+    return sorted(results, key=lambda result: result['score'])
+
+
+def write_results(path, results):
+    """Ranked CSV table of every candidate's parameters and metrics"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=('rank',) + PARAMETERS + METRICS)
+        writer.writeheader()
+        for rank, result in enumerate(results, 1):
+            writer.writerow(dict(result, rank=rank))
+
+
+def panel_parameters(params, base=None):
+    """params in the parameters.json layout, on top of base (or the panel defaults)"""
+    layout = json.loads(json.dumps(base or PANEL_DEFAULTS))
+    for section in PANEL_DEFAULTS:
+        layout.setdefault(section, dict(PANEL_DEFAULTS[section]))
+    layout['kalman'].update({name: params[name] for name in KALMAN_PARAMETERS})
+    layout['pid'].update({name: params[name] for name in PID_PARAMETERS})
+    return layout
+
+
+def write_parameters(path, params):
+    """Store the winner for ParameterPanel, keeping its movement and balance settings"""
+    base = None
+    if os.path.exists(path):
+        with open(path) as f:
+            base = json.load(f)
+    with open(path, 'w') as f:
+        json.dump(panel_parameters(params, base), f, indent=4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--trace', action='append', default=[], help="recorded CSV trace (repeatable)")
+    parser.add_argument('--simulate', type=int, default=0, help="number of simulated disturbance runs")
+    parser.add_argument('--search', choices=('grid', 'random', 'bayes'), default='grid')
+    parser.add_argument('--vary', default=','.join(PARAMETERS), help="comma-separated parameters to search")
+    parser.add_argument('--steps', type=int, default=3, help="grid values per parameter")
+    parser.add_argument('--candidates', type=int, default=500, help="random samples or Bayesian evaluations")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--plant-gain', type=float, default=PLANT_GAIN)
+    parser.add_argument('--effort-weight', type=float, default=EFFORT_WEIGHT)
+    parser.add_argument('--results', default='tuning_results.csv')
+    parser.add_argument('--output', default='parameters.json')
+    args = parser.parse_args(argv)
+
+    traces = [load_trace(path) for path in args.trace] + simulated_traces(args.simulate, seed=args.seed)
+    if not traces:
+        traces = simulated_traces(4, seed=args.seed)
+    vary = tuple(name.strip() for name in args.vary.split(',') if name.strip())
+    unknown = set(vary) - set(PARAMETERS)
+    if unknown:
+        parser.error(f"unknown parameters: {', '.join(sorted(unknown))}")
+
+    results = tune(traces, args.search, vary, args.steps, args.candidates, args.workers, args.seed,
+                   args.plant_gain, args.effort_weight)
+    write_results(args.results, results)
+    write_parameters(args.output, results[0])
+    best = ', '.join(f"{name}={results[0][name]:.4g}" for name in PARAMETERS)
+    print(f"Best of {len(results)}: score {results[0]['score']:.4f} ({best})")
+    print(f"Ranked table in {args.results}, parameters in {args.output}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
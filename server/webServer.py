@@ -18,6 +18,7 @@ from flask import Flask, request, jsonify
 from functools import wraps
 
 import RPIservo
+import bus_owner
 import functions
 import info
 import move
@@ -55,11 +56,15 @@ class WebServer:
             self.led = None
 
         # Initialize servo controllers
-        self.P_sc = RPIservo.ServoCtrl()
-        self.T_sc = RPIservo.ServoCtrl()
+        self.P_sc = RPIservo.ServoCtrl(priority=bus_owner.PRIORITY_HEAD)
+        self.T_sc = RPIservo.ServoCtrl(priority=bus_owner.PRIORITY_HEAD)
         self.P_sc.start()
         self.T_sc.start()
 
+        # Own IMU filter, so polling the status page doesn't disturb balance control
+        self.status_filter = initialization.make_imu_filter()
+        self.status_sample_time = None
+
         # State variables
         self.direction_command = 'no'
         self.turn_command = 'no'
@@ -101,9 +106,13 @@ class WebServer:
             return jsonify({'connected': False})
             
         try:
-            accel_data = initialization.sensor.get_accel_data()
-            filtered_x = initialization.kalman_filter_X.kalman(accel_data['x'])
-            filtered_y = initialization.kalman_filter_Y.kalman(accel_data['y'])
+            accel_data = info.monitor.snapshot('imu')
+            # Clients polling faster than the snapshot TTL share one sample
+            if accel_data['timestamp'] != self.status_sample_time:
+                self.status_filter.update(accel_data)
+                self.status_sample_time = accel_data['timestamp']
+            filtered_x = self.status_filter.value('x')
+            filtered_y = self.status_filter.value('y')
             return jsonify({
                 'connected': True,
                 'x': filtered_x,